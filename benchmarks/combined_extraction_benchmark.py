@@ -0,0 +1,108 @@
+"""
+Benchmark the single combined extraction call against the four-call path.
+
+For each OCR text file in the corpus directory (one file per process, as
+stored in ``UserDocument.ocr_text``) the prompts of both paths are built
+and their input tokens counted with the offline tokenizer. With ``--live``
+both paths are also sent to the model, bypassing the response cache, and
+wall-clock latency and output tokens are reported.
+
+The four-call path is timed the way the tasks run it: the items call, then
+Sections A, B and C (concurrently when ``b650_concurrent_sections`` is on).
+
+Usage:
+    python -m benchmarks.combined_extraction_benchmark /path/to/ocr_texts [--live]
+"""
+
+import os
+import sys
+import json
+import time
+from typing import Dict
+
+from config.settings import settings
+from llm_response_formats.items_extraction_format import RESPONSE_FORMAT
+from services.llm_cache import LLMResponseCache
+from services.OpenAIService import OpenAIService
+from services.token_budget import token_budget
+
+
+def prompt_tokens(service: OpenAIService, text: str) -> Dict[str, int]:
+    four_call = {
+        "items": service._items_prompt(text, "import"),
+        "section_a": service._section_a_prompt(text, "import", None)[0],
+        "section_b": service._section_b_prompt(text, "import", None, "SEA")[0],
+        "section_c": service._section_c_prompt(text, "import", None)[0],
+    }
+    return {
+        "four_call": sum(token_budget.count(prompt) for prompt in four_call.values()),
+        "combined": token_budget.count(service._combined_prompt(text, "import", None)[0]),
+    }
+
+
+def output_tokens(*responses) -> int:
+    return sum(token_budget.count(json.dumps(response, default=str)) for response in responses)
+
+
+def run_live(service: OpenAIService, text: str) -> Dict[str, Dict[str, float]]:
+    started = time.perf_counter()
+    items = service.process_item_extract_document(text, None, "import", response_format=RESPONSE_FORMAT)
+    if settings.b650_concurrent_sections:
+        sections = service.process_b650_sections({s: text for s in ("section_a", "section_b", "section_c")})
+    else:
+        sections = {
+            "section_a": service.process_b650_section_a(text),
+            "section_b": service.process_b650_section_b(text),
+            "section_c": service.process_b650_section_c(text),
+        }
+    four_call_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    combined = service.process_b650_combined(text)
+    combined_seconds = time.perf_counter() - started
+
+    return {
+        "four_call": {"seconds": four_call_seconds, "output_tokens": output_tokens(items, *sections.values())},
+        "combined": {"seconds": combined_seconds, "output_tokens": output_tokens(combined)},
+    }
+
+
+def run(corpus_dir: str, live: bool = False) -> Dict[str, Dict[str, float]]:
+    service = OpenAIService(cache=LLMResponseCache(backend="none"))
+    totals = {path: {"input_tokens": 0, "output_tokens": 0, "seconds": 0.0} for path in ("four_call", "combined")}
+    count = 0
+
+    for filename in sorted(os.listdir(corpus_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        with open(os.path.join(corpus_dir, filename), "r") as f:
+            text = f.read()
+        count += 1
+
+        tokens = prompt_tokens(service, text)
+        line = f"{filename}: input tokens four_call={tokens['four_call']} combined={tokens['combined']}"
+        for path, value in tokens.items():
+            totals[path]["input_tokens"] += value
+
+        if live:
+            results = run_live(service, text)
+            for path, values in results.items():
+                totals[path]["seconds"] += values["seconds"]
+                totals[path]["output_tokens"] += values["output_tokens"]
+            line += f" seconds four_call={results['four_call']['seconds']:.2f} combined={results['combined']['seconds']:.2f}"
+        print(line)
+
+    print(f"\n{'path':<12}{'input tok':>12}{'output tok':>12}{'s/process':>12}")
+    for path, values in totals.items():
+        seconds = values["seconds"] / count if live and count else float("nan")
+        output = values["output_tokens"] if live else float("nan")
+        print(f"{path:<12}{values['input_tokens']:>12}{output:>12}{seconds:>12.2f}")
+    return totals
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--live"]
+    if len(args) != 1:
+        print(__doc__)
+        sys.exit(1)
+    run(args[0], live="--live" in sys.argv)
@@ -0,0 +1,115 @@
+"""
+Local chat-completions stub for exercising LLM timeouts, retries and hedging.
+
+Answers ``POST /v1/chat/completions`` in the OpenAI wire format after a
+configurable latency. With ``--recordings`` the message content is the
+response recorded (``llm_transport=record``) for the same prompt,
+otherwise an empty JSON object. A share of requests can be made slow (to
+trigger hedging and adaptive timeouts) or fail with 429/500 (to trigger
+backoff).
+
+Point the service at it with ``llm_transport=stub`` (``llm_stub_url``) or
+``OPENAI_BASE_URL=http://127.0.0.1:8089/v1``.
+
+Usage:
+    python -m benchmarks.llm_stub_server [--port 8089] [--latency-ms 800]
+        [--slow-rate 0.05] [--slow-ms 20000] [--error-rate 0.05]
+        [--recordings ./llm_recordings]
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.llm_transport import RecordingStore, prompt_sha256
+
+
+class StubConfig:
+    latency_ms = 800.0
+    jitter = 0.25
+    slow_rate = 0.0
+    slow_ms = 20000.0
+    error_rate = 0.0
+    content = "{}"
+    recordings = {}
+
+
+def completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = StubConfig
+
+    def _send(self, status: int, body: dict, headers: dict = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        roll = random.random()
+        if roll < self.config.error_rate / 2:
+            self._send(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+            return
+        if roll < self.config.error_rate:
+            self._send(500, {"error": {"message": "stub failure", "type": "server_error"}})
+            return
+
+        latency = self.config.slow_ms if random.random() < self.config.slow_rate else self.config.latency_ms
+        time.sleep(latency * random.uniform(1 - self.config.jitter, 1 + self.config.jitter) / 1000)
+        messages = request.get("messages") or [{}]
+        recorded = self.config.recordings.get(prompt_sha256(str(messages[-1].get("content", ""))))
+        content = recorded["response"] if recorded else self.config.content
+        self._send(200, completion(request.get("model", "stub"), content))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = 8089) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"LLM stub listening on http://127.0.0.1:{port}/v1")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local chat-completions stub")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    parser.add_argument("--slow-rate", type=float, default=StubConfig.slow_rate)
+    parser.add_argument("--slow-ms", type=float, default=StubConfig.slow_ms)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--recordings", default=None, help="Directory of recorded responses to serve")
+    args = parser.parse_args()
+
+    StubConfig.latency_ms = args.latency_ms
+    StubConfig.slow_rate = args.slow_rate
+    StubConfig.slow_ms = args.slow_ms
+    StubConfig.error_rate = args.error_rate
+    if args.recordings:
+        StubConfig.recordings = RecordingStore(args.recordings).by_prompt()
+        print(f"Serving {len(StubConfig.recordings)} recorded response(s)")
+    serve(args.port).serve_forever()
@@ -0,0 +1,58 @@
+"""
+Show where the model router's settings send requests.
+
+For every section weight, reports the largest clean OCR text (no tables,
+no noise) still routed to the fast tier, then scores a few synthetic
+documents (a short clean invoice, a table-heavy packing list, a noisy
+scan) per section. Use it to check a change of ``llm_routing_threshold``
+or the weights before enabling ``llm_fast_model``.
+
+Usage:
+    python -m benchmarks.model_routing_check [threshold]
+"""
+
+import sys
+
+from config.settings import settings
+from services.model_router import model_router
+
+_INVOICE_LINE = "GRAPPLE HYDRAULIC ROTATOR 2 PCS 850.00 1700.00 USD NET 120 KGS\n"
+_TABLE = "=== Page_1_Table_{n} ===\nDESCRIPTION QTY UNIT PRICE AMOUNT\n" + _INVOICE_LINE * 10
+_NOISE_LINE = "GR4PPL€ hydr~ulic r0tat¤r 2 P(S 85O,0O l7OO.0O U$D ~~ ¦¦\n"
+
+DOCUMENTS = {
+    "clean invoice (~1k tokens)": _INVOICE_LINE * 60,
+    "packing list, 4 tables": "".join(_TABLE.format(n=n) for n in range(1, 5)),
+    "noisy scan (~1k tokens)": _NOISE_LINE * 40,
+}
+
+
+def fast_token_limit(section_weight: float) -> int:
+    """Largest clean text (in tokens) scored below the threshold, 0 if none"""
+    weights = settings.llm_routing_weights
+    total = sum(weights.get(name, 0.0) for name in ("tokens", "tables", "ocr_noise", "section")) or 1.0
+    budget = settings.llm_routing_threshold * total - weights.get("section", 0.0) * section_weight
+    if budget <= 0:
+        return 0
+    if not weights.get("tokens"):
+        return settings.llm_routing_max_tokens
+    return int(min(budget / weights["tokens"], 1.0) * settings.llm_routing_max_tokens)
+
+
+def run() -> None:
+    print(f"threshold={settings.llm_routing_threshold}")
+    print(f"{'section':<12}{'weight':>8}{'fast up to (tokens)':>22}")
+    for section, weight in settings.llm_routing_section_weights.items():
+        print(f"{section:<12}{weight:>8}{fast_token_limit(weight):>22}")
+    print()
+    sections = [name for name in settings.llm_routing_section_weights if name != "default"]
+    print(f"{'document':<30}" + "".join(f"{name:>12}" for name in sections))
+    for label, text in DOCUMENTS.items():
+        row = (model_router.score(section, text) for section in sections)
+        print(f"{label:<30}" + "".join(f"{d.score:>7.2f} {d.tier[0].upper():<4}" for d in row))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        settings.llm_routing_threshold = float(sys.argv[1])
+    run()
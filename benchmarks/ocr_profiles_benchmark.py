@@ -0,0 +1,89 @@
+"""
+Benchmark tesseract OCR profiles on a document corpus.
+
+Every page of every PDF/image in the corpus directory is OCR'd once per
+fixed profile and once with automatic profile selection (forced on for the
+run, whatever ``ocr_profiles_enabled`` says). Time per page is
+reported for each run; when a ``<document>.txt`` ground-truth file sits
+next to a document, character-level similarity is reported as well.
+
+Usage:
+    python -m benchmarks.ocr_profiles_benchmark /path/to/corpus
+"""
+
+import os
+import sys
+import time
+import difflib
+from typing import Dict, List
+
+import pytesseract
+from PIL import Image
+from pdf2image import convert_from_path
+
+from config.settings import settings
+from services.ocr_profiles import OCR_PROFILES, OCRProfileSelector
+
+
+def load_pages(path: str) -> List[Image.Image]:
+    if path.lower().endswith(".pdf"):
+        return convert_from_path(path, dpi=200)
+    return [Image.open(path)]
+
+
+def similarity(text: str, truth: str) -> float:
+    return difflib.SequenceMatcher(None, " ".join(text.split()), " ".join(truth.split())).ratio()
+
+
+def run(corpus_dir: str) -> Dict[str, Dict[str, float]]:
+    # select() returns the default profile while selection is disabled
+    enabled, settings.ocr_profiles_enabled = settings.ocr_profiles_enabled, True
+    try:
+        return _run(corpus_dir)
+    finally:
+        settings.ocr_profiles_enabled = enabled
+
+
+def _run(corpus_dir: str) -> Dict[str, Dict[str, float]]:
+    selector = OCRProfileSelector(cache_path="")
+    selected: Dict[str, int] = {}
+    stats = {name: {"seconds": 0.0, "similarity": 0.0, "scored": 0} for name in [*OCR_PROFILES, "auto"]}
+    page_count = 0
+
+    for filename in sorted(os.listdir(corpus_dir)):
+        if not filename.lower().endswith((".pdf", ".png", ".jpg", ".jpeg", ".tiff")):
+            continue
+        path = os.path.join(corpus_dir, filename)
+        truth_path = os.path.splitext(path)[0] + ".txt"
+        truth = open(truth_path).read() if os.path.exists(truth_path) else None
+
+        pages = load_pages(path)
+        page_count += len(pages)
+        for name in stats:
+            texts = []
+            for page in pages:
+                started = time.perf_counter()
+                profile = selector.select(image=page) if name == "auto" else OCR_PROFILES[name]
+                if name == "auto":
+                    selected[profile.name] = selected.get(profile.name, 0) + 1
+                texts.append(pytesseract.image_to_string(page, lang="eng", config=profile.config))
+                stats[name]["seconds"] += time.perf_counter() - started
+            if truth is not None:
+                stats[name]["similarity"] += similarity("\n".join(texts), truth)
+                stats[name]["scored"] += 1
+        print(f"{filename}: {len(pages)} page(s)")
+
+    print(f"\n{'profile':<14}{'ms/page':>10}{'similarity':>12}")
+    for name, values in stats.items():
+        ms_per_page = 1000 * values["seconds"] / max(page_count, 1)
+        score = values["similarity"] / values["scored"] if values["scored"] else float("nan")
+        print(f"{name:<14}{ms_per_page:>10.1f}{score:>12.3f}")
+    print(f"\nauto selected: {', '.join(f'{name} x{count}' for name, count in sorted(selected.items()))}")
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    run(sys.argv[1])
@@ -0,0 +1,97 @@
+"""
+Throughput and latency of the LLM extraction pipeline.
+
+Runs the item extraction and Section A, B and C calls for every OCR text
+file in the corpus directory (one file per process), with a number of
+processes in flight at once, and reports processes per second and
+per-process latency percentiles. The response cache is bypassed, and the
+near-duplicate cache, supplier templates and pre-LLM gate are disabled for
+the run: they depend on Redis and template state left by earlier runs, and
+would send fill or targeted prompts that a replay may never have recorded.
+
+Pair it with the LLM transport for runs without network access: record
+once with ``LLM_TRANSPORT=record``, then benchmark with
+``LLM_TRANSPORT=replay`` (optionally ``LLM_REPLAY_LATENCY_MS``), or
+against ``benchmarks/llm_stub_server.py`` with ``LLM_TRANSPORT=stub``.
+
+Usage:
+    python -m benchmarks.pipeline_throughput_benchmark /path/to/ocr_texts [workers]
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from config.settings import settings
+from llm_response_formats.items_extraction_format import RESPONSE_FORMAT
+from services.llm_cache import LLMResponseCache
+from services.OpenAIService import OpenAIService
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))] if values else float("nan")
+
+
+def extract(service: OpenAIService, text: str) -> float:
+    started = time.perf_counter()
+    service.process_item_extract_document(text, None, "import", response_format=RESPONSE_FORMAT)
+    service.process_b650_sections({section: text for section in ("section_a", "section_b", "section_c")})
+    return time.perf_counter() - started
+
+
+# Extraction shortcuts whose prompts depend on state outside the corpus
+SHORTCUT_SETTINGS = ("semantic_cache_enabled", "supplier_templates_enabled", "prellm_gate_enabled")
+
+
+@contextmanager
+def shortcuts_disabled():
+    saved = {name: getattr(settings, name) for name in SHORTCUT_SETTINGS}
+    for name in SHORTCUT_SETTINGS:
+        setattr(settings, name, False)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+def run(corpus_dir: str, workers: int = 4) -> Dict[str, float]:
+    with shortcuts_disabled():
+        return _run(corpus_dir, workers)
+
+
+def _run(corpus_dir: str, workers: int) -> Dict[str, float]:
+    service = OpenAIService(cache=LLMResponseCache(backend="none"))
+    texts = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(corpus_dir, filename), "r") as f:
+                texts.append(f.read())
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(lambda text: extract(service, text), texts))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "processes": len(texts),
+        "seconds": elapsed,
+        "processes_per_second": len(texts) / elapsed if elapsed else 0.0,
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+    }
+    print(f"transport={settings.llm_transport} workers={workers}")
+    for name, value in result.items():
+        print(f"{name:<22}{value:>10.3f}")
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print(__doc__)
+        sys.exit(1)
+    run(sys.argv[1], int(sys.argv[2]) if len(sys.argv) == 3 else 4)
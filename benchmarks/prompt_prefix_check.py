@@ -0,0 +1,47 @@
+"""
+Check that every extraction prompt starts with a byte-stable prefix.
+
+Each registered template is rendered for two different documents (different OCR
+text, pipeline data and declaration type); the rendered prompts must both
+start with the template's static prefix, so the provider can serve it from
+its prompt cache. Reports the prefix tokens per template against the
+provider's minimum cacheable length, and exits non-zero on any failure.
+tests/test_prompt_prefix.py asserts the same stability in the test suite.
+
+Usage:
+    python -m benchmarks.prompt_prefix_check
+"""
+
+import sys
+
+from services.prompt_prefix import MIN_CACHEABLE_TOKENS, static_prefix
+from services.prompt_registry import prompt_registry
+from services.token_budget import token_budget
+
+DOCUMENTS = [
+    {"ocr_text": "INVOICE RM2025-001\nGRAPPLE 1 1100 1100 USD", "declaration_type": "import",
+     "structured_pipeline_data": "consignee_name: BRADLEY THOMAS"},
+    {"ocr_text": "BILL OF LADING COSU6123\nVESSEL MSC AURORA", "declaration_type": "export",
+     "structured_pipeline_data": ""},
+]
+
+
+def run() -> bool:
+    ok = True
+    print(f"{'template':<12}{'prefix tokens':>15}{'cacheable':>11}{'stable':>8}")
+    for name in prompt_registry.names():
+        template = prompt_registry.get(name)
+        prefix = static_prefix(template)
+        rendered = [
+            template.format(**{k: v for k, v in document.items() if k in template.input_variables})
+            for document in DOCUMENTS
+        ]
+        stable = all(prompt.startswith(prefix) for prompt in rendered)
+        tokens = token_budget.count(prefix)
+        ok = ok and stable
+        print(f"{name:<12}{tokens:>15}{str(tokens >= MIN_CACHEABLE_TOKENS):>11}{str(stable):>8}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,56 @@
+"""
+Micro-benchmark of prompt rendering.
+
+Renders every registered extraction prompt with a synthetic OCR text of
+the given size, comparing the precompiled registry against building and
+formatting a LangChain ``PromptTemplate`` per call (skipped when LangChain
+is not installed). Reports microseconds per call.
+
+Usage:
+    python -m benchmarks.prompt_render_benchmark [ocr_kb] [iterations]
+"""
+
+import sys
+import time
+from typing import Callable
+
+from services.prompt_registry import prompt_registry
+
+
+def per_call_us(render: Callable[[], str], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(ocr_kb: int = 20, iterations: int = 2000) -> None:
+    line = "GRAPPLE 1 1100 1100 USD  HYDRAULIC ROTATOR 2 850.00 1700.00 USD\n"
+    values = {
+        "ocr_text": line * (ocr_kb * 1024 // len(line)),
+        "declaration_type": "import",
+        "structured_pipeline_data": "consignee_name: BRADLEY THOMAS\nport_of_loading: QINGDAO",
+    }
+    try:
+        from langchain.prompts import PromptTemplate
+    except ImportError:
+        PromptTemplate = None
+
+    print(f"ocr_text={ocr_kb}KB iterations={iterations}")
+    print(f"{'prompt':<16}{'registry us':>12}{'langchain us':>14}")
+    for name in prompt_registry.names():
+        compiled = prompt_registry.get(name)
+        registry_us = per_call_us(lambda: compiled.render(**values), iterations)
+        langchain_us = float("nan")
+        if PromptTemplate is not None:
+            langchain_us = per_call_us(
+                lambda: PromptTemplate(input_variables=compiled.input_variables, template=compiled.template).format(
+                    **{k: v for k, v in values.items() if k in compiled.input_variables}
+                ),
+                iterations,
+            )
+        print(f"{name:<16}{registry_us:>12.1f}{langchain_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -27,6 +27,9 @@ class Settings(BaseSettings):
     aws_secret_access_key: Optional[str] = None
     aws_region: str = "us-east-1"
     s3_bucket: Optional[str] = None
+    s3_endpoint_url: Optional[str] = None
+    storage_cache_dir: str = "./storage_cache"
+    storage_cache_max_mb: int = 5120
 
     # Ollama
     ollama_url: str = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")
@@ -38,9 +41,154 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY","")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL","")
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL")  # e.g. a local stub server
+
+    # LLM transport: live, record (live + save to disk), replay (from disk) or stub (local HTTP stub)
+    llm_transport: str = "live"
+    llm_recordings_dir: str = "./llm_recordings"
+    llm_replay_latency_ms: Optional[float] = None  # None replays the recorded latency
+    llm_replay_jitter: float = 0.1
+    llm_stub_url: str = "http://127.0.0.1:8089/v1"
+
+    # LLM call timeouts, retries and hedging
+    llm_timeout_initial_seconds: float = 60
+    llm_timeout_min_seconds: float = 10
+    llm_timeout_max_seconds: float = 180
+    llm_timeout_percentile: float = 99
+    llm_timeout_multiplier: float = 2.0
+    llm_latency_window: int = 200
+    llm_latency_min_samples: int = 20
+    llm_max_retries: int = 3
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 30.0
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 95
+
+    # Pooled HTTP connections of the LLM clients (built lazily in each worker process)
+    llm_http_max_connections: int = 20
+    llm_http_max_keepalive: int = 10
+    llm_http_keepalive_seconds: float = 30
+    llm_http_connect_timeout_seconds: float = 5
+    llm_http_read_timeout_seconds: float = 120  # per-call timeouts from llm_call_policy take precedence
+
+    # Per-call LLM telemetry ledger (a JSONL file or the llm_call_log table)
+    llm_telemetry_sink: str = "jsonl"  # jsonl, db (creates llm_call_log if missing) or none
+    llm_telemetry_path: str = "./llm_calls.jsonl"
+    llm_telemetry_batch_size: int = 50
+    llm_telemetry_flush_seconds: float = 10
+    # USD per million tokens; models match on the longest name prefix
+    llm_pricing: dict = {
+        "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+        "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+        "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+        "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+        "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    }
+
+    # Route requests to a fast model tier by complexity; failed validation escalates to OPENAI_MODEL
+    llm_routing_enabled: bool = True
+    llm_fast_model: str = os.getenv("OPENAI_FAST_MODEL", "")  # empty disables routing
+    # Complexity score (0..1) at which the strong model is used. At 0.3, clean text without tables goes
+    # to the fast tier up to ~4k tokens for items, ~5.7k for Sections A/B, ~3.4k for Section C and
+    # ~1.1k for combined; see benchmarks/model_routing_check.py
+    llm_routing_threshold: float = 0.3
+    llm_routing_weights: dict = {"tokens": 0.35, "tables": 0.2, "ocr_noise": 0.2, "section": 0.25}
+    llm_routing_section_weights: dict = {"items": 0.5, "section_a": 0.2, "section_b": 0.2, "section_c": 0.6, "combined": 1.0, "default": 0.5}
+    llm_routing_max_tokens: int = 8000  # OCR tokens scored as fully complex
+    llm_routing_max_tables: int = 4
+    llm_routing_max_noise: float = 0.3  # share of unclean words scored as fully complex
+
+    # LLM response cache
+    llm_cache_backend: str = "redis"  # redis, disk or none
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 10000
+    llm_cache_redis_db: int = 2
+    llm_cache_dir: str = "./llm_cache"
+    llm_cache_evict_interval_seconds: float = 60  # disk backend: max age of the entry count before a rescan
+
+    # Shared LLM rate limiter (token buckets in Redis, shared by all workers)
+    llm_rate_limit_enabled: bool = True
+    llm_rate_limit_redis_db: int = 3
+    llm_rate_limit_rpm: int = 500
+    llm_rate_limit_tpm: int = 200000
+    llm_rate_limit_bulk_reserve: float = 0.2  # share of each budget kept for the interactive lane
+    llm_rate_limit_max_wait_seconds: float = 300
+    llm_max_inflight: int = 16
+    llm_expected_completion_tokens: int = 1500
+
+    # Native structured outputs (json_schema response_format)
+    llm_structured_outputs: bool = True
+    llm_structured_outputs_strict: bool = True
+
+    # Prompt token budgets (offline tokenizer)
+    token_budget_enabled: bool = True
+    tokenizer_encoding: str = "cl100k_base"
+    tokenizer_allow_download: bool = False  # otherwise only a locally cached encoding is used
+    token_budget_limits: dict = {"items": 12000, "section_a": 6000, "section_b": 6000, "section_c": 8000, "combined": 16000, "default": 8000}
+
+    # Skip or narrow section LLM calls when the pre-LLM pipeline is confident
+    prellm_gate_enabled: bool = True
+    prellm_min_confidence: float = 0.8
+    prellm_targeted_min_core_coverage: float = 0.6  # share of a section's core fields detected before narrowing the prompt
+
+    # Learned per-supplier field anchors, used before the LLM for repeat shippers
+    supplier_templates_enabled: bool = False
+    supplier_template_dir: str = "./supplier_templates"
+    supplier_template_min_fields: int = 3  # string fields located before a template is stored
+    supplier_template_min_samples: int = 3  # documents that must agree on a field's anchor before it is used
+    supplier_template_max_samples: int = 5  # learned documents kept to verify the template against
+    supplier_template_min_coverage: float = 0.8  # share of template fields found to skip the full prompt
+
+    # Near-duplicate documents reuse a past extraction as a skeleton (MinHash/LSH in Redis)
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.9  # estimated Jaccard similarity of word shingles
+    semantic_cache_num_perm: int = 64
+    semantic_cache_bands: int = 16
+    semantic_cache_max_band_size: int = 50  # most recent documents kept per LSH bucket
+
+    # Bulk re-extraction through batch files
+    llm_batch_backend: str = "local"  # local (in-process stand-in) or openai (Batch API)
+    llm_batch_dir: str = "./llm_batches"
+    llm_batch_concurrency: int = 8
+    llm_batch_poll_seconds: int = 60
+    llm_batch_ingest_size: int = 100
+    llm_batch_failed_retries: int = 1  # extra passes over failed requests of a local batch run
+
+    # Concurrent Section A/B/C extraction
+    llm_max_concurrency: int = 3
+    b650_concurrent_sections: bool = False
+
+    # Chunked (map-reduce) item extraction for long documents
+    item_chunking_enabled: bool = True
+    item_chunk_threshold_tokens: int = 10000
+    item_chunk_tokens: int = 4000
+    item_chunk_overlap_lines: int = 5
+
+    # Streamed item extraction with batched row inserts
+    llm_streaming_items: bool = False
+    item_write_batch_size: int = 25
+
+    # Single combined call for items and Sections A, B and C
+    b650_combined_extraction: bool = False
     
     # OCR
     ocr_engine: str = "tesseract"  # tesseract or textract
+    layout_reading_order: bool = True  # emit multi-column pages block by block
+    # Pick tesseract --psm/--oem per page layout; off until benchmarks/ocr_profiles_benchmark.py
+    # shows a gain on the production corpus (including psm 11 with layout_reading_order)
+    ocr_profiles_enabled: bool = False
+    ocr_profile_cache_path: Optional[str] = "./ocr_profile_cache.json"
+
+    # Rendered page image store
+    page_image_store_enabled: bool = False
+    page_image_store_dir: str = "./page_cache"
+    page_image_store_format: str = "png"  # png (compressed grayscale) or npy (memory-mappable)
+    page_image_store_max_mb: int = 2048
+    page_image_store_evict_interval_seconds: float = 60  # on-disk size re-measured at most this often
+
+    # Page-type classifier used to route pages to extraction stages
+    document_routing_enabled: bool = True
+    document_classifier_weights_path: Optional[str] = None
     
     # CORS
     cors_origins: list = ["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost:3001", "http://127.0.0.1:3001","http://3.27.231.129:3000", "http://localhost:60146","http://127.0.0.1:60146","http://3.27.231.129"]
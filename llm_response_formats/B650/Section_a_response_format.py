@@ -1,5 +1,15 @@
 B650_SECTION_A_RESPONSE_FORMAT = {
   "type": "object",
+  "$defs": {
+    "valuation_element": {
+      "type": "object",
+      "properties": {
+        "amount": {"type": "string"},
+        "currency": {"type": "string"}
+      },
+      "additionalProperties": False
+    }
+  },
   "properties": {
     "header": {
       "type": "object",
@@ -25,8 +35,14 @@ B650_SECTION_A_RESPONSE_FORMAT = {
           "description": "AQIS inspection location"
         },
         "contact_details": {
-          "type": "string",
-          "description": "Contact details (email/phone)"
+          "type": "object",
+          "description": "Contact details (email/phone)",
+          "properties": {
+            "phone": {"type": "string"},
+            "fax": {"type": "string"},
+            "email": {"type": "string"}
+          },
+          "additionalProperties": False
         },
         "destination_port_code": {
           "type": "string",
@@ -46,8 +62,15 @@ B650_SECTION_A_RESPONSE_FORMAT = {
           "description": "Header valuation advice number"
         },
         "valuation_elements": {
-          "type": "string",
-          "description": "Valuation elements description"
+          "type": "object",
+          "description": "Valuation elements (amount and currency per element)",
+          "properties": {
+            "invoice_total": {"$ref": "#/$defs/valuation_element"},
+            "freight": {"$ref": "#/$defs/valuation_element"},
+            "insurance": {"$ref": "#/$defs/valuation_element"},
+            "packing": {"$ref": "#/$defs/valuation_element"}
+          },
+          "additionalProperties": False
         },
         "fob_or_cif": {
           "type": "string",
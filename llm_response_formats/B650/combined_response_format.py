@@ -0,0 +1,37 @@
+from llm_response_formats.items_extraction_format import RESPONSE_FORMAT as ITEMS_RESPONSE_FORMAT
+from llm_response_formats.B650.Section_a_response_format import B650_SECTION_A_RESPONSE_FORMAT
+from llm_response_formats.B650.section_b_sea_response_format import B650_SECTION_B_SEA_RESPONSE_FORMAT
+from llm_response_formats.B650.section_c_response_format import SECTION_C
+
+# Items carry the number of the source document block they were read from
+COMBINED_ITEM = {
+  **ITEMS_RESPONSE_FORMAT["properties"]["items"]["items"],
+  "properties": {
+    **ITEMS_RESPONSE_FORMAT["properties"]["items"]["items"]["properties"],
+    "document_index": {
+      "type": "integer",
+      "description": "Number of the DOCUMENT block the item was read from"
+    }
+  }
+}
+
+B650_COMBINED_RESPONSE_FORMAT = {
+  "type": "object",
+  "$defs": B650_SECTION_A_RESPONSE_FORMAT["$defs"],
+  "properties": {
+    "header": B650_SECTION_A_RESPONSE_FORMAT["properties"]["header"],
+    "sea_transport_lines": B650_SECTION_B_SEA_RESPONSE_FORMAT["properties"]["sea_transport_lines"],
+    "tariff_lines": SECTION_C["properties"]["tariff_lines"],
+    **{
+      key: value
+      for key, value in ITEMS_RESPONSE_FORMAT["properties"].items()
+      if key != "items"
+    },
+    "items": {
+      "type": "array",
+      "items": COMBINED_ITEM
+    }
+  },
+  "required": ["header", "tariff_lines", "items"],
+  "additionalProperties": False
+}
@@ -13,7 +13,7 @@ SECTION_C = {
                     "description": "Description of goods"
                 },
                 "quantity": {
-                    "type": "number",
+                    "type": "string",
                     "description": "Quantity of goods"
                 },
                 "unit_of_measure": {
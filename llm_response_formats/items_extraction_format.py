@@ -1,6 +1,14 @@
 RESPONSE_FORMAT = {
   "type": "object",
   "properties": {
+    "exporter_name": {"type": "string"},
+    "importer_name": {"type": "string"},
+    "consignee": {"type": "string"},
+    "buyer": {"type": "string"},
+    "port_of_loading": {"type": "string"},
+    "port_of_discharge": {"type": "string"},
+    "total_weight_unit": {"type": "string"},
+    "currency": {"type": "string"},
     "total_weight": {
       "type": "number",
       "multipleOf": 0.001,
@@ -20,6 +28,12 @@ RESPONSE_FORMAT = {
             "type": "string",
             "maxLength": 255
           },
+          "item_description": {
+            "type": "string"
+          },
+          "item_type": {
+            "type": "string"
+          },
           "item_weight": {
             "type": "number",
             "multipleOf": 0.001,
@@ -3,6 +3,7 @@ from .user_declaration import UserDeclaration, DeclarationType
 from .user_documents import UserDocument
 from .user_process_items import UserProcessItem
 from .auth import User, RefreshToken
+from .llm_call_log import LLMCallLog
 from sqlalchemy.orm import relationship
 
 # Establish relationships
@@ -19,4 +20,5 @@ __all__ = [
     "UserProcessItem",
     "User",
     "RefreshToken",
+    "LLMCallLog",
 ]
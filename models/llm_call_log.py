@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, DateTime, Integer, Boolean, Numeric
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from config.database import Base
+import uuid
+
+
+class LLMCallLog(Base):
+    __tablename__ = "llm_call_log"
+
+    call_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    process_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    section = Column(String(50), nullable=True, index=True)
+    model = Column(String(100), nullable=True)
+    lane = Column(String(20), nullable=True)
+    prompt_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    latency_ms = Column(Integer, default=0)
+    cache_hit = Column(Boolean, default=False)
+    retries = Column(Integer, default=0)
+    estimated_cost = Column(Numeric(12, 6), nullable=True)
+    success = Column(Boolean, default=True)
+    error = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,7 +1,8 @@
-from langchain.prompts import PromptTemplate
-def get_b650_section_a_extraction_prompt(ocr_text: str) -> str:
-    return PromptTemplate(input_variables=["ocr_text", "declaration_type", "structured_pipeline_data"],
-                          template="""
+from prompts.document_separator import DOCUMENT_SEPARATOR
+
+B650_SECTION_A_VARIABLES = ["ocr_text", "declaration_type", "structured_pipeline_data"]
+
+B650_SECTION_A_TEMPLATE = """
                           # Persona Prompt
 You are an **Australian border customs authority and import declaration expert**, you extract details for import declaration from invoices.
 
@@ -21,13 +22,6 @@ You are an **Australian border customs authority and import declaration expert**
  **Task for you (Australian border customs authority and import declaration expert)**
  You are given the text, you need to extract relevant information for australian customs import declaration b650 from.
 
---- Here is the structured and unstructured data combined ---
-{structured_pipeline_data}
-
---- Unstructured text START---
-{ocr_text}  
---- Unstructured text END ---
-
 # JSON SCHEMA (mandatory output)
 
 {{
@@ -57,8 +51,8 @@ You are an **Australian border customs authority and import declaration expert**
           "description": "AQIS inspection location"
         }}
         "contact_details": {{
-          "type": "string",
-          "description": "Contact details (email/phone)"
+          "type": "object",
+          "description": "Contact details as {{"phone": ..., "fax": ..., "email": ...}}"
         }}
         "destination_port_code": {{
           "type": "string",
@@ -78,8 +72,8 @@ You are an **Australian border customs authority and import declaration expert**
           "description": "Header valuation advice number"
         }}
         "valuation_elements": {{
-          "type": "string",
-          "description": "Valuation elements description"
+          "type": "object",
+          "description": "Valuation elements as {{"<element>": {{"amount": ..., "currency": ...}}}} for invoice_total, freight, insurance, packing"
         }}
         "fob_or_cif": {{
           "type": "string",
@@ -113,6 +107,19 @@ You are an **Australian border customs authority and import declaration expert**
 - Output ONLY the JSON.
 - No markdown, no backticks, no explanations.
 - Fill null where information cannot be found.
+
+""" + DOCUMENT_SEPARATOR + """
+--- Here is the structured and unstructured data combined ---
+{structured_pipeline_data}
+
+--- Unstructured text START---
+{ocr_text}
+--- Unstructured text END ---
     """
-)
+
+
+def get_b650_section_a_extraction_prompt(ocr_text: str) -> str:
+    from langchain.prompts import PromptTemplate
+
+    return PromptTemplate(input_variables=B650_SECTION_A_VARIABLES, template=B650_SECTION_A_TEMPLATE)
 
@@ -1,7 +1,8 @@
-from langchain.prompts import PromptTemplate
-def get_b650_section_b_sea_extraction_prompt(ocr_text: str) -> str:
-    return PromptTemplate(input_variables=["ocr_text", "declaration_type", "structured_pipeline_data"],
-                          template="""
+from prompts.document_separator import DOCUMENT_SEPARATOR
+
+B650_SECTION_B_SEA_VARIABLES = ["ocr_text", "declaration_type", "structured_pipeline_data"]
+
+B650_SECTION_B_SEA_TEMPLATE = """
                           # Persona Prompt
 You are an **Australian border customs authority specializing in sea transport mode**, you extract details for import declaration from invoices.
 
@@ -21,13 +22,6 @@ You are an **Australian border customs authority specializing in sea transport m
  **Task for you (Australian border customs authority specializing in sea transport mode)**
  You are given the text, you need to extract relevant information to mode of tranport sea/ocean for australian customs import declaration b650 from.
 
---- Here is the structured and unstructured data combined ---
-{structured_pipeline_data}
-
---- Unstructured text START---
-{ocr_text}  
---- Unstructured text END ---
-
 # JSON SCHEMA (mandatory output)
 
 {{
@@ -115,6 +109,19 @@ You are an **Australian border customs authority specializing in sea transport m
 - Output ONLY the JSON.
 - No markdown, no backticks, no explanations.
 - Fill null where information cannot be found.
+
+""" + DOCUMENT_SEPARATOR + """
+--- Here is the structured and unstructured data combined ---
+{structured_pipeline_data}
+
+--- Unstructured text START---
+{ocr_text}
+--- Unstructured text END ---
     """
-)
+
+
+def get_b650_section_b_sea_extraction_prompt(ocr_text: str) -> str:
+    from langchain.prompts import PromptTemplate
+
+    return PromptTemplate(input_variables=B650_SECTION_B_SEA_VARIABLES, template=B650_SECTION_B_SEA_TEMPLATE)
 
@@ -1,7 +1,8 @@
-from langchain.prompts import PromptTemplate
-def get_b650_section_c_extraction_prompt(ocr_text: str) -> str:
-    return PromptTemplate(input_variables=["ocr_text", "declaration_type", "structured_pipeline_data"],
-                          template="""
+from prompts.document_separator import DOCUMENT_SEPARATOR
+
+B650_SECTION_C_VARIABLES = ["ocr_text", "declaration_type", "structured_pipeline_data"]
+
+B650_SECTION_C_TEMPLATE = """
                           ## Persona Prompt
 You are an **Australian border customs authority and import declaration expert**, you extract details for import declaration from invoices.
 
@@ -18,12 +19,6 @@ You are an **Australian border customs authority and import declaration expert**
  ## Task for you (**Australian border customs authority and import declaration expert**)
  You are given the text, you need to extract relevant information for australian customs import declaration b650 from.
 
---- Here is the structured and unstructured data combined ---
-{structured_pipeline_data}
-
-
---- Unstructured text END ---
-{ocr_text}
 # JSON SCHEMA (mandatory output)
 
 {{
@@ -41,7 +36,7 @@ You are an **Australian border customs authority and import declaration expert**
                     "description": "Description of goods"
                 }},
                 "quantity": {{
-                    "type": "number",
+                    "type": "string",
                     "description": "Quantity of goods"
                 }},
                 "unit_of_measure": {{
@@ -168,6 +163,19 @@ You are an **Australian border customs authority and import declaration expert**
 - Output ONLY the JSON.
 - No markdown, no backticks, no explanations.
 - Fill null where information cannot be found.
+
+""" + DOCUMENT_SEPARATOR + """
+--- Here is the structured and unstructured data combined ---
+{structured_pipeline_data}
+
+--- Unstructured text START---
+{ocr_text}
+--- Unstructured text END ---
     """
-)
+
+
+def get_b650_section_c_extraction_prompt(ocr_text: str) -> str:
+    from langchain.prompts import PromptTemplate
+
+    return PromptTemplate(input_variables=B650_SECTION_C_VARIABLES, template=B650_SECTION_C_TEMPLATE)
 
@@ -1,23 +1,10 @@
-from langchain.prompts import PromptTemplate
+from prompts.document_separator import DOCUMENT_SEPARATOR
 
+ITEMS_EXTRACTION_VARIABLES = ["ocr_text", "declaration_type"]
 
-
-def get_items_extraction_prompt(ocr_text: str, declaration_type: str) -> str:
-    """
-    Persona + MATE engineered prompt for extracting structured data 
-    from import/export documents (invoice / bill of lading).
-    Designed for LLaMA2.
-    """
-
-    return PromptTemplate(input_variables=["ocr_text", "declaration_type"],
-                          template="""
+ITEMS_EXTRACTION_TEMPLATE = """
 You are a multi-persona expert team working together to extract structured data 
-from {declaration_type} documents (commercial invoices, bills of lading, packing lists).
-The document text is provided below:
-
---- DOCUMENT TEXT START ---
-{ocr_text}
---- DOCUMENT TEXT END ---
+from import/export documents (commercial invoices, bills of lading, packing lists).
 
 ## Document Forensics Analyst
    - Identify exporter, importer, ports, items, and totals.
@@ -69,8 +56,25 @@ The document text is provided below:
 - Output ONLY the JSON.
 - No markdown, no backticks, no explanations.
 - Fill null where information cannot be found.
+
+""" + DOCUMENT_SEPARATOR + """
+Declaration type: {declaration_type}
+
+--- Unstructured text START---
+{ocr_text}
+--- Unstructured text END ---
+    """
+
+
+def get_items_extraction_prompt(ocr_text: str, declaration_type: str) -> str:
     """
-    )
+    Persona + MATE engineered prompt for extracting structured data 
+    from import/export documents (invoice / bill of lading).
+    Designed for LLaMA2.
+    """
+    from langchain.prompts import PromptTemplate
+
+    return PromptTemplate(input_variables=ITEMS_EXTRACTION_VARIABLES, template=ITEMS_EXTRACTION_TEMPLATE)
 
 
 
@@ -0,0 +1,5 @@
+# Closes the static part of every extraction template. Everything before it
+# is identical for all documents, so the provider can serve it from its
+# prompt prefix cache; the per-document variables come after it.
+DOCUMENT_SEPARATOR = """## DOCUMENT
+Everything above is fixed; the document to extract from follows."""
@@ -0,0 +1,25 @@
+from typing import Optional, List
+from pydantic import BaseModel, Field
+
+from schemas.B650.import_section_a import B650SectionAHeader
+from schemas.B650.import_section_b_sea import SeaTransportLine
+from schemas.B650.import_section_c_schema import SECTIONC
+
+
+class CombinedItem(BaseModel):
+    item_title: Optional[str] = Field(None, description="Item title")
+    item_description: Optional[str] = Field(None, description="Item description")
+    item_type: Optional[str] = Field(None, description="Item type")
+    item_weight: Optional[float] = Field(None, description="Item weight")
+    item_weight_unit: Optional[str] = Field(None, description="Weight unit (e.g. KGS)")
+    item_price: Optional[float] = Field(None, description="Item price")
+    item_currency: Optional[str] = Field(None, description="3-letter ISO currency code")
+    document_index: Optional[int] = Field(None, description="Source document block number")
+
+
+class B650CombinedResponse(BaseModel):
+    """Items and Sections A, B and C returned by a single extraction call"""
+    header: B650SectionAHeader
+    sea_transport_lines: Optional[SeaTransportLine] = None
+    tariff_lines: SECTIONC
+    items: List[CombinedItem] = []
@@ -25,3 +25,7 @@ class SeaTransportLine(BaseModel):
 
 class B650SectionBSeaResponseFormat(BaseModel):
     sea_transport_lines: List[SeaTransportLine]
+
+
+class B650SectionBSeaResponse(BaseModel):
+    sea_transport_lines: SeaTransportLine
@@ -37,3 +37,7 @@ class SECTIONC(BaseModel):
     instrument_type2: Optional[str] = Field(None, description="Instrument type 2")
     instrument_number2: Optional[str] = Field(None, description="Instrument number 2")
     producer_code: Optional[str] = Field(None, description="Producer code")
+
+
+class B650SectionCResponse(BaseModel):
+    tariff_lines: SECTIONC
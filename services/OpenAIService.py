@@ -1,24 +1,51 @@
+import os
+import copy
 import json
 import re
+import time
+import threading
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import itertools
+from typing import Callable, Dict, Any, Generator, List, Optional, Tuple
 
 from config.settings import settings
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 
-# Example imports – adjust paths to your project structure
-from prompts.Item_extraction_prompt import get_items_extraction_prompt
-from prompts.B650_section_a_extraction_prompt import get_b650_section_a_extraction_prompt
-from prompts.B650_section_b_sea_extraction_prompt import get_b650_section_b_sea_extraction_prompt
-from prompts.B650_section_c_extraction_prompt import get_b650_section_c_extraction_prompt
-
 from llm_response_formats.B650.Section_a_response_format import B650_SECTION_A_RESPONSE_FORMAT
 from llm_response_formats.B650.section_b_air_response_format import SECTION_B_AIR_RESPONSE_FORMAT
 from llm_response_formats.B650.section_b_sea_response_format import B650_SECTION_B_SEA_RESPONSE_FORMAT
 from llm_response_formats.B650.section_c_response_format import SECTION_C
+from llm_response_formats.B650.combined_response_format import B650_COMBINED_RESPONSE_FORMAT
+from services.llm_cache import llm_response_cache, prompt_fingerprint
+from services.llm_http import llm_http, running_loop
+from services.rate_limiter import llm_rate_limiter
+from services.llm_resilience import llm_call_policy
+from services.llm_telemetry import call_context, llm_telemetry
+from services.llm_transport import build_transport
+from services.model_router import FAST, model_router
+from services.json_stream import StreamingArrayParser
+from services.item_chunking import chunk_text_with_overlaps, is_failed_response, merge_item_responses
+from services.prellm_gate import build_targeted_prompt, prellm_gate
+from services.prompt_prefix import prompt_prefix_stats
+from services.prompt_registry import prompt_registry
+from services.structured_output import (
+    clean_list_field,
+    repaired_errors,
+    response_format_param,
+    subset_schema,
+    validate_with_reask,
+)
+from services.semantic_cache import build_fill_prompt, semantic_cache
+from services.supplier_templates import build_template_fill_prompt, supplier_template_store
+from services.token_budget import token_budget
+
+from schemas.B650.import_section_a import B650SectionAResponse
+from schemas.B650.import_section_b_sea import B650SectionBSeaResponse
+from schemas.B650.import_section_c_schema import B650SectionCResponse
+from schemas.B650.import_combined import B650CombinedResponse, CombinedItem
 
 
 class OpenAIService:
@@ -27,39 +54,227 @@ class OpenAIService:
     Provides structured information extraction for OCR text.
     """
 
-    def __init__(self):
-        logging.info(settings.OPENAI_API_KEY)
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            api_key=settings.OPENAI_API_KEY,
-            temperature=0.2,
-        )
+    def __init__(self, cache=None, transport=None):
+        self.model = settings.OPENAI_MODEL
+        self.temperature = 0.2
+        # Chat clients are built on first use, per process (see _llm_for)
+        self._llms: Dict[Tuple[str, Any], Any] = {}
+        self._llms_pid: Optional[int] = None
+        self._llms_lock = threading.Lock()
         self.parser = StrOutputParser()
+        self.cache = cache or llm_response_cache
+        self.transport = transport or build_transport()
+
+    @property
+    def llm(self):
+        """Chat client of the strong model"""
+        return self._llm_for(self.model)
+
+    def _build_llm(self, model: str, loop=None):
+        from langchain_openai import ChatOpenAI
+
+        stub = settings.llm_transport.lower() == "stub"
+        return ChatOpenAI(
+            model=model,
+            api_key=settings.OPENAI_API_KEY or ("stub" if stub else ""),
+            base_url=settings.llm_stub_url if stub else settings.OPENAI_BASE_URL,
+            temperature=self.temperature,
+            # Retries and per-call timeouts are handled by llm_call_policy
+            max_retries=0,
+            timeout=llm_http.timeout(),
+            http_client=llm_http.client(),
+            http_async_client=llm_http.async_client(loop) if loop is not None else None,
+        )
+
+    def _model(self) -> str:
+        """Model of the current routing tier (the strong model by default)"""
+        return settings.llm_fast_model if model_router.current_tier() == FAST else self.model
+
+    def _llm_for(self, model: str):
+        """
+        Chat client of a model in this process, built on first use so
+        prefork children never inherit the parent's connections. Async
+        calls get a client per event loop.
+        """
+        loop = running_loop()
+        with self._llms_lock:
+            if self._llms_pid != os.getpid():
+                self._llms_pid = os.getpid()
+                self._llms = {}
+            if (model, loop) not in self._llms:
+                # Clients of finished event loops are not reusable
+                self._llms = {key: llm for key, llm in self._llms.items() if key[1] is None or not key[1].is_closed()}
+                self._llms[(model, loop)] = self._build_llm(model, loop)
+            return self._llms[(model, loop)]
 
     # --------------------------
     # GENERIC LLM CALL HANDLER
     # --------------------------
+    def _bound_llm(
+        self,
+        response_format: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+    ):
+        """
+        Client constrained to the response schema via native structured outputs,
+        with a per-request timeout.
+        """
+        kwargs = {}
+        if response_format and settings.llm_structured_outputs:
+            kwargs["response_format"] = response_format_param(
+                response_format, strict=settings.llm_structured_outputs_strict
+            )
+        if timeout:
+            kwargs["timeout"] = llm_http.timeout(timeout)
+        llm = self._llm_for(model or self.model)
+        return llm.bind(**kwargs) if kwargs else llm
+
+    def _latency_key(
+        self, response_format: Optional[Dict[str, Any]] = None, model: Optional[str] = None, partial: bool = False
+    ) -> str:
+        """
+        Latency bucket per model and response schema (first top-level
+        property). Re-ask, fill and targeted prompts ask for a few fields
+        and get their own bucket.
+        """
+        properties = (response_format or {}).get("properties") or {"text": None}
+        key = f"{model or self.model}:{next(iter(properties))}"
+        return f"{key}:partial" if partial else key
+
+    @staticmethod
+    def _estimated_tokens(prompt: str) -> int:
+        """Tokens a request draws from the shared per-minute budget"""
+        return token_budget.count(prompt) + settings.llm_expected_completion_tokens
+
     def _call_llm(
         self,
         prompt: str,
         response_format: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        response_model=None,
+        partial: bool = False,
     ) -> str:
         """
         Internal helper to invoke OpenAI LLM and return raw text.
+        Identical requests are served from the response cache; only
+        answers that parse (and validate against response_model, when
+        given) are cached.
         """
+        started = time.perf_counter()
+        model = self._model()
+        cache_key = prompt_fingerprint(model, self.temperature, prompt, response_format)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logging.info("LLM response cache hit.")
+                llm_telemetry.record_call(model, prompt, cached, time.perf_counter() - started, cache_hit=True)
+                return cached
+
+        call: Dict[str, Any] = {"retries": 0}
         try:
             logging.info("Sending prompt to OpenAI model.")
-            response = self.llm.invoke(prompt)
-            logging.info(f"response openai {response}")
-            text = response.content if hasattr(response, "content") else str(response)
+            tokens = self._estimated_tokens(prompt)
+
+            latency_key = self._latency_key(response_format, model, partial)
+
+            def attempt(timeout: float):
+                return self._bound_llm(response_format, timeout, model).invoke(prompt)
+
+            def live() -> str:
+                response = llm_call_policy.call(
+                    attempt, latency_key, stats=call, slot=lambda: llm_rate_limiter.slot(tokens)
+                )
+                call["response"] = response
+                prompt_prefix_stats.record(response, latency_key)
+                return response.content if hasattr(response, "content") else str(response)
+
+            text = self.transport.complete(cache_key, prompt, response_format, live)
+            llm_telemetry.record_call(model, prompt, text, time.perf_counter() - started, **call)
+            if use_cache and self._cacheable(text, response_model):
+                self.cache.set(cache_key, text)
             return text
         except Exception as e:
+            llm_telemetry.record_call(model, prompt, None, time.perf_counter() - started, error=e, **call)
             logging.exception(f"OpenAI LLM call failed: {e}")
             raise RuntimeError(f"LLM call failed: {str(e)}")
 
+    async def _acall_llm(
+        self,
+        prompt: str,
+        response_format: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        response_model=None,
+        partial: bool = False,
+    ) -> str:
+        """
+        Async counterpart of _call_llm using the client's ainvoke.
+        """
+        started = time.perf_counter()
+        model = self._model()
+        cache_key = prompt_fingerprint(model, self.temperature, prompt, response_format)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logging.info("LLM response cache hit.")
+                llm_telemetry.record_call(model, prompt, cached, time.perf_counter() - started, cache_hit=True)
+                return cached
+
+        call: Dict[str, Any] = {"retries": 0}
+        try:
+            logging.info("Sending async prompt to OpenAI model.")
+            tokens = self._estimated_tokens(prompt)
+
+            latency_key = self._latency_key(response_format, model, partial)
+
+            async def attempt(timeout: float):
+                return await self._bound_llm(response_format, timeout, model).ainvoke(prompt)
+
+            async def live() -> str:
+                response = await llm_call_policy.acall(
+                    attempt, latency_key, stats=call, slot=lambda: llm_rate_limiter.aslot(tokens)
+                )
+                call["response"] = response
+                prompt_prefix_stats.record(response, latency_key)
+                return response.content if hasattr(response, "content") else str(response)
+
+            text = await self.transport.acomplete(cache_key, prompt, response_format, live)
+            llm_telemetry.record_call(model, prompt, text, time.perf_counter() - started, **call)
+            if use_cache and self._cacheable(text, response_model):
+                self.cache.set(cache_key, text)
+            return text
+        except Exception as e:
+            llm_telemetry.record_call(model, prompt, None, time.perf_counter() - started, error=e, **call)
+            logging.exception(f"OpenAI LLM async call failed: {e}")
+            raise RuntimeError(f"LLM call failed: {str(e)}")
+
+    def _cacheable(self, text: str, response_model=None) -> bool:
+        """Unparseable or invalid answers are not cached, so re-runs ask again"""
+        parsed = self._parse_to_json(text)
+        if not isinstance(parsed, (dict, list)) or (isinstance(parsed, dict) and "raw_response" in parsed):
+            return False
+        if response_model is None:
+            return True
+        # Answers the deterministic repairs can fix are fine to replay
+        return not repaired_errors(response_model, copy.deepcopy(parsed))
+
+    def _fit_budget(self, section: str, prompt, ocr_text: str, structured_data=None):
+        """
+        Shrink OCR text and pipeline data to the section's token budget.
+        """
+        ocr_text, structured_data, _ = token_budget.fit(
+            section, ocr_text, structured_data, template_tokens=prompt.static_tokens
+        )
+        return ocr_text, structured_data
+
     # --------------------------
     # ITEM EXTRACTION
     # --------------------------
+    def _items_prompt(self, ocr_text: str, declaration_type: str) -> str:
+        compiled = prompt_registry.get("items")
+        ocr_text, _ = self._fit_budget("items", compiled, ocr_text)
+        return compiled.render(ocr_text=ocr_text, declaration_type=declaration_type)
+
     def process_item_extract_document(
         self,
         ocr_text: str,
@@ -69,43 +284,168 @@ class OpenAIService:
     ) -> Dict[str, Any]:
         """
         Process OCR text to extract structured item information.
+        Documents over item_chunk_threshold_tokens are extracted in chunks.
         """
-        try:
-            prompt_template = get_items_extraction_prompt(ocr_text, declaration_type)
-            prompt = prompt_template.format(
-                ocr_text=ocr_text, declaration_type=declaration_type
-            )
+        with call_context(section="items"):
+            if self.needs_chunking(ocr_text):
+                return self.process_item_extract_chunked(ocr_text, declaration_type, response_format)
+            try:
+                prompt = self._items_prompt(ocr_text, declaration_type)
+                return self._routed_parse("items", ocr_text, prompt, response_format, item_model=CombinedItem)
+            except Exception as e:
+                logging.error(f"process_item_extract_document error: {e}")
+                return {"success": False, "error": str(e)}
 
-            response = self._call_llm(prompt, response_format)
-            parsed = self._parse_to_json(response)
-            return parsed
+    @staticmethod
+    def needs_chunking(ocr_text: str) -> bool:
+        return settings.item_chunking_enabled and token_budget.count(ocr_text) > settings.item_chunk_threshold_tokens
+
+    async def aprocess_item_extract_chunked(
+        self,
+        ocr_text: str,
+        declaration_type: str = "import",
+        response_format: Optional[Dict[str, Any]] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Map-reduce item extraction: items are extracted from page/table
+        aligned chunks concurrently and merged locally, dropping duplicates
+        from the chunk overlaps.
+
+        Failed chunks (errors or unparseable answers) are retried once. If
+        some still fail, the merged response carries "partial": True and
+        the 0-based "failed_chunks", so callers do not mistake it for a
+        complete extraction.
+        """
+        chunks, overlaps = chunk_text_with_overlaps(ocr_text)
+        logging.info(f"Extracting items from {len(chunks)} chunk(s)")
+        semaphore = asyncio.Semaphore(max_concurrency or settings.llm_max_concurrency)
+
+        async def extract(chunk: str) -> Any:
+            async with semaphore:
+                try:
+                    prompt = self._items_prompt(chunk, declaration_type)
+                    return await self._arouted_parse("items", chunk, prompt, response_format, item_model=CombinedItem)
+                except Exception as e:
+                    logging.error(f"aprocess_item_extract_chunked chunk error: {e}")
+                    return None
+
+        with call_context(section="items"):
+            # Tasks copy the context when gather creates them
+            responses = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+            failed = [index for index, response in enumerate(responses) if is_failed_response(response)]
+            if failed:
+                logging.warning(f"Retrying {len(failed)} failed item chunk(s): {failed}")
+                retried = await asyncio.gather(*(extract(chunks[index]) for index in failed))
+                for index, response in zip(failed, retried):
+                    responses[index] = response
+                failed = [index for index in failed if is_failed_response(responses[index])]
+
+        if len(failed) == len(chunks):
+            return {"success": False, "error": "Item extraction failed for every chunk"}
+        merged = merge_item_responses(responses, overlaps)
+        if failed:
+            logging.error(f"Item extraction incomplete: chunk(s) {failed} of {len(chunks)} failed")
+            merged["partial"] = True
+            merged["failed_chunks"] = failed
+        return merged
+
+    def process_item_extract_chunked(self, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Blocking wrapper around aprocess_item_extract_chunked for Celery tasks.
+        """
+        return asyncio.run(self.aprocess_item_extract_chunked(*args, **kwargs))
+
+    def stream_item_extract_document(
+        self,
+        ocr_text: str,
+        declaration_type: str = "import",
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+        """
+        Stream item extraction, yielding each item as soon as it is complete.
+
+        The generator's return value holds the document-level fields
+        (exporter, ports, totals). A cached response is replayed item by
+        item; streamed responses are not cached since the full text is
+        never held. Transports that record or replay responses get the
+        non-streaming call, replayed item by item. Failures before the
+        first chunk are retried by llm_call_policy; errors after that are
+        raised to the caller, which may already have consumed some items.
+        """
+        prompt = self._items_prompt(ocr_text, declaration_type)
+        model = self._model()
+        cached = self.cache.get(prompt_fingerprint(model, self.temperature, prompt, response_format))
+        if cached is None and not getattr(self.transport, "streams", False):
+            cached = self._call_llm(prompt, response_format)
+        elif cached is not None:
+            logging.info("LLM response cache hit.")
+            llm_telemetry.record_call(model, prompt, cached, 0.0, cache_hit=True, section="items")
+        if cached is not None:
+            parsed = self._parse_to_json(cached)
+            if not isinstance(parsed, dict) or "raw_response" in parsed:
+                raise RuntimeError("LLM item response could not be parsed")
+            yield from parsed.get("items") or []
+            return {k: v for k, v in parsed.items() if k != "items"}
+
+        logging.info("Streaming prompt to OpenAI model.")
+        parser = StreamingArrayParser("items")
+        call: Dict[str, Any] = {"retries": 0}
+        started = time.perf_counter()
+        usage = None
+
+        def attempt(timeout: float):
+            # Opening the stream and its first chunk are retried and timed;
+            # the read timeout then applies to every later chunk
+            chunks = iter(self._bound_llm(response_format, timeout, model).stream(prompt, stream_usage=True))
+            return chunks, next(chunks, None)
+
+        try:
+            # The slot is held until the stream ends
+            with llm_rate_limiter.slot(self._estimated_tokens(prompt)):
+                chunks, first = llm_call_policy.call(
+                    attempt, f"{self._latency_key(response_format, model)}:stream", stats=call, hedge=False
+                )
+                for chunk in itertools.chain([first] if first is not None else [], chunks):
+                    # The final chunk carries the token usage
+                    usage = chunk if getattr(chunk, "usage_metadata", None) else usage
+                    yield from parser.feed(chunk.content if hasattr(chunk, "content") else str(chunk))
         except Exception as e:
-            logging.error(f"process_item_extract_document error: {e}")
-            return {"success": False, "error": str(e)}
+            llm_telemetry.record_call(
+                model, prompt, None, time.perf_counter() - started, response=usage, error=e, section="items", **call
+            )
+            raise
+        llm_telemetry.record_call(
+            model, prompt, None, time.perf_counter() - started, response=usage, section="items", **call
+        )
+        return parser.close()
 
     # --------------------------
     # SECTION A
     # --------------------------
+    def _section_a_prompt(self, ocr_text: str, declaration_type: str, structured_data) -> Tuple[str, Dict[str, Any], Any]:
+        compiled = prompt_registry.get("section_a")
+        ocr_text, structured_data = self._fit_budget("section_a", compiled, ocr_text, structured_data)
+        prompt = compiled.render(
+            ocr_text=ocr_text,
+            declaration_type=declaration_type,
+            structured_pipeline_data=structured_data,
+        )
+        return prompt, B650_SECTION_A_RESPONSE_FORMAT, B650SectionAResponse
+
     def process_b650_section_a(
         self,
         ocr_text: str,
         declaration_type: str = "import",
         structured_data=None,
+        preprocessing_result=None,
     ) -> Dict[str, Any]:
         """
         Extract structured information for Section A.
         """
         try:
-            prompt_template = get_b650_section_a_extraction_prompt(ocr_text=ocr_text)
-            prompt = prompt_template.format(
-                ocr_text=ocr_text,
-                declaration_type=declaration_type,
-                structured_pipeline_data=structured_data,
-            )
-
-            response = self._call_llm(prompt, B650_SECTION_A_RESPONSE_FORMAT)
-            parsed = self._parse_to_json(response)
-            return parsed
+            request = self._section_a_prompt(ocr_text, declaration_type, structured_data)
+            return self._extract_section("section_a", ocr_text, request, preprocessing_result)
         except Exception as e:
             logging.error(f"process_b650_section_a error: {e}")
             return {"success": False, "error": str(e)}
@@ -113,38 +453,41 @@ class OpenAIService:
     # --------------------------
     # SECTION B
     # --------------------------
+    def _section_b_prompt(
+        self, ocr_text: str, declaration_type: str, structured_data, mode_of_transport: str
+    ) -> Tuple[str, Dict[str, Any], Any]:
+        response_model = None
+        if mode_of_transport.upper() == "SEA":
+            response_format = B650_SECTION_B_SEA_RESPONSE_FORMAT
+            response_model = B650SectionBSeaResponse
+        else:
+            response_format = SECTION_B_AIR_RESPONSE_FORMAT
+        # The sea template is used for both modes
+        compiled = prompt_registry.get("section_b_sea")
+
+        ocr_text, structured_data = self._fit_budget("section_b", compiled, ocr_text, structured_data)
+        prompt = compiled.render(
+            ocr_text=ocr_text,
+            declaration_type=declaration_type,
+            structured_pipeline_data=structured_data,
+        )
+        return prompt, response_format, response_model
+
     def process_b650_section_b(
         self,
         ocr_text: str,
         declaration_type: str = "import",
         structured_data=None,
         mode_of_transport: str = "SEA",
+        preprocessing_result=None,
     ) -> Dict[str, Any]:
         """
         Extract structured information for Section B.
         Supports SEA and AIR.
         """
         try:
-            if mode_of_transport.upper() == "SEA":
-                response_format = B650_SECTION_B_SEA_RESPONSE_FORMAT
-                prompt_template = get_b650_section_b_sea_extraction_prompt(
-                    ocr_text=ocr_text
-                )
-            else:
-                response_format = SECTION_B_AIR_RESPONSE_FORMAT
-                prompt_template = get_b650_section_b_sea_extraction_prompt(
-                    ocr_text=ocr_text
-                )
-
-            prompt = prompt_template.format(
-                ocr_text=ocr_text,
-                declaration_type=declaration_type,
-                structured_pipeline_data=structured_data,
-            )
-
-            response = self._call_llm(prompt, response_format)
-            parsed = self._parse_to_json(response)
-            return parsed
+            request = self._section_b_prompt(ocr_text, declaration_type, structured_data, mode_of_transport)
+            return self._extract_section("section_b", ocr_text, request, preprocessing_result)
         except Exception as e:
             logging.error(f"process_b650_section_b error: {e}")
             return {"success": False, "error": str(e)}
@@ -152,37 +495,427 @@ class OpenAIService:
     # --------------------------
     # SECTION C
     # --------------------------
+    def _section_c_prompt(self, ocr_text: str, declaration_type: str, structured_data) -> Tuple[str, Dict[str, Any], Any]:
+        compiled = prompt_registry.get("section_c")
+        ocr_text, structured_data = self._fit_budget("section_c", compiled, ocr_text, structured_data)
+        prompt = compiled.render(
+            ocr_text=ocr_text,
+            declaration_type=declaration_type,
+            structured_pipeline_data=structured_data,
+        )
+        return prompt, SECTION_C, B650SectionCResponse
+
     def process_b650_section_c(
         self,
         ocr_text: str,
         declaration_type: str = "import",
         structured_data=None,
+        preprocessing_result=None,
     ) -> Dict[str, Any]:
         """
         Extract structured information for Section C.
         """
         try:
-            prompt_template = get_b650_section_c_extraction_prompt(ocr_text=ocr_text)
-            prompt = prompt_template.format(
-                ocr_text=ocr_text,
-                declaration_type=declaration_type,
-                structured_pipeline_data=structured_data,
-            )
-
-            response = self._call_llm(prompt, SECTION_C)
-            parsed = self._parse_to_json(response)
-            return parsed
+            request = self._section_c_prompt(ocr_text, declaration_type, structured_data)
+            return self._extract_section("section_c", ocr_text, request, preprocessing_result)
         except Exception as e:
             logging.error(f"process_b650_section_c error: {e}")
             return {"success": False, "error": str(e)}
 
+    def section_request(
+        self,
+        section: str,
+        ocr_text: str,
+        structured_data=None,
+        declaration_type: str = "import",
+        mode_of_transport: str = "SEA",
+    ) -> Tuple[str, Dict[str, Any], Any]:
+        """
+        Prompt, response format and response model of a section extraction,
+        for callers that submit the request themselves (bulk batches).
+        """
+        if section == "section_a":
+            return self._section_a_prompt(ocr_text, declaration_type, structured_data)
+        if section == "section_b":
+            return self._section_b_prompt(ocr_text, declaration_type, structured_data, mode_of_transport)
+        if section == "section_c":
+            return self._section_c_prompt(ocr_text, declaration_type, structured_data)
+        raise ValueError(f"Unknown section: {section}")
+
+    def parse_section_response(self, response_text: str, response_format: Dict[str, Any], response_model) -> Any:
+        """Parse and validate a section response obtained outside _call_llm (bulk batches)"""
+        return self._validated(self._parse_to_json(response_text), response_model, response_format)
+
+    # --------------------------
+    # ITEMS + SECTIONS A, B, C (SINGLE CALL)
+    # --------------------------
+    def _combined_prompt(self, ocr_text: str, declaration_type: str, structured_data) -> Tuple[str, Dict[str, Any], Any]:
+        compiled = prompt_registry.get("combined")
+        ocr_text, structured_data = self._fit_budget("combined", compiled, ocr_text, structured_data)
+        prompt = compiled.render(
+            ocr_text=ocr_text,
+            declaration_type=declaration_type,
+            structured_pipeline_data=structured_data,
+        )
+        return prompt, B650_COMBINED_RESPONSE_FORMAT, B650CombinedResponse
+
+    def process_b650_combined(
+        self,
+        ocr_text: str,
+        declaration_type: str = "import",
+        structured_data=None,
+    ) -> Dict[str, Any]:
+        """
+        Extract items and Sections A, B and C in one call.
+
+        The document text is sent once instead of four times; the response
+        carries "header", "sea_transport_lines", "tariff_lines" and "items"
+        (each item with the "document_index" it was read from), so it can be
+        saved with the same per-section converters as the separate calls.
+        """
+        try:
+            prompt, response_format, response_model = self._combined_prompt(
+                ocr_text, declaration_type, structured_data
+            )
+            with call_context(section="combined"):
+                parsed = self._routed_parse(
+                    "combined", ocr_text, prompt, response_format, response_model,
+                    clean=lambda data: clean_list_field(data, "items", CombinedItem),
+                    item_model=CombinedItem,
+                )
+                return self._validated(parsed, response_model, response_format)
+        except Exception as e:
+            logging.error(f"process_b650_combined error: {e}")
+            return {"success": False, "error": str(e)}
+
+    # --------------------------
+    # ALL SECTIONS (CONCURRENT)
+    # --------------------------
+    async def aprocess_b650_sections(
+        self,
+        section_texts: Dict[str, str],
+        structured_data: Optional[Dict[str, Any]] = None,
+        declaration_type: str = "import",
+        mode_of_transport: str = "SEA",
+        max_concurrency: Optional[int] = None,
+        preprocessing_results: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Extract Sections A, B and C concurrently.
+
+        The three requests are independent, so they are issued together
+        (bounded by a semaphore) and wall-clock time is roughly that of the
+        slowest section. Each section first tries the same shortcuts as the
+        single-section calls (supplier template, near-duplicate, pre-LLM gate).
+
+        Args:
+            section_texts: OCR text per section ("section_a", "section_b", "section_c")
+            structured_data: Pre-LLM pipeline output per section
+            declaration_type: Declaration type passed to the prompts
+            mode_of_transport: SEA or AIR, selects the Section B schema
+            max_concurrency: Maximum in-flight requests (settings.llm_max_concurrency)
+            preprocessing_results: PreprocessingResult per section, for the pre-LLM gate
+
+        Returns:
+            Parsed response per section; failed sections carry
+            {"success": False, "error": ...}
+        """
+        structured_data = structured_data or {}
+        preprocessing_results = preprocessing_results or {}
+        semaphore = asyncio.Semaphore(max_concurrency or settings.llm_max_concurrency)
+        requests = {
+            "section_a": self._section_a_prompt(
+                section_texts["section_a"], declaration_type, structured_data.get("section_a")
+            ),
+            "section_b": self._section_b_prompt(
+                section_texts["section_b"], declaration_type, structured_data.get("section_b"), mode_of_transport
+            ),
+            "section_c": self._section_c_prompt(
+                section_texts["section_c"], declaration_type, structured_data.get("section_c")
+            ),
+        }
+
+        async def run(section: str, request: Tuple[str, Dict[str, Any], Any]) -> Dict[str, Any]:
+            prompt, response_format, response_model = request
+            text = section_texts[section]
+            async with semaphore:
+                try:
+                    with call_context(section=section):
+                        # Shortcuts and re-asks make blocking calls, keep them off the event loop
+                        shortcut = await asyncio.to_thread(
+                            self._shortcut, section, text, request, preprocessing_results.get(section)
+                        )
+                        if shortcut is not None:
+                            return shortcut
+                        parsed = await self._arouted_parse(section, text, prompt, response_format, response_model)
+                        return await asyncio.to_thread(self._finished, section, text, request, parsed)
+                except Exception as e:
+                    logging.error(f"aprocess_b650_sections {section} error: {e}")
+                    return {"success": False, "error": str(e)}
+
+        results = await asyncio.gather(
+            *(run(section, request) for section, request in requests.items())
+        )
+        return dict(zip(requests.keys(), results))
+
+    def process_b650_sections(self, *args, **kwargs) -> Dict[str, Dict[str, Any]]:
+        """
+        Blocking wrapper around aprocess_b650_sections for Celery tasks.
+        """
+        return asyncio.run(self.aprocess_b650_sections(*args, **kwargs))
+
+    def _extract_section(
+        self, section: str, ocr_text: str, request: Tuple[str, Dict[str, Any], Any], preprocessing_result
+    ) -> Any:
+        """
+        Extract a section from a learned supplier template, a near-duplicate
+        past document, the pre-LLM pipeline or the LLM, in that order. LLM
+        results teach the template and index the document.
+        """
+        with call_context(section=section):
+            shortcut = self._shortcut(section, ocr_text, request, preprocessing_result)
+            if shortcut is not None:
+                return shortcut
+            prompt, response_format, response_model = request
+            parsed = self._routed_parse(section, ocr_text, prompt, response_format, response_model)
+            return self._finished(section, ocr_text, request, parsed)
+
+    def _shortcut(
+        self, section: str, ocr_text: str, request: Tuple[str, Dict[str, Any], Any], preprocessing_result
+    ) -> Optional[Any]:
+        """Section result without the full prompt, or None"""
+        templated = self._templated(section, ocr_text, request)
+        if templated is not None:
+            return templated
+        reused = self._from_near_duplicate(section, ocr_text, request)
+        if reused is not None:
+            return reused
+        return self._gated(section, request, preprocessing_result)
+
+    def _finished(self, section: str, ocr_text: str, request: Tuple[str, Dict[str, Any], Any], parsed: Any) -> Any:
+        """Validate a full-prompt result, then teach the template and index the document"""
+        _, response_format, response_model = request
+        parsed = self._validated(parsed, response_model, response_format)
+        self._learn(section, ocr_text, response_format, parsed)
+        semantic_cache.store(section, ocr_text, parsed)
+        return parsed
+
+    # --------------------------
+    # MODEL ROUTING
+    # --------------------------
+    @staticmethod
+    def _escalation_reason(parsed: Any, response_model, item_model=None) -> Optional[str]:
+        """Why a fast-tier answer is not good enough, or None"""
+        if not isinstance(parsed, dict) or "raw_response" in parsed:
+            return "unparseable response"
+        if response_model is not None:
+            errors = repaired_errors(response_model, parsed)
+            if errors:
+                return f"{len(errors)} invalid field(s)"
+        if item_model is not None:
+            items = parsed.get("items")
+            if not isinstance(items, list):
+                return "no item list"
+            invalid = sum(
+                1 for item in items
+                if not isinstance(item, dict) or repaired_errors(item_model, item)
+            )
+            if invalid:
+                return f"{invalid} invalid item(s)"
+        return None
+
+    def _routed_parse(
+        self,
+        section: str,
+        ocr_text: str,
+        prompt: str,
+        response_format: Optional[Dict[str, Any]],
+        response_model=None,
+        clean: Optional[Callable[[Dict[str, Any]], None]] = None,
+        item_model=None,
+    ) -> Any:
+        """
+        Ask the model tier the request's complexity calls for and parse the
+        response (clean then tidies a parsed dict). A fast answer that
+        fails, does not parse, fails schema validation or has an "items"
+        element failing item_model is asked again of the strong model,
+        before any field re-ask.
+        """
+        # Lists cleaned afterwards may hold invalid elements: cache on parse only
+        cache_model = response_model if clean is None else None
+
+        def ask() -> Any:
+            return self._parse_to_json(self._call_llm(prompt, response_format, response_model=cache_model))
+
+        def tidy(parsed: Any) -> Any:
+            if clean is not None and isinstance(parsed, dict):
+                clean(parsed)
+            return parsed
+
+        if model_router.route(section, ocr_text).tier == FAST:
+            try:
+                with model_router.use(FAST):
+                    parsed = ask()
+                # Checked before cleaning, which would null the invalid item fields
+                reason = self._escalation_reason(parsed, response_model, item_model)
+            except Exception as e:
+                reason = f"fast model call failed ({e})"
+            if reason is None:
+                return tidy(parsed)
+            model_router.record_escalation(section, reason)
+        return tidy(ask())
+
+    async def _arouted_parse(
+        self,
+        section: str,
+        ocr_text: str,
+        prompt: str,
+        response_format: Optional[Dict[str, Any]],
+        response_model=None,
+        item_model=None,
+    ) -> Any:
+        """Async counterpart of _routed_parse"""
+        if model_router.route(section, ocr_text).tier == FAST:
+            try:
+                with model_router.use(FAST):
+                    parsed = self._parse_to_json(
+                        await self._acall_llm(prompt, response_format, response_model=response_model)
+                    )
+                reason = self._escalation_reason(parsed, response_model, item_model)
+            except Exception as e:
+                reason = f"fast model call failed ({e})"
+            if reason is None:
+                return parsed
+            model_router.record_escalation(section, reason)
+        return self._parse_to_json(await self._acall_llm(prompt, response_format, response_model=response_model))
+
+    # --------------------------
+    # SUPPLIER TEMPLATES
+    # --------------------------
+    def _templated(self, section: str, ocr_text: str, request: Tuple[str, Dict[str, Any], Any]) -> Optional[Any]:
+        """
+        Build a section from the supplier's learned template, asking the
+        LLM only for the fields the template does not cover. Returns None
+        (use the full prompt) when there is no usable template or its
+        values fail schema validation.
+        """
+        prompt, response_format, response_model = request
+        if response_model is None:
+            return None
+        values = supplier_template_store.extract(ocr_text, section)
+        if values is None:
+            return None
+        wrapper = next(iter(response_format["properties"]))
+        missing = [name for name in response_format["properties"][wrapper].get("properties", {}) if name not in values]
+        if missing:
+            schema = subset_schema(response_format, [(wrapper, name) for name in missing])
+            parsed = self._parse_to_json(self._call_llm(build_template_fill_prompt(prompt, missing), schema, partial=True))
+            filled = parsed.get(wrapper) if isinstance(parsed, dict) else None
+            filled = filled if isinstance(filled, dict) else {}
+            values = {**{name: filled.get(name) for name in missing if filled.get(name) is not None}, **values}
+        result = {wrapper: values}
+        errors = repaired_errors(response_model, result)
+        if errors:
+            logging.info(f"Supplier template for {section} failed validation ({len(errors)} field(s)), using the LLM")
+            return None
+        return result
+
+    @staticmethod
+    def _learn(section: str, ocr_text: str, response_format: Dict[str, Any], parsed: Any) -> None:
+        wrapper = next(iter(response_format["properties"]))
+        values = parsed.get(wrapper) if isinstance(parsed, dict) else None
+        if isinstance(values, dict):
+            supplier_template_store.learn(ocr_text, section, values)
+
+    # --------------------------
+    # NEAR-DUPLICATE DOCUMENTS
+    # --------------------------
+    def _from_near_duplicate(self, section: str, ocr_text: str, request: Tuple[str, Dict[str, Any], Any]) -> Optional[Any]:
+        """
+        Reuse the extraction of a near-duplicate past document, asking the
+        LLM only for the values that no longer appear in the text.
+        """
+        prompt, response_format, response_model = request
+        if response_model is None:
+            return None
+        match = semantic_cache.lookup(section, ocr_text)
+        if match is None:
+            return None
+        similarity, past = match
+        wrapper = next(iter(response_format["properties"]))
+        values = past.get(wrapper) if isinstance(past, dict) else None
+        if not isinstance(values, dict):
+            return None
+
+        kept, changed = semantic_cache.split_skeleton(values, ocr_text)
+        logging.info(f"Near-duplicate {section} ({similarity:.2f}): {len(kept)} field(s) reused, {len(changed)} re-extracted")
+        if changed:
+            schema = subset_schema(response_format, [(wrapper, name) for name in changed])
+            parsed = self._parse_to_json(self._call_llm(build_fill_prompt(prompt, changed), schema, partial=True))
+            filled = parsed.get(wrapper) if isinstance(parsed, dict) else None
+            filled = filled if isinstance(filled, dict) else {}
+            kept.update({name: filled.get(name) for name in changed})
+        # Not indexed: the past document already stands for this layout
+        return self._validated({wrapper: kept}, response_model, response_format)
+
+    # --------------------------
+    # PRE-LLM GATE
+    # --------------------------
+    def _gated(self, section: str, request: Tuple[str, Dict[str, Any], Any], preprocessing_result) -> Optional[Any]:
+        """
+        Build a section locally, or with a prompt for only the fields the
+        pre-LLM pipeline did not detect. Returns None when the regular
+        full prompt should run.
+        """
+        prompt, response_format, response_model = request
+        if preprocessing_result is None or response_model is None:
+            return None
+        wrapper = next(iter(response_format["properties"]))
+        fields = list(response_format["properties"][wrapper].get("properties", {}))
+        decision = prellm_gate.decide(section, preprocessing_result, fields)
+        full_tokens = token_budget.count(prompt)
+        if decision.mode == "full":
+            prellm_gate.record(decision, full_tokens)
+            return None
+        if decision.mode == "skip":
+            prellm_gate.record(decision, full_tokens)
+            return self._validated({wrapper: dict(decision.known)}, response_model, response_format)
+
+        targeted_prompt = build_targeted_prompt(prompt, decision.missing, decision.known)
+        prellm_gate.record(decision, full_tokens, token_budget.count(targeted_prompt))
+        schema = subset_schema(response_format, [(wrapper, name) for name in decision.missing])
+        parsed = self._parse_to_json(self._call_llm(targeted_prompt, schema, partial=True))
+        values = parsed.get(wrapper, parsed) if isinstance(parsed, dict) else {}
+        merged = {wrapper: {**(values if isinstance(values, dict) else {}), **decision.known}}
+        return self._validated(merged, response_model, response_format)
+
     # --------------------------
     # UTILITY PARSERS
     # --------------------------
+    def _validated(self, parsed: Any, response_model, response_format: Dict[str, Any]) -> Any:
+        """
+        Validate a parsed response against its pydantic model, re-asking
+        only the fields that fail.
+        """
+        if response_model is None:
+            return parsed
+        return validate_with_reask(
+            parsed,
+            response_model,
+            response_format,
+            lambda prompt, schema: self._parse_to_json(self._call_llm(prompt, schema, partial=True)),
+        )
+
     def _parse_to_json(self, response_text: str) -> Any:
         """
         Attempt to extract JSON object from LLM text output.
         """
+        # Structured outputs return bare JSON
+        try:
+            return json.loads(response_text)
+        except (json.JSONDecodeError, TypeError):
+            pass
+
         try:
             # Try to find JSON block in markdown style responses
             if "```json" in response_text:
@@ -0,0 +1,291 @@
+"""
+Bulk re-extraction through batch files.
+
+Re-running a section over thousands of historical processes (after a
+prompt change) should not be thousands of interactive calls. Prompts are
+rendered into a JSONL file in the provider's batch format (one
+chat-completions request per line, keyed by ``custom_id``) and submitted
+through a batch client:
+
+- ``openai``: the provider Batch API (separate, higher limits; results
+  within the completion window).
+- ``local``: an in-process stand-in that executes every request of the
+  file itself, in the rate limiter's bulk lane so interactive extraction
+  keeps its reserved share, and writes an output file in the same
+  format. Interrupted runs resume from the requests already answered.
+  Only successful answers count as answered: failed requests (rate
+  limits or timeouts that outlasted the call policy's retries) are
+  retried ``llm_batch_failed_retries`` more times in each run and again
+  on resume, with the new answer appended after the error line.
+
+Output files are ingested with a checkpoint (lines committed so far), so
+an interrupted ingest resumes where it stopped.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from config.settings import settings
+from services.llm_http import llm_http
+from services.llm_resilience import llm_call_policy
+from services.llm_telemetry import call_context, llm_telemetry
+from services.rate_limiter import BULK, llm_rate_limiter
+from services.structured_output import response_format_param
+from services.token_budget import token_budget
+
+COMPLETED = "completed"
+FAILED = "failed"
+IN_PROGRESS = "in_progress"
+
+
+def batch_request(
+    custom_id: str,
+    model: str,
+    temperature: float,
+    prompt: str,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """One line of a chat-completions batch file"""
+    body: Dict[str, Any] = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if response_format and settings.llm_structured_outputs:
+        body["response_format"] = response_format_param(response_format, strict=settings.llm_structured_outputs_strict)
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+
+def write_batch(path: str, requests: Iterable[Dict[str, Any]]) -> int:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = 0
+    with open(path, "w") as f:
+        for request in requests:
+            f.write(json.dumps(request) + "\n")
+            count += 1
+    return count
+
+
+def _openai_client(async_client: bool = False):
+    from openai import AsyncOpenAI, OpenAI
+
+    stub = settings.llm_transport.lower() == "stub"
+    return (AsyncOpenAI if async_client else OpenAI)(
+        api_key=settings.OPENAI_API_KEY or ("stub" if stub else ""),
+        base_url=settings.llm_stub_url if stub else settings.OPENAI_BASE_URL,
+        max_retries=0,
+        timeout=llm_http.timeout(),
+        http_client=llm_http.async_client() if async_client else llm_http.client(),
+    )
+
+
+# --------------------------
+# BATCH CLIENTS
+# --------------------------
+class LocalBatchClient:
+    """Stand-in for the provider Batch API that processes the file in-process"""
+
+    def __init__(self, batch_dir: Optional[str] = None, concurrency: Optional[int] = None):
+        self.batch_dir = batch_dir or settings.llm_batch_dir
+        self.concurrency = concurrency or settings.llm_batch_concurrency
+
+    def output_path(self, batch_id: str) -> str:
+        return os.path.join(self.batch_dir, f"{batch_id}_output.jsonl")
+
+    def _input_path(self, batch_id: str) -> str:
+        return os.path.join(self.batch_dir, f"{batch_id}_input.jsonl")
+
+    def _done_path(self, batch_id: str) -> str:
+        return os.path.join(self.batch_dir, f"{batch_id}.done")
+
+    def submit(self, input_path: str) -> str:
+        """Process every request of the file; returns the batch id"""
+        batch_id = f"local_{uuid.uuid4().hex}"
+        os.makedirs(self.batch_dir, exist_ok=True)
+        os.replace(input_path, self._input_path(batch_id))
+        logging.info(f"Processing local batch {batch_id} from {input_path}")
+        self.resume(batch_id)
+        return batch_id
+
+    def resume(self, batch_id: str) -> None:
+        """Answer the requests of a batch that have no successful output line yet"""
+        with open(self._input_path(batch_id), "r") as f:
+            requests = [json.loads(line) for line in f]
+        self._end_partial_line(self.output_path(batch_id))
+        for attempt in range(settings.llm_batch_failed_retries + 1):
+            done = succeeded_ids(self.output_path(batch_id))
+            pending = [request for request in requests if request["custom_id"] not in done]
+            if not pending:
+                break
+            logging.info(
+                f"Batch {batch_id}: {len(pending)} request(s) to process, {len(done)} already done"
+                + (f" (retry {attempt})" if attempt else "")
+            )
+            with llm_rate_limiter.lane(BULK):
+                asyncio.run(self._process(batch_id, pending))
+        open(self._done_path(batch_id), "w").close()
+
+    @staticmethod
+    def _end_partial_line(path: str) -> None:
+        """
+        Terminate a line left incomplete by an interrupted writer, so the
+        next answer starts on a line of its own. The partial line stays
+        (iter_results skips it) and line numbers already checkpointed
+        keep pointing at the same lines.
+        """
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    async def _process(self, batch_id: str, requests) -> None:
+        client = _openai_client(async_client=True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with open(self.output_path(batch_id), "a") as out:
+
+            async def run(request: Dict[str, Any]) -> None:
+                async with semaphore:
+                    line = await self._complete(client, request)
+                # Single-threaded event loop: whole lines, flushed per request
+                out.write(json.dumps(line) + "\n")
+                out.flush()
+
+            await asyncio.gather(*(run(request) for request in requests))
+
+    async def _complete(self, client, request: Dict[str, Any]) -> Dict[str, Any]:
+        body = request["body"]
+        prompt = body["messages"][-1]["content"]
+        tokens = token_budget.count(prompt) + settings.llm_expected_completion_tokens
+        stats: Dict[str, Any] = {"retries": 0}
+        started = time.perf_counter()
+
+        async def attempt(timeout: float):
+            return await client.chat.completions.create(**body, timeout=llm_http.timeout(timeout))
+
+        with call_context(section=request["custom_id"].split(":", 1)[0]):
+            try:
+                response = await llm_call_policy.acall(
+                    attempt, f"{body['model']}:batch", stats=stats, slot=lambda: llm_rate_limiter.aslot(tokens)
+                )
+            except Exception as e:
+                llm_telemetry.record_call(body["model"], prompt, None, time.perf_counter() - started, error=e, **stats)
+                return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+            text = response.choices[0].message.content
+            llm_telemetry.record_call(body["model"], prompt, text, time.perf_counter() - started, **stats)
+        return {
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "body": response.model_dump()},
+            "error": None,
+        }
+
+    def status(self, batch_id: str) -> str:
+        # Unfinished only when an earlier submit() or resume() was interrupted
+        if os.path.exists(self._done_path(batch_id)):
+            return COMPLETED
+        return IN_PROGRESS if os.path.exists(self._input_path(batch_id)) else FAILED
+
+    def fetch_output(self, batch_id: str) -> str:
+        return self.output_path(batch_id)
+
+
+class OpenAIBatchClient:
+    """Provider Batch API"""
+
+    def __init__(self, batch_dir: Optional[str] = None):
+        self.batch_dir = batch_dir or settings.llm_batch_dir
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = _openai_client()
+        return self._client
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id, endpoint="/v1/chat/completions", completion_window="24h"
+        )
+        logging.info(f"Submitted batch {batch.id} from {input_path}")
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        status = self.client.batches.retrieve(batch_id).status
+        if status == "completed":
+            return COMPLETED
+        if status in ("failed", "expired", "cancelled"):
+            return FAILED
+        return IN_PROGRESS
+
+    def fetch_output(self, batch_id: str) -> str:
+        """Download the output file once; returns its local path"""
+        path = os.path.join(self.batch_dir, f"{batch_id}_output.jsonl")
+        if not os.path.exists(path):
+            os.makedirs(self.batch_dir, exist_ok=True)
+            output_file_id = self.client.batches.retrieve(batch_id).output_file_id
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            self.client.files.content(output_file_id).write_to_file(tmp_path)
+            os.replace(tmp_path, path)
+        return path
+
+
+def build_batch_client():
+    if settings.llm_batch_backend.lower() == "openai":
+        return OpenAIBatchClient()
+    return LocalBatchClient()
+
+
+# --------------------------
+# RESULTS
+# --------------------------
+def iter_results(output_path: str, start_line: int = 0) -> Iterator[Tuple[int, str, Optional[str], Optional[str]]]:
+    """
+    Yield (line number, custom_id, response text, error) for each output
+    line from start_line on. A truncated last line (interrupted writer)
+    is skipped.
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "r") as f:
+        for line_no, line in enumerate(f):
+            if line_no < start_line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logging.warning(f"Skipping incomplete batch output line {line_no} in {output_path}")
+                continue
+            response = entry.get("response") or {}
+            if entry.get("error") or response.get("status_code") != 200:
+                yield line_no, entry["custom_id"], None, json.dumps(entry.get("error") or response)
+                continue
+            yield line_no, entry["custom_id"], response["body"]["choices"][0]["message"]["content"], None
+
+
+def succeeded_ids(output_path: str) -> set:
+    """custom_ids with a successful output line; a failed request may be answered by a later line"""
+    return {custom_id for _, custom_id, text, error in iter_results(output_path) if error is None}
+
+
+def read_checkpoint(output_path: str) -> int:
+    try:
+        with open(f"{output_path}.progress", "r") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def write_checkpoint(output_path: str, next_line: int) -> None:
+    path = f"{output_path}.progress"
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(next_line))
+    os.replace(tmp_path, path)
@@ -0,0 +1,242 @@
+"""
+Local page classifier for shipping documents.
+
+Tags every page of the OCR output as an invoice, bill of lading, packing
+list or other, using keyword features and a small linear (softmax) model.
+The model runs fully offline; weights ship with the module and can be
+retrained from labelled pages with ``DocumentClassifier.fit`` and saved
+to JSON.
+"""
+
+import re
+import json
+import math
+import os
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+
+
+INVOICE = "invoice"
+BILL_OF_LADING = "bill_of_lading"
+PACKING_LIST = "packing_list"
+OTHER = "other"
+
+LABELS = [INVOICE, BILL_OF_LADING, PACKING_LIST, OTHER]
+
+# Which page types each extraction stage needs
+SECTION_ROUTES = {
+    "items": [INVOICE, PACKING_LIST],
+    "section_a": [INVOICE, BILL_OF_LADING],
+    "section_b": [BILL_OF_LADING],
+    "section_c": [INVOICE, PACKING_LIST],
+}
+
+# Keyword features; each feature counts occurrences of its pattern on a page
+FEATURE_PATTERNS = {
+    "commercial_invoice": r"commercial\s*invoice",
+    "invoice_no": r"invoice\s*(?:no|number|#)",
+    "invoice": r"\binvoice\b",
+    "unit_price": r"unit\s*price",
+    "amount": r"\bamount\b",
+    "total": r"\b(?:total|ttl)\b",
+    "incoterm": r"\b(?:fob|cif|cfr|exw|ddp|dap|fca)\b",
+    "currency": r"\b(?:usd|aud|eur|cny|rmb)\b",
+    "bill_of_lading": r"bill\s*of\s*lading|\bb\s*/\s*l\b",
+    "shipper": r"\bshipper\b",
+    "consignee": r"\bconsignee\b",
+    "notify_party": r"notify\s*party",
+    "vessel_voyage": r"\bvessel\b|\bvoyage\b",
+    "port_of": r"port\s*of\s*(?:loading|discharge)|place\s*of\s*(?:receipt|delivery)",
+    "freight": r"\bfreight\b",
+    "container": r"\b[A-Z]{4}\d{7}\b|\bcontainer\b",
+    "packing_list": r"packing\s*list",
+    "gross_net_weight": r"\b(?:gross|net)\s*(?:weight|wt)\b|\bn\.?w\.?\b|\bg\.?w\.?\b",
+    "cartons": r"\b(?:cartons?|ctns?|pallets?|pkgs?)\b",
+    "measurement": r"\bcbm\b|measurement",
+    "carton_no": r"carton\s*no|c/no",
+}
+
+_COMPILED_FEATURES = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in FEATURE_PATTERNS.items()]
+FEATURE_NAMES = [name for name, _ in _COMPILED_FEATURES]
+
+# Default weights (label -> feature -> weight, plus "__bias__")
+DEFAULT_WEIGHTS = {
+    INVOICE: {
+        "__bias__": 0.0,
+        "commercial_invoice": 3.0, "invoice_no": 2.0, "invoice": 1.2, "unit_price": 1.8,
+        "amount": 1.0, "total": 0.6, "incoterm": 0.8, "currency": 0.8,
+        "bill_of_lading": -1.5, "vessel_voyage": -0.5, "packing_list": -1.5, "carton_no": -0.5,
+    },
+    BILL_OF_LADING: {
+        "__bias__": 0.0,
+        "bill_of_lading": 3.0, "shipper": 1.2, "consignee": 1.0, "notify_party": 2.0,
+        "vessel_voyage": 1.2, "port_of": 1.5, "freight": 0.6, "container": 0.8, "measurement": 0.4,
+        "unit_price": -1.2, "commercial_invoice": -1.5, "packing_list": -1.0,
+    },
+    PACKING_LIST: {
+        "__bias__": 0.0,
+        "packing_list": 3.5, "gross_net_weight": 1.2, "cartons": 0.8, "measurement": 0.6,
+        "carton_no": 1.5,
+        "unit_price": -1.2, "amount": -0.5, "bill_of_lading": -1.2, "commercial_invoice": -1.5,
+    },
+    OTHER: {
+        "__bias__": 1.0,
+    },
+}
+
+# Page markers written by OCRService.extract_complete_document_content
+_PAGE_MARKER = re.compile(r"^=== (?:OCR )?Page[ _](\d+)(?:_Table_\d+)? ===\s*$", re.MULTILINE)
+
+
+@dataclass
+class PageClassification:
+    """Classified page of a document"""
+    page_number: Optional[int]
+    label: str
+    confidence: float
+    text: str
+
+
+def split_pages(ocr_text: str) -> List[Tuple[Optional[int], str]]:
+    """
+    Split OCR output into ``(page_number, text)`` chunks on its page markers.
+    Text before the first marker is kept with page_number None.
+    """
+    if not ocr_text:
+        return []
+    chunks = []
+    markers = list(_PAGE_MARKER.finditer(ocr_text))
+    if not markers:
+        return [(None, ocr_text)]
+    preamble = ocr_text[:markers[0].start()]
+    if preamble.strip():
+        chunks.append((None, preamble))
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(ocr_text)
+        chunks.append((int(marker.group(1)), ocr_text[marker.start():end]))
+    return chunks
+
+
+class DocumentClassifier:
+    """Keyword-feature softmax classifier for document pages"""
+
+    def __init__(self, weights: Optional[Dict[str, Dict[str, float]]] = None, weights_path: Optional[str] = None):
+        self.weights = weights or self._load_weights(weights_path or settings.document_classifier_weights_path)
+
+    @staticmethod
+    def _load_weights(path: Optional[str]) -> Dict[str, Dict[str, float]]:
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"Could not load classifier weights from {path}: {e}")
+        return DEFAULT_WEIGHTS
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.weights, f, indent=2)
+
+    # --------------------------
+    # FEATURES / INFERENCE
+    # --------------------------
+    @staticmethod
+    def features(text: str) -> Dict[str, float]:
+        """Log-scaled keyword counts for a page"""
+        return {name: math.log1p(len(pattern.findall(text))) for name, pattern in _COMPILED_FEATURES}
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        return self.predict_proba_from_features(self.features(text))
+
+    def predict_proba_from_features(self, feats: Dict[str, float]) -> Dict[str, float]:
+        scores = {}
+        for label in LABELS:
+            label_weights = self.weights.get(label, {})
+            scores[label] = label_weights.get("__bias__", 0.0) + sum(
+                label_weights.get(name, 0.0) * value for name, value in feats.items() if value
+            )
+        top = max(scores.values())
+        exps = {label: math.exp(score - top) for label, score in scores.items()}
+        norm = sum(exps.values())
+        return {label: value / norm for label, value in exps.items()}
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        proba = self.predict_proba(text)
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+    def classify_pages(self, ocr_text: str) -> List[PageClassification]:
+        """
+        Classify every page of a document's OCR output.
+
+        The same page can appear several times (direct text, comprehensive
+        OCR, tables), so all chunks of a page share the label computed from
+        their combined text.
+        """
+        chunks = split_pages(ocr_text)
+        by_page: Dict[Optional[int], List[str]] = {}
+        for page_number, text in chunks:
+            by_page.setdefault(page_number, []).append(text)
+
+        labels = {page_number: self.classify("\n".join(texts)) for page_number, texts in by_page.items()}
+        return [
+            PageClassification(page_number, labels[page_number][0], labels[page_number][1], text)
+            for page_number, text in chunks
+        ]
+
+    # --------------------------
+    # ROUTING
+    # --------------------------
+    def select_text(self, ocr_texts: Sequence[str], section: str) -> str:
+        """
+        Concatenate only the pages relevant to an extraction section.
+
+        Falls back to the full text when no page matches, so a misclassified
+        upload never produces an empty prompt.
+        """
+        wanted = SECTION_ROUTES.get(section)
+        full_text = "".join(str(text) for text in ocr_texts if text)
+        if not wanted:
+            return full_text
+
+        selected = []
+        for ocr_text in ocr_texts:
+            if not ocr_text:
+                continue
+            for page in self.classify_pages(str(ocr_text)):
+                if page.label in wanted:
+                    selected.append(page.text)
+
+        if not selected:
+            return full_text
+        logging.info(f"{section}: routed {len(''.join(selected))} of {len(full_text)} chars")
+        return "\n".join(selected)
+
+    # --------------------------
+    # OFFLINE TRAINING
+    # --------------------------
+    def fit(self, samples: Sequence[Tuple[str, str]], epochs: int = 50, learning_rate: float = 0.1, l2: float = 0.001) -> None:
+        """
+        Train the softmax weights from ``(page_text, label)`` samples with
+        plain stochastic gradient descent. Intended for offline use; the
+        result can be persisted with ``save``.
+        """
+        data = [(self.features(text), label) for text, label in samples if label in LABELS]
+        weights = {label: {"__bias__": 0.0, **{name: 0.0 for name in FEATURE_NAMES}} for label in LABELS}
+        self.weights = weights
+        for _ in range(epochs):
+            for feats, target in data:
+                proba = self.predict_proba_from_features(feats)
+                for label in LABELS:
+                    grad = proba[label] - (1.0 if label == target else 0.0)
+                    label_weights = weights[label]
+                    label_weights["__bias__"] -= learning_rate * grad
+                    for name, value in feats.items():
+                        label_weights[name] -= learning_rate * (grad * value + l2 * label_weights[name])
+
+
+# Global instance
+document_classifier = DocumentClassifier()
@@ -0,0 +1,140 @@
+"""
+Map-reduce helpers for item extraction from very long documents.
+
+OCR text is split at page and table boundaries into chunks that fit a
+token limit, each chunk carrying the last few lines of its predecessor so
+rows straddling a boundary are seen whole. Items are extracted per chunk
+and merged locally: items repeated in the overlap of adjacent chunks (the
+item's title is in the shared lines) are dropped by their normalized
+title, price and weight, and document-level fields take the first value
+found (totals the last, as invoices state them at the end).
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from services.token_budget import split_blocks, token_budget
+
+ItemKey = Tuple[str, Optional[float], Optional[float]]
+
+# Document-level fields stated at the end of a document
+TOTAL_FIELDS = {"total_weight", "total_weight_unit", "total_price"}
+
+
+def _split_long_block(block: str, max_tokens: int) -> List[str]:
+    """Split a block that exceeds the chunk limit on line boundaries"""
+    parts, current, used = [], [], 0
+    for line in block.splitlines():
+        cost = token_budget.count(line) + 1
+        if current and used + cost > max_tokens:
+            parts.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        parts.append("\n".join(current))
+    return parts
+
+
+def chunk_text(text: str, max_tokens: Optional[int] = None, overlap_lines: Optional[int] = None) -> List[str]:
+    """
+    Split OCR text into chunks of at most max_tokens (plus overlap) at
+    page/table markers, repeating the last overlap_lines of each chunk at
+    the start of the next.
+    """
+    return chunk_text_with_overlaps(text, max_tokens, overlap_lines)[0]
+
+
+def chunk_text_with_overlaps(
+    text: str, max_tokens: Optional[int] = None, overlap_lines: Optional[int] = None
+) -> Tuple[List[str], List[str]]:
+    """chunk_text, plus the lines each chunk repeats from its predecessor ("" for the first)"""
+    max_tokens = max_tokens or settings.item_chunk_tokens
+    overlap_lines = settings.item_chunk_overlap_lines if overlap_lines is None else overlap_lines
+
+    blocks = []
+    for block in split_blocks(token_budget.dedupe_blocks(text)):
+        if token_budget.count(block) > max_tokens:
+            blocks.extend(_split_long_block(block, max_tokens))
+        elif block.strip():
+            blocks.append(block)
+
+    chunks, current, used = [], [], 0
+    for block in blocks:
+        cost = token_budget.count(block)
+        if current and used + cost > max_tokens:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(block)
+        used += cost
+    if current:
+        chunks.append("\n".join(current))
+
+    overlaps = [""] * len(chunks)
+    if overlap_lines:
+        for i in range(len(chunks) - 1, 0, -1):
+            tail = chunks[i - 1].splitlines()[-overlap_lines:]
+            overlaps[i] = "\n".join(tail)
+            chunks[i] = "\n".join(tail + [chunks[i]])
+    return chunks, overlaps
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return round(float(str(value).replace(",", "")), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalized(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def item_key(item: Dict[str, Any]) -> ItemKey:
+    title = _normalized(str(item.get("item_title") or ""))
+    return title, _number(item.get("item_price")), _number(item.get("item_weight"))
+
+
+def is_failed_response(response: Any) -> bool:
+    """Chunk responses that failed or did not parse as JSON"""
+    return not isinstance(response, dict) or "raw_response" in response or response.get("success") is False
+
+
+def merge_item_responses(responses: List[Dict[str, Any]], overlaps: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Reduce per-chunk item responses (in chunk order) into one response.
+
+    An item is dropped as an overlap duplicate only when the same key was
+    extracted from the preceding chunk and its title lies in the lines
+    the chunk shares with that predecessor (overlaps[i]), so genuinely
+    repeated lines are kept. Failed responses are skipped; callers report
+    them (see is_failed_response).
+    """
+    merged: Dict[str, Any] = {"items": []}
+    previous_keys: Counter = Counter()
+    for index, response in enumerate(responses):
+        if is_failed_response(response):
+            previous_keys = Counter()
+            continue
+        overlap = _normalized(overlaps[index]) if overlaps else None
+        for field, value in response.items():
+            if field == "items" or value is None:
+                continue
+            if field in TOTAL_FIELDS or merged.get(field) is None:
+                merged[field] = value
+
+        keys: Counter = Counter()
+        for item in response.get("items") or []:
+            if not isinstance(item, dict):
+                continue
+            key = item_key(item)
+            keys[key] += 1
+            in_overlap = overlap is None or not key[0] or key[0] in overlap
+            if previous_keys[key] > 0 and in_overlap:
+                previous_keys[key] -= 1
+                continue
+            merged["items"].append(item)
+        previous_keys = keys
+    return merged
@@ -0,0 +1,115 @@
+"""
+Incremental parsing of streamed JSON responses.
+
+Yields the elements of a top-level array (e.g. ``items``) as soon as each
+one is complete, while the rest of the response is still being
+generated. Only the element currently being read and the small
+document-level remainder (the "skeleton", with the array left empty) are
+buffered, never the full response text.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+
+class StreamingArrayParser:
+    """Parse the object elements of one top-level array key from a JSON stream"""
+
+    def __init__(self, key: str = "items"):
+        self.key = key
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._element: Optional[List[str]] = None
+        self._skeleton: List[str] = []
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of response text; returns the elements it completed"""
+        completed: List[Dict[str, Any]] = []
+        for ch in chunk:
+            self._consume(ch, completed)
+        return completed
+
+    def close(self) -> Dict[str, Any]:
+        """Document-level fields of the response, with the array emptied"""
+        try:
+            document = json.loads("".join(self._skeleton))
+            return document if isinstance(document, dict) else {}
+        except ValueError:
+            logging.warning("Streamed response did not close as valid JSON.")
+            return {}
+
+    def _consume(self, ch: str, completed: List[Dict[str, Any]]) -> None:
+        if self._done:
+            return
+        in_element = self._element is not None
+        if in_element:
+            self._element.append(ch)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_string = "".join(self._string)
+            elif self._depth == 1:
+                self._string.append(ch)
+            if not in_element:
+                self._skeleton.append(ch)
+            return
+
+        if self._depth == 0:
+            # Anything before the opening brace (e.g. a markdown fence) is ignored
+            if ch == "{":
+                self._depth = 1
+                self._skeleton.append(ch)
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string = []
+        elif ch == ":" and self._depth == 1:
+            self._current_key = self._last_string
+        elif ch in "{[":
+            self._depth += 1
+            if ch == "[" and self._depth == 2 and self._current_key == self.key:
+                self._array_depth = self._depth
+                self._skeleton.append(ch)
+                return
+            if ch == "{" and self._array_depth is not None and self._depth == self._array_depth + 1 and not in_element:
+                self._element = [ch]
+                return
+        elif ch in "}]":
+            self._depth -= 1
+            if in_element and self._depth == self._array_depth:
+                self._complete(completed)
+                return
+            if ch == "]" and self._array_depth is not None and self._depth == self._array_depth - 1:
+                self._array_depth = None
+            elif self._depth == 0:
+                self._done = True
+
+        if in_element or (self._array_depth is not None and self._depth == self._array_depth):
+            # Element text and the separators between elements stay out of the skeleton
+            return
+        self._skeleton.append(ch)
+
+    def _complete(self, completed: List[Dict[str, Any]]) -> None:
+        text = "".join(self._element)
+        self._element = None
+        try:
+            element = json.loads(text)
+        except ValueError:
+            logging.warning(f"Skipping malformed streamed element: {text[:200]}")
+            return
+        if isinstance(element, dict):
+            completed.append(element)
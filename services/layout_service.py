@@ -0,0 +1,237 @@
+"""
+Layout-aware reading order reconstruction.
+
+Forms such as bills of lading place Shipper / Consignee / Notify blocks
+side by side, and plain ``extract_text`` / ``image_to_string`` interleave
+those columns line by line. This module clusters positioned words into
+blocks and emits them in reading order (top-to-bottom bands, left-to-right
+columns inside a band), separating blocks with a blank line.
+"""
+
+import bisect
+import logging
+from dataclasses import dataclass, field
+from statistics import median
+from typing import List, Optional, Tuple
+
+
+@dataclass
+class LayoutWord:
+    """Word with its bounding box (top-left origin)"""
+    text: str
+    x0: float
+    top: float
+    x1: float
+    bottom: float
+    # Tesseract (block, paragraph, line) id when available
+    line_key: Optional[Tuple[int, int, int]] = None
+
+
+@dataclass
+class LayoutBlock:
+    """Group of vertically adjacent, left-aligned line segments"""
+    x0: float
+    top: float
+    x1: float
+    bottom: float
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+class LayoutService:
+    """Cluster words into blocks and render them in reading order"""
+
+    def __init__(self, column_gap: float = 2.0, block_gap: float = 1.0, align_tolerance: float = 2.0):
+        # Thresholds are multiples of the median word height on the page
+        self.column_gap = column_gap
+        self.block_gap = block_gap
+        self.align_tolerance = align_tolerance
+
+    # --------------------------
+    # WORD SOURCES
+    # --------------------------
+    @staticmethod
+    def words_from_pdfplumber(page) -> List[LayoutWord]:
+        return [
+            LayoutWord(w["text"], float(w["x0"]), float(w["top"]), float(w["x1"]), float(w["bottom"]))
+            for w in page.extract_words(keep_blank_chars=False, use_text_flow=False)
+        ]
+
+    @staticmethod
+    def words_from_tesseract(image, lang: str = "eng", config: str = "") -> List[LayoutWord]:
+        import pytesseract
+
+        data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data["text"]):
+            text = (text or "").strip()
+            if not text:
+                continue
+            left, top = float(data["left"][i]), float(data["top"][i])
+            words.append(LayoutWord(
+                text,
+                left,
+                top,
+                left + float(data["width"][i]),
+                top + float(data["height"][i]),
+                (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+            ))
+        return words
+
+    # --------------------------
+    # CLUSTERING
+    # --------------------------
+    def _group_lines(self, words: List[LayoutWord], line_tolerance: float) -> List[List[LayoutWord]]:
+        """Group words into visual lines, each sorted left to right"""
+        if words[0].line_key is not None:
+            by_key = {}
+            for word in words:
+                by_key.setdefault(word.line_key, []).append(word)
+            lines = list(by_key.values())
+        else:
+            lines = []
+            current: List[LayoutWord] = []
+            current_mid = 0.0
+            for word in sorted(words, key=lambda w: ((w.top + w.bottom) / 2, w.x0)):
+                mid = (word.top + word.bottom) / 2
+                if current and abs(mid - current_mid) > line_tolerance:
+                    lines.append(current)
+                    current = []
+                current.append(word)
+                current_mid += (mid - current_mid) / len(current)
+            if current:
+                lines.append(current)
+        return [sorted(line, key=lambda w: w.x0) for line in lines]
+
+    def _split_segments(self, line: List[LayoutWord], gap: float) -> List[LayoutBlock]:
+        """Split a line wherever the horizontal gap suggests a column break"""
+        segments = []
+        current = [line[0]]
+        for word in line[1:]:
+            if word.x0 - current[-1].x1 > gap:
+                segments.append(current)
+                current = []
+            current.append(word)
+        segments.append(current)
+        return [
+            LayoutBlock(
+                x0=seg[0].x0,
+                top=min(w.top for w in seg),
+                x1=max(w.x1 for w in seg),
+                bottom=max(w.bottom for w in seg),
+                lines=[" ".join(w.text for w in seg)],
+            )
+            for seg in segments
+        ]
+
+    def cluster_blocks(self, words: List[LayoutWord]) -> List[LayoutBlock]:
+        """
+        Cluster words into blocks.
+
+        Line segments are swept top to bottom; a segment joins the open
+        block whose left edge is aligned with it and whose bottom is close
+        enough. Open blocks are kept in an array sorted by x0 so the
+        candidate lookup is a bisect rather than a scan.
+        """
+        if not words:
+            return []
+        height = median(w.bottom - w.top for w in words) or 1.0
+        column_gap = self.column_gap * height
+        block_gap = self.block_gap * height
+        align = self.align_tolerance * height
+
+        segments = []
+        for line in self._group_lines(words, height / 2):
+            segments.extend(self._split_segments(line, column_gap))
+        segments.sort(key=lambda s: (s.top, s.x0))
+
+        blocks: List[LayoutBlock] = []
+        open_blocks: List[LayoutBlock] = []
+        open_x0: List[float] = []
+        for segment in segments:
+            # Close blocks that ended too far above this segment
+            if any(segment.top - b.bottom > block_gap for b in open_blocks):
+                open_blocks = [b for b in open_blocks if segment.top - b.bottom <= block_gap]
+                open_x0 = [b.x0 for b in open_blocks]
+
+            lo = bisect.bisect_left(open_x0, segment.x0 - align)
+            hi = bisect.bisect_right(open_x0, segment.x0 + align)
+            target = None
+            for candidate in open_blocks[lo:hi]:
+                overlaps = candidate.x0 < segment.x1 and segment.x0 < candidate.x1
+                if overlaps and (target is None or candidate.bottom > target.bottom):
+                    target = candidate
+
+            if target is not None:
+                target.lines.extend(segment.lines)
+                target.x1 = max(target.x1, segment.x1)
+                target.bottom = max(target.bottom, segment.bottom)
+            else:
+                blocks.append(segment)
+                idx = bisect.bisect_right(open_x0, segment.x0)
+                open_x0.insert(idx, segment.x0)
+                open_blocks.insert(idx, segment)
+        return blocks
+
+    def order_blocks(self, blocks: List[LayoutBlock]) -> List[LayoutBlock]:
+        """
+        Sort blocks into reading order: horizontal bands of vertically
+        overlapping blocks from top to bottom, and within a band, columns
+        from left to right with blocks top to bottom inside a column.
+        """
+        if not blocks:
+            return []
+        height = median(b.bottom - b.top for b in blocks) or 1.0
+        ordered = []
+        band: List[LayoutBlock] = []
+        band_bottom = None
+        for block in sorted(blocks, key=lambda b: (b.top, b.x0)):
+            if band and block.top > band_bottom:
+                ordered.extend(self._order_band(band, height))
+                band = []
+            band.append(block)
+            band_bottom = block.bottom if len(band) == 1 else max(band_bottom, block.bottom)
+        ordered.extend(self._order_band(band, height))
+        return ordered
+
+    def _order_band(self, band: List[LayoutBlock], height: float) -> List[LayoutBlock]:
+        columns: List[List[LayoutBlock]] = []
+        for block in sorted(band, key=lambda b: b.x0):
+            if columns and block.x0 - columns[-1][0].x0 <= self.align_tolerance * height:
+                columns[-1].append(block)
+            else:
+                columns.append([block])
+        return [block for column in columns for block in sorted(column, key=lambda b: b.top)]
+
+    # --------------------------
+    # RENDERING
+    # --------------------------
+    def render(self, words: List[LayoutWord]) -> str:
+        """Text in reading order, blocks separated by a blank line"""
+        blocks = self.order_blocks(self.cluster_blocks(words))
+        return "\n\n".join(block.text for block in blocks)
+
+    def page_text(self, page) -> str:
+        """Reading-order text of a pdfplumber page, falling back to extract_text"""
+        try:
+            return self.render(self.words_from_pdfplumber(page))
+        except Exception as e:
+            logging.warning(f"Layout extraction failed, using plain text: {e}")
+            return page.extract_text() or ""
+
+    def image_text(self, image, lang: str = "eng", config: str = "") -> str:
+        """Reading-order OCR text of an image, falling back to image_to_string"""
+        try:
+            return self.render(self.words_from_tesseract(image, lang=lang, config=config))
+        except Exception as e:
+            import pytesseract
+
+            logging.warning(f"Layout OCR failed, using plain OCR: {e}")
+            return pytesseract.image_to_string(image, lang=lang, config=config)
+
+
+# Global instance
+layout_service = LayoutService()
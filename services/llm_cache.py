@@ -0,0 +1,244 @@
+"""
+Persistent LLM response cache.
+
+Responses are keyed by a fingerprint of model, temperature, rendered prompt
+and response format, so retries, re-run section tasks and duplicate uploads
+skip the network round trip. Entries live in Redis (shared by all workers)
+or in an on-disk store, expire after a TTL and are evicted least recently
+used once the entry limit is reached. Cache failures never fail a call.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from config.settings import settings
+
+
+def prompt_fingerprint(model: str, temperature: float, prompt: str, response_format: Optional[Dict[str, Any]] = None) -> str:
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "prompt": prompt, "response_format": response_format},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def redis_from_url(url: str, db: int):
+    """
+    Redis client on database db. A database path already in the URL
+    ("redis://host:6379/0") is dropped, since redis-py lets it override db.
+    """
+    import redis
+
+    return redis.Redis.from_url(urlsplit(url)._replace(path="").geturl(), db=db)
+
+
+class RedisCacheBackend:
+    """Cache entries in Redis with an access-ordered index for eviction"""
+
+    PREFIX = "llm_cache:"
+    INDEX = "llm_cache:index"
+
+    def __init__(self, url: str, max_entries: int, db: int = 0):
+        self.url = url
+        self.db = db
+        self.max_entries = max_entries
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis_from_url(self.url, self.db)
+        return self._client
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.PREFIX + key)
+        if value is None:
+            self.client.zrem(self.INDEX, key)
+            return None
+        self.client.zadd(self.INDEX, {key: time.time()})
+        return value.decode("utf-8")
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self.PREFIX + key, value, ex=ttl or None)
+        pipe.zadd(self.INDEX, {key: time.time()})
+        pipe.execute()
+        self._evict()
+
+    def _evict(self) -> None:
+        overflow = self.client.zcard(self.INDEX) - self.max_entries
+        if overflow <= 0:
+            return
+        stale = self.client.zrange(self.INDEX, 0, overflow - 1)
+        if stale:
+            pipe = self.client.pipeline()
+            pipe.delete(*[self.PREFIX + k.decode("utf-8") for k in stale])
+            pipe.zrem(self.INDEX, *stale)
+            pipe.execute()
+
+    def incr(self, counter: str) -> None:
+        self.client.incr(f"{self.PREFIX}stats:{counter}")
+
+    def counters(self) -> Dict[str, int]:
+        hits, misses = self.client.mget(f"{self.PREFIX}stats:hits", f"{self.PREFIX}stats:misses")
+        return {"hits": int(hits or 0), "misses": int(misses or 0)}
+
+
+class DiskCacheBackend:
+    """
+    Cache entries as JSON files; file mtime tracks last access.
+
+    The entry count is tracked per process and re-counted on disk (other
+    workers write too) at most once per ``evict_interval`` seconds, or as
+    soon as the tracked count exceeds ``max_entries``. Eviction trims to
+    90% of ``max_entries``, so a full cache is not rescanned on every write.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int, evict_interval: float = None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.evict_interval = (
+            settings.llm_cache_evict_interval_seconds if evict_interval is None else evict_interval
+        )
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        self._entry_count: Optional[int] = None  # unknown until the first scan
+        self._last_scan = 0.0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get("expires_at") and entry["expires_at"] < time.time():
+            self._remove(path)
+            return None
+        os.utime(path, None)
+        return entry["value"]
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        existed = os.path.exists(path)
+        with open(tmp_path, "w") as f:
+            json.dump({"value": value, "expires_at": time.time() + ttl if ttl else None}, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._entry_count is not None and not existed:
+                self._entry_count += 1
+            stale = (
+                self._entry_count is None
+                or self._entry_count > self.max_entries
+                or time.monotonic() - self._last_scan >= self.evict_interval
+            )
+        if stale:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries once over max_entries, down to 90% of it"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(".json"):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except FileNotFoundError:
+                        continue
+        overflow = 0
+        if len(entries) > self.max_entries:
+            overflow = len(entries) - (self.max_entries - self.max_entries // 10)
+        for _, path in sorted(entries)[:overflow]:
+            self._remove(path)
+        with self._lock:
+            self._entry_count = len(entries) - overflow
+            self._last_scan = time.monotonic()
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def counters(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class LLMResponseCache:
+    """Front for the configured cache backend with hit/miss accounting"""
+
+    def __init__(self, backend: str = None, ttl_seconds: int = None, max_entries: int = None):
+        self.backend_name = (backend or settings.llm_cache_backend).lower()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.llm_cache_ttl_seconds
+        self.max_entries = max_entries or settings.llm_cache_max_entries
+        self._backend = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend_name in ("redis", "disk")
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if self.backend_name == "redis":
+                self._backend = RedisCacheBackend(settings.redis_url, self.max_entries, settings.llm_cache_redis_db)
+            else:
+                self._backend = DiskCacheBackend(settings.llm_cache_dir, self.max_entries)
+        return self._backend
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(key)
+            self.backend.incr("hits" if value is not None else "misses")
+            return value
+        except Exception as e:
+            logging.warning(f"LLM cache lookup failed: {e}")
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            logging.warning(f"LLM cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"backend": self.backend_name, "hits": 0, "misses": 0, "hit_rate": 0.0}
+        try:
+            counters = self.backend.counters()
+        except Exception as e:
+            logging.warning(f"LLM cache stats failed: {e}")
+            counters = {"hits": 0, "misses": 0}
+        total = counters["hits"] + counters["misses"]
+        return {
+            "backend": self.backend_name,
+            **counters,
+            "hit_rate": counters["hits"] / total if total else 0.0,
+        }
+
+
+# Global instance
+llm_response_cache = LLMResponseCache()
@@ -0,0 +1,95 @@
+"""
+Pooled HTTP connections for the LLM clients.
+
+Clients are built lazily, in the process that uses them: Celery prefork
+children never inherit (and share) the parent's sockets, and producers
+that only enqueue tasks never build a client at all. Each process keeps
+one keep-alive pool for blocking calls and one per running event loop
+for async calls (an ``httpx.AsyncClient`` cannot outlive its loop, and
+the extraction wrappers start a loop per task with ``asyncio.run``).
+
+Timeouts are explicit: a short connect timeout and a read timeout, which
+per-call timeouts from ``llm_call_policy`` replace.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+
+
+def running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LLMHttpClients:
+    """Per-process keep-alive connection pools"""
+
+    def __init__(self):
+        self._pid: Optional[int] = None
+        self._client = None
+        self._async_clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._lock = threading.Lock()
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            # Connections inherited across a fork belong to the parent
+            self._pid = os.getpid()
+            self._client = None
+            self._async_clients = {}
+
+    @staticmethod
+    def limits():
+        import httpx
+
+        return httpx.Limits(
+            max_connections=settings.llm_http_max_connections,
+            max_keepalive_connections=settings.llm_http_max_keepalive,
+            keepalive_expiry=settings.llm_http_keepalive_seconds,
+        )
+
+    @staticmethod
+    def timeout(read_seconds: Optional[float] = None):
+        """Connect timeout from settings; read/write/pool timeout read_seconds"""
+        import httpx
+
+        return httpx.Timeout(
+            read_seconds or settings.llm_http_read_timeout_seconds,
+            connect=settings.llm_http_connect_timeout_seconds,
+        )
+
+    def client(self):
+        """Blocking client of this process"""
+        with self._lock:
+            self._check_pid()
+            if self._client is None:
+                import httpx
+
+                self._client = httpx.Client(limits=self.limits(), timeout=self.timeout())
+                logging.info(f"Created LLM HTTP pool in process {self._pid}")
+            return self._client
+
+    def async_client(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Async client of this process and event loop (the running one by default)"""
+        loop = loop or running_loop()
+        if loop is None:
+            raise RuntimeError("An async LLM HTTP client needs a running event loop")
+        with self._lock:
+            self._check_pid()
+            # Pools of finished loops cannot be reused; their sockets go with them
+            self._async_clients = {key: value for key, value in self._async_clients.items() if not key.is_closed()}
+            if loop not in self._async_clients:
+                import httpx
+
+                self._async_clients[loop] = httpx.AsyncClient(limits=self.limits(), timeout=self.timeout())
+            return self._async_clients[loop]
+
+
+# Global instance; pools are created on first use in each process
+llm_http = LLMHttpClients()
@@ -0,0 +1,253 @@
+"""
+Timeouts, retries and hedging for LLM calls.
+
+Each call gets a timeout derived from the latency observed for similar
+calls (a high percentile times a safety multiplier, clamped), instead of
+waiting indefinitely on a stalled completion. Retriable failures (429,
+5xx, timeouts, connection errors) are retried with full-jitter
+exponential backoff, honouring Retry-After. Optionally a duplicate
+request is fired once a call outlives the p95 latency and whichever
+response arrives first wins.
+
+Rate-limit capacity is taken (``slot``) before each attempt, outside the
+timed and hedged region: queueing for capacity is neither recorded as
+latency nor able to trigger a hedge. A hedge runs inside the slot of the
+request it duplicates.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, Awaitable, Callable, ContextManager, Deque, Dict, Optional
+
+from config.settings import settings
+
+
+RETRIABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRIABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError", "ReadTimeout", "ConnectTimeout"}
+TIMEOUT_ERRORS = {"APITimeoutError", "ReadTimeout", "ConnectTimeout"}
+
+
+def is_timeout(error: BaseException) -> bool:
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or type(error).__name__ in TIMEOUT_ERRORS
+
+
+def is_retriable(error: BaseException) -> bool:
+    if is_timeout(error) or isinstance(error, ConnectionError):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRIABLE_STATUS
+    return type(error).__name__ in RETRIABLE_ERRORS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's HTTP response, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LatencyTracker:
+    """Rolling window of call latencies (timeouts count as the timeout) per call key"""
+
+    def __init__(self, window: Optional[int] = None, min_samples: Optional[int] = None):
+        self.window = window or settings.llm_latency_window
+        self.min_samples = min_samples or settings.llm_latency_min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        """Latency percentile for a key, or None until enough samples are seen"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class LLMCallPolicy:
+    """Run LLM requests with adaptive timeouts, jittered retries and optional hedging"""
+
+    def __init__(self, tracker: Optional[LatencyTracker] = None):
+        self.tracker = tracker or LatencyTracker()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+        return self._executor
+
+    def timeout_for(self, key: str) -> float:
+        observed = self.tracker.percentile(key, settings.llm_timeout_percentile)
+        if observed is None:
+            return settings.llm_timeout_initial_seconds
+        return min(max(observed * settings.llm_timeout_multiplier, settings.llm_timeout_min_seconds),
+                   settings.llm_timeout_max_seconds)
+
+    def hedge_delay(self, key: str, timeout: float) -> Optional[float]:
+        if not settings.llm_hedging_enabled:
+            return None
+        delay = self.tracker.percentile(key, settings.llm_hedge_percentile)
+        return delay if delay is not None and delay < timeout else None
+
+    @staticmethod
+    def backoff(attempt: int, error: BaseException) -> float:
+        ceiling = min(settings.llm_backoff_max_seconds, settings.llm_backoff_base_seconds * 2 ** attempt)
+        return max(random.uniform(0, ceiling), retry_after(error) or 0)
+
+    def _timed(self, fn: Callable[[float], Any], key: str, timeout: float) -> Any:
+        started = time.perf_counter()
+        try:
+            result = fn(timeout)
+        except Exception as e:
+            if is_timeout(e):
+                # Timeouts count as slow samples so the timeout can grow under load
+                self.tracker.record(key, timeout)
+            raise
+        self.tracker.record(key, time.perf_counter() - started)
+        return result
+
+    # --------------------------
+    # BLOCKING CALLS
+    # --------------------------
+    def _hedged(self, fn: Callable[[float], Any], key: str, timeout: float) -> Any:
+        delay = self.hedge_delay(key, timeout)
+        if delay is None:
+            return self._timed(fn, key, timeout)
+
+        # Threads do not inherit context variables (e.g. the rate-limit lane)
+        first = self.executor.submit(contextvars.copy_context().run, self._timed, fn, key, timeout)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        logging.info(f"Hedging LLM call {key} after {delay:.1f}s")
+        second = self.executor.submit(contextvars.copy_context().run, self._timed, fn, key, timeout)
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # A blocking request cannot be cancelled; the loser finishes in the background
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(
+        self,
+        fn: Callable[[float], Any],
+        key: str,
+        stats: Optional[Dict[str, Any]] = None,
+        slot: Optional[Callable[[], ContextManager]] = None,
+        hedge: bool = True,
+    ) -> Any:
+        """
+        Call fn(timeout) until it succeeds or fails with a non-retriable error.
+
+        Args:
+            fn: Performs one request, honouring the timeout in seconds
+            key: Latency bucket, e.g. model and response schema
+            stats: Optional dict that receives the number of "retries"
+            slot: Optional factory of the rate-limit context held per attempt
+            hedge: False for requests that must not be duplicated (streams)
+
+        Returns:
+            The first successful result
+        """
+        attempt = 0
+        while True:
+            try:
+                with (slot or nullcontext)():
+                    if not hedge:
+                        return self._timed(fn, key, self.timeout_for(key))
+                    return self._hedged(fn, key, self.timeout_for(key))
+            except Exception as e:
+                if not is_retriable(e) or attempt >= settings.llm_max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                logging.warning(f"LLM call {key} failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                if stats is not None:
+                    stats["retries"] = attempt
+
+    # --------------------------
+    # ASYNC CALLS
+    # --------------------------
+    async def _atimed(self, fn: Callable[[float], Awaitable[Any]], key: str, timeout: float) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await fn(timeout)
+        except Exception as e:
+            if is_timeout(e):
+                self.tracker.record(key, timeout)
+            raise
+        self.tracker.record(key, time.perf_counter() - started)
+        return result
+
+    async def _ahedged(self, fn: Callable[[float], Awaitable[Any]], key: str, timeout: float) -> Any:
+        delay = self.hedge_delay(key, timeout)
+        if delay is None:
+            return await self._atimed(fn, key, timeout)
+
+        first = asyncio.ensure_future(self._atimed(fn, key, timeout))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        logging.info(f"Hedging LLM call {key} after {delay:.1f}s")
+        pending = {first, asyncio.ensure_future(self._atimed(fn, key, timeout))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def acall(
+        self,
+        fn: Callable[[float], Awaitable[Any]],
+        key: str,
+        stats: Optional[Dict[str, Any]] = None,
+        slot: Optional[Callable[[], AsyncContextManager]] = None,
+    ) -> Any:
+        """Async counterpart of call; losing hedged requests are cancelled"""
+        attempt = 0
+        while True:
+            try:
+                if slot is None:
+                    return await self._ahedged(fn, key, self.timeout_for(key))
+                async with slot():
+                    return await self._ahedged(fn, key, self.timeout_for(key))
+            except Exception as e:
+                if not is_retriable(e) or attempt >= settings.llm_max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                logging.warning(f"LLM call {key} failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                if stats is not None:
+                    stats["retries"] = attempt
+
+
+# Global instance
+llm_call_policy = LLMCallPolicy()
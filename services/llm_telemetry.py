@@ -0,0 +1,224 @@
+"""
+Per-call LLM telemetry ledger.
+
+Every LLM call (including response-cache hits and failures) produces one
+record: process, section, model, lane, prompt/cached/completion tokens,
+latency, retries and estimated cost. Process id and section come from a
+context variable set by the Celery tasks and the extraction methods, so
+call sites do not pass them through. Records are buffered and written in
+batches, by size or by a background flush interval, to a JSONL file (the
+default) or the ``llm_call_log`` table, which the database sink creates
+when it is missing; a failed database write falls back to the file so
+records are not lost.
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from services.rate_limiter import llm_rate_limiter
+from services.token_budget import token_budget
+
+_context: contextvars.ContextVar = contextvars.ContextVar("llm_call_context", default={})
+
+
+def bind_call_context(**fields) -> contextvars.Token:
+    """Attach fields to subsequent LLM calls; undo with unbind_call_context"""
+    return _context.set({**_context.get(), **fields})
+
+
+def unbind_call_context(token: contextvars.Token) -> None:
+    _context.reset(token)
+
+
+@contextmanager
+def call_context(**fields):
+    """Attach fields (e.g. process_id, section) to the LLM calls made inside"""
+    token = bind_call_context(**fields)
+    try:
+        yield
+    finally:
+        unbind_call_context(token)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> Optional[float]:
+    """USD cost from settings.llm_pricing (per million tokens); None for unknown models"""
+    pricing = settings.llm_pricing
+    # Dated snapshots ("gpt-4o-2024-08-06") use the price of their base model
+    name = max((name for name in pricing if (model or "").startswith(name)), key=len, default=None)
+    if name is None:
+        return None
+    price = pricing[name]
+    cached_tokens = min(cached_tokens, prompt_tokens)
+    return (
+        (prompt_tokens - cached_tokens) * price["input"]
+        + cached_tokens * price.get("cached_input", price["input"])
+        + completion_tokens * price["output"]
+    ) / 1_000_000
+
+
+def _as_uuid(value: Any) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+def response_usage(response: Any) -> Optional[Dict[str, int]]:
+    """Token usage reported with a chat model response, if any"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+    return {
+        "prompt_tokens": int(usage.get("input_tokens") or 0),
+        "cached_tokens": int((usage.get("input_token_details") or {}).get("cache_read") or 0),
+        "completion_tokens": int(usage.get("output_tokens") or 0),
+    }
+
+
+class LLMTelemetry:
+    """Buffered writer of per-call records"""
+
+    def __init__(self, sink: str = None, batch_size: int = None, flush_seconds: float = None):
+        self.sink = (sink or settings.llm_telemetry_sink).lower()
+        self.batch_size = batch_size or settings.llm_telemetry_batch_size
+        self.flush_seconds = flush_seconds or settings.llm_telemetry_flush_seconds
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        self._table_ready = False
+        atexit.register(self.flush)
+
+    # --------------------------
+    # RECORDING
+    # --------------------------
+    def record_call(
+        self,
+        model: str,
+        prompt: str,
+        text: Optional[str],
+        latency_seconds: float,
+        response: Any = None,
+        retries: int = 0,
+        cache_hit: bool = False,
+        error: Optional[BaseException] = None,
+        section: Optional[str] = None,
+    ) -> None:
+        """
+        Record one call. Without provider usage (replayed or failed calls)
+        tokens are estimated with the offline tokenizer; cache hits cost
+        nothing. section overrides the context (for generators, which
+        cannot hold a context across yields).
+        """
+        if self.sink == "none":
+            return
+        if cache_hit:
+            usage = {"prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+        else:
+            usage = response_usage(response) or {
+                "prompt_tokens": token_budget.count(prompt),
+                "cached_tokens": 0,
+                "completion_tokens": token_budget.count(text) if text else 0,
+            }
+        context = _context.get()
+        record = {
+            "process_id": context.get("process_id"),
+            "section": section or context.get("section"),
+            "model": model,
+            "lane": llm_rate_limiter.current_lane(),
+            **usage,
+            "latency_ms": int(latency_seconds * 1000),
+            "cache_hit": cache_hit,
+            "retries": retries,
+            "estimated_cost": 0.0 if cache_hit else estimate_cost(model, **usage),
+            "success": error is None,
+            "error": f"{type(error).__name__}: {error}"[:255] if error is not None else None,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        logging.debug(f"LLM call {record}")
+        self._start_flusher()
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    # --------------------------
+    # WRITING
+    # --------------------------
+    def _start_flusher(self) -> None:
+        # Threads do not survive a fork: start one per worker process
+        if self._flusher_pid == os.getpid():
+            return
+        if self._flusher_pid is not None:
+            # Records inherited from the parent are written by the parent
+            self._buffer = []
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name="llm-telemetry", daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records:
+            return
+        if self.sink == "db":
+            try:
+                self._write_db(records)
+                return
+            except Exception as e:
+                logging.warning(f"LLM telemetry database write failed, using {settings.llm_telemetry_path}: {e}")
+        try:
+            self._write_jsonl(records)
+        except Exception as e:
+            logging.warning(f"LLM telemetry dropped {len(records)} record(s): {e}")
+
+    def _write_db(self, records: List[Dict[str, Any]]) -> None:
+        from config.database import SessionLocal, engine
+        from models.llm_call_log import LLMCallLog
+
+        if not self._table_ready:
+            # No migration creates the table; create it on first use
+            LLMCallLog.__table__.create(bind=engine, checkfirst=True)
+            self._table_ready = True
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(
+                LLMCallLog,
+                [
+                    {
+                        **record,
+                        "process_id": _as_uuid(record["process_id"]),
+                        "created_at": datetime.fromisoformat(record["created_at"]),
+                    }
+                    for record in records
+                ],
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write_jsonl(records: List[Dict[str, Any]]) -> None:
+        with open(settings.llm_telemetry_path, "a") as f:
+            f.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+
+
+# Global instance
+llm_telemetry = LLMTelemetry()
@@ -0,0 +1,151 @@
+"""
+Pluggable transport for LLM completions.
+
+``live`` sends requests to the provider. ``record`` does the same and
+saves every prompt/response pair (with its latency) to disk. ``replay``
+serves recorded responses without any network access, after a synthetic
+or recorded latency, so the pipeline can be benchmarked reproducibly.
+The local HTTP stub in ``benchmarks/llm_stub_server.py`` speaks the
+chat-completions wire format and can serve the same recordings.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config.settings import settings
+
+
+def prompt_sha256(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class RecordingStore:
+    """Prompt/response pairs as JSON files, keyed by prompt fingerprint"""
+
+    def __init__(self, recordings_dir: Optional[str] = None):
+        self.recordings_dir = recordings_dir or settings.llm_recordings_dir
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.recordings_dir, key[:2], f"{key}.json")
+
+    def save(self, key: str, prompt: str, response_format: Optional[Dict[str, Any]], response: str, seconds: float) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "key": key,
+                    "prompt_sha256": prompt_sha256(prompt),
+                    "prompt": prompt,
+                    "response_format": response_format,
+                    "response": response,
+                    "latency_seconds": seconds,
+                    "recorded_at": time.time(),
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def by_prompt(self) -> Dict[str, Dict[str, Any]]:
+        """Index of all recordings by prompt hash (used by the HTTP stub)"""
+        index = {}
+        for dirpath, _, filenames in os.walk(self.recordings_dir):
+            for filename in filenames:
+                if filename.endswith(".json"):
+                    with open(os.path.join(dirpath, filename), "r") as f:
+                        entry = json.load(f)
+                    index[entry["prompt_sha256"]] = entry
+        return index
+
+
+class LiveTransport:
+    """Send every request to the provider"""
+
+    # Streamed calls bypass complete(); only a plain live transport allows them
+    streams = True
+
+    def complete(self, key: str, prompt: str, response_format, live: Callable[[], str]) -> str:
+        return live()
+
+    async def acomplete(self, key: str, prompt: str, response_format, live: Callable[[], Awaitable[str]]) -> str:
+        return await live()
+
+
+class RecordTransport(LiveTransport):
+    """Send requests to the provider and record each prompt/response pair"""
+
+    streams = False
+
+    def __init__(self, store: Optional[RecordingStore] = None):
+        self.store = store or RecordingStore()
+
+    def _save(self, key: str, prompt: str, response_format, response: str, seconds: float) -> None:
+        try:
+            self.store.save(key, prompt, response_format, response, seconds)
+        except Exception as e:
+            logging.warning(f"Could not record LLM response {key}: {e}")
+
+    def complete(self, key: str, prompt: str, response_format, live: Callable[[], str]) -> str:
+        started = time.perf_counter()
+        response = live()
+        self._save(key, prompt, response_format, response, time.perf_counter() - started)
+        return response
+
+    async def acomplete(self, key: str, prompt: str, response_format, live: Callable[[], Awaitable[str]]) -> str:
+        started = time.perf_counter()
+        response = await live()
+        self._save(key, prompt, response_format, response, time.perf_counter() - started)
+        return response
+
+
+class ReplayTransport:
+    """Serve recorded responses offline after a synthetic latency"""
+
+    def __init__(self, store: Optional[RecordingStore] = None, latency_ms: Optional[float] = None, jitter: Optional[float] = None):
+        self.store = store or RecordingStore()
+        self.latency_ms = latency_ms if latency_ms is not None else settings.llm_replay_latency_ms
+        self.jitter = jitter if jitter is not None else settings.llm_replay_jitter
+
+    def _entry(self, key: str) -> Dict[str, Any]:
+        entry = self.store.load(key)
+        if entry is None:
+            raise LookupError(f"No recorded LLM response for {key}")
+        return entry
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        seconds = self.latency_ms / 1000 if self.latency_ms is not None else entry.get("latency_seconds", 0)
+        return max(0.0, seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def complete(self, key: str, prompt: str, response_format, live: Callable[[], str]) -> str:
+        entry = self._entry(key)
+        time.sleep(self._delay(entry))
+        return entry["response"]
+
+    async def acomplete(self, key: str, prompt: str, response_format, live: Callable[[], Awaitable[str]]) -> str:
+        entry = self._entry(key)
+        await asyncio.sleep(self._delay(entry))
+        return entry["response"]
+
+
+def build_transport(mode: Optional[str] = None):
+    """Transport for settings.llm_transport; "stub" is live against llm_stub_url"""
+    mode = (mode or settings.llm_transport).lower()
+    if mode == "record":
+        return RecordTransport()
+    if mode == "replay":
+        return ReplayTransport()
+    return LiveTransport()
@@ -0,0 +1,149 @@
+"""
+Model routing by request complexity.
+
+Every request used to go to ``settings.OPENAI_MODEL`` whether it was a
+one-line courier receipt or a thirty-page packing list. The router scores
+each extraction from four features, each scaled to 0..1:
+
+- ``tokens``: OCR text length against ``llm_routing_max_tokens``
+- ``tables``: tables in the OCR output against ``llm_routing_max_tables``
+- ``ocr_noise``: share of words that are not clean text (scanned pages,
+  broken characters)
+- ``section``: the section's own difficulty (``llm_routing_section_weights``)
+
+The weighted score picks the ``fast`` tier (``llm_fast_model``) below
+``llm_routing_threshold`` and the ``strong`` tier (``OPENAI_MODEL``)
+otherwise. The tier applies to the LLM calls made inside ``use()``
+(a context variable, like the rate limiter lane); a fast answer that
+fails schema validation (for item lists, any item failing the item
+schema) is retried on the strong model by the caller.
+
+Token length dominates the score of clean documents, so the threshold is
+effectively a per-section length cut-off; benchmarks/model_routing_check.py
+prints the cut-offs and sample scores for the current settings.
+"""
+
+import re
+import logging
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict
+
+from config.settings import settings
+from services.token_budget import token_budget
+
+FAST = "fast"
+STRONG = "strong"
+
+_tier: contextvars.ContextVar = contextvars.ContextVar("llm_model_tier", default=STRONG)
+
+# Table blocks in OCRService output ("=== Page_1_Table_2 ===")
+_TABLE_MARKER = re.compile(r"^===[^\n]*Table_\d+[^\n]*===\s*$", re.MULTILINE)
+_CLEAN_WORD = re.compile(r"^[\w.,:;/()\-%#&'\"+$@*]+$")
+
+
+def table_count(text: str) -> int:
+    return len(_TABLE_MARKER.findall(text or ""))
+
+
+def ocr_noise(text: str) -> float:
+    """Share of words with characters unusual in trade documents"""
+    words = (text or "").split()
+    if not words:
+        return 0.0
+    return sum(1 for word in words if not _CLEAN_WORD.match(word)) / len(words)
+
+
+@dataclass
+class RoutingDecision:
+    """Tier and model chosen for a request"""
+    section: str
+    tier: str
+    model: str
+    score: float
+    features: Dict[str, float] = field(default_factory=dict)
+
+
+class ModelRouter:
+    """Score request complexity and pick the model tier"""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.llm_routing_enabled and bool(settings.llm_fast_model)
+
+    @staticmethod
+    def model_for(tier: str) -> str:
+        return settings.llm_fast_model if tier == FAST else settings.OPENAI_MODEL
+
+    @staticmethod
+    def current_tier() -> str:
+        return _tier.get()
+
+    def current_model(self) -> str:
+        return self.model_for(self.current_tier())
+
+    @staticmethod
+    @contextmanager
+    def use(tier: str):
+        """Run the enclosed LLM calls on a model tier ("fast" or "strong")"""
+        token = _tier.set(tier)
+        try:
+            yield
+        finally:
+            _tier.reset(token)
+
+    # --------------------------
+    # SCORING
+    # --------------------------
+    @staticmethod
+    def features(section: str, ocr_text: str) -> Dict[str, float]:
+        weights = settings.llm_routing_section_weights
+        return {
+            "tokens": min(token_budget.count(ocr_text or "") / settings.llm_routing_max_tokens, 1.0),
+            "tables": min(table_count(ocr_text) / settings.llm_routing_max_tables, 1.0),
+            "ocr_noise": min(ocr_noise(ocr_text) / settings.llm_routing_max_noise, 1.0),
+            "section": weights.get(section, weights.get("default", 0.5)),
+        }
+
+    def score(self, section: str, ocr_text: str) -> RoutingDecision:
+        features = self.features(section, ocr_text)
+        weights = settings.llm_routing_weights
+        total = sum(weights.get(name, 0.0) for name in features) or 1.0
+        score = sum(weights.get(name, 0.0) * value for name, value in features.items()) / total
+        tier = FAST if score < settings.llm_routing_threshold else STRONG
+        return RoutingDecision(section, tier, self.model_for(tier), round(score, 3), features)
+
+    def route(self, section: str, ocr_text: str) -> RoutingDecision:
+        if not self.enabled():
+            return RoutingDecision(section, STRONG, self.model_for(STRONG), 1.0)
+        decision = self.score(section, ocr_text)
+        logging.info(f"Routing {section} to {decision.tier} model {decision.model} (complexity {decision.score})")
+        self._count(f"{section}:{decision.tier}")
+        return decision
+
+    # --------------------------
+    # STATS
+    # --------------------------
+    def record_escalation(self, section: str, reason: str) -> None:
+        logging.info(f"Escalating {section} to {self.model_for(STRONG)}: {reason}")
+        self._count(f"{section}:escalated")
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Routed and escalated requests per section in this process"""
+        with self._lock:
+            return dict(self._counts)
+
+
+# Global instance
+model_router = ModelRouter()
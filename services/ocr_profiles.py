@@ -0,0 +1,196 @@
+"""
+Tesseract configuration profiles per page type.
+
+Table-heavy pages, sparse forms (bills of lading) and dense invoices each
+OCR best with a different page segmentation mode. A cheap layout probe
+picks a named profile per page, and the choice is cached per document
+template (derived from the page's header lines) so repeat suppliers skip
+the probe.
+
+Selection is off by default (``ocr_profiles_enabled``): the thresholds
+are unmeasured, and the sparse-form profile (``--psm 11``) has not been
+checked together with layout reading order, which regroups tesseract's
+words into lines. Enable it after running
+``benchmarks/ocr_profiles_benchmark.py`` on a representative corpus.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config.settings import settings
+
+
+@dataclass(frozen=True)
+class OCRProfile:
+    """Named tesseract configuration"""
+    name: str
+    psm: int
+    oem: int = 1
+    extra: str = ""
+
+    @property
+    def config(self) -> str:
+        return f"--oem {self.oem} --psm {self.psm} {self.extra}".strip()
+
+
+OCR_PROFILES: Dict[str, OCRProfile] = {
+    # Fully automatic segmentation, tesseract's default
+    "default": OCRProfile("default", psm=3, oem=3),
+    # Dense invoices: automatic segmentation, LSTM engine only
+    "dense_text": OCRProfile("dense_text", psm=3),
+    # Ruled tables: a single uniform block keeps row cells on one line
+    "table": OCRProfile("table", psm=6, extra="-c preserve_interword_spaces=1"),
+    # Sparse forms such as bills of lading: find as much text as possible, in no order
+    "sparse_form": OCRProfile("sparse_form", psm=11),
+}
+
+
+class OCRProfileSelector:
+    """Pick an OCR profile per page, caching choices per document template"""
+
+    # Probe thresholds
+    PROBE_SIZE = 200
+    TABLE_MIN_RULINGS = 3
+    SPARSE_MAX_INK = 0.04
+    TABLE_MIN_PDF_LINES = 6
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path if cache_path is not None else settings.ocr_profile_cache_path
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict[str, str]] = None
+
+    # --------------------------
+    # TEMPLATE CACHE
+    # --------------------------
+    @staticmethod
+    def template_key(page_text: str, page_num: int = 0, header_lines: int = 3) -> Optional[str]:
+        """
+        Fingerprint a page's template from its first header lines, with
+        digits and punctuation stripped so invoice numbers and dates do not
+        change the key.
+        """
+        if not page_text:
+            return None
+        lines = []
+        for line in page_text.splitlines():
+            normalized = re.sub(r"[^A-Z]", "", line.upper())
+            if len(normalized) >= 4:
+                lines.append(normalized)
+            if len(lines) == header_lines:
+                break
+        if not lines:
+            return None
+        digest = hashlib.sha1("|".join(lines).encode("utf-8")).hexdigest()[:16]
+        return f"{digest}:{page_num}"
+
+    def _load(self) -> Dict[str, str]:
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_path and os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path, "r") as f:
+                        self._cache = json.load(f)
+                except Exception as e:
+                    logging.warning(f"Could not read OCR profile cache {self.cache_path}: {e}")
+        return self._cache
+
+    def _remember(self, key: str, profile_name: str) -> None:
+        with self._lock:
+            cache = self._load()
+            if cache.get(key) == profile_name:
+                return
+            cache[key] = profile_name
+            if not self.cache_path:
+                return
+            try:
+                tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(cache, f)
+                os.replace(tmp_path, self.cache_path)
+            except Exception as e:
+                logging.warning(f"Could not write OCR profile cache {self.cache_path}: {e}")
+
+    # --------------------------
+    # LAYOUT PROBES
+    # --------------------------
+    def probe_pdf_page(self, page) -> Optional[str]:
+        """Classify a pdfplumber page from its vector graphics and word density"""
+        try:
+            rulings = len(page.lines) + len(page.rects)
+            if rulings >= self.TABLE_MIN_PDF_LINES:
+                return "table"
+            words = page.extract_words()
+            if not words:
+                return None  # scanned page, fall back to the image probe
+            area = max(float(page.width) * float(page.height), 1.0)
+            word_area = sum((float(w["x1"]) - float(w["x0"])) * (float(w["bottom"]) - float(w["top"])) for w in words)
+            return "sparse_form" if word_area / area < self.SPARSE_MAX_INK * 2 else "dense_text"
+        except Exception as e:
+            logging.warning(f"PDF layout probe failed: {e}")
+            return None
+
+    def probe_image(self, image) -> str:
+        """
+        Classify a rendered page from a thumbnail: long dark horizontal
+        rows indicate table rulings, low ink coverage a sparse form.
+        """
+        small = image.convert("L")
+        small.thumbnail((self.PROBE_SIZE, self.PROBE_SIZE))
+        width, height = small.size
+        pixels = small.tobytes()
+        dark_total = 0
+        rulings = 0
+        for y in range(height):
+            row = pixels[y * width:(y + 1) * width]
+            dark = sum(1 for value in row if value < 128)
+            dark_total += dark
+            if dark > width * 0.6:
+                rulings += 1
+        if rulings >= self.TABLE_MIN_RULINGS:
+            return "table"
+        ink = dark_total / max(width * height, 1)
+        return "sparse_form" if ink < self.SPARSE_MAX_INK else "dense_text"
+
+    # --------------------------
+    # SELECTION
+    # --------------------------
+    def select(self, image=None, page=None, page_text: str = "", page_num: int = 0) -> OCRProfile:
+        """
+        Choose the OCR profile for a page.
+
+        Args:
+            image: Rendered page (PIL image), used by the image probe
+            page: pdfplumber page, used by the cheaper vector probe
+            page_text: Direct text of the page, used for the template key
+            page_num: Page number (0-indexed)
+
+        Returns:
+            The selected OCRProfile
+        """
+        if not settings.ocr_profiles_enabled:
+            return OCR_PROFILES["default"]
+
+        key = self.template_key(page_text, page_num)
+        if key:
+            cached = self._load().get(key)
+            if cached in OCR_PROFILES:
+                return OCR_PROFILES[cached]
+
+        name = self.probe_pdf_page(page) if page is not None else None
+        if name is None and image is not None:
+            name = self.probe_image(image)
+        name = name or "default"
+
+        if key:
+            self._remember(key, name)
+        return OCR_PROFILES[name]
+
+
+# Global instance
+ocr_profile_selector = OCRProfileSelector()
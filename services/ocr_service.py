@@ -8,11 +8,15 @@ from config.settings import settings
 import pdfplumber
 from pdf2image import convert_from_path
 import re
+from services.page_image_store import page_image_store
+from services.layout_service import layout_service
+from services.ocr_profiles import ocr_profile_selector
 
 
 class OCRService:
-    def __init__(self):
+    def __init__(self, image_store=None):
         self.engine = settings.ocr_engine
+        self.image_store = image_store or page_image_store
         
     def extract_text(self, file_path: str) -> Optional[str]:
         """Extract text from document using OCR"""
@@ -130,35 +134,73 @@ class OCRService:
             
         return "\n".join(formatted_tables)
 
-    def do_ocr_on_pdf(self, pdf_path: str) -> str:
+    def do_ocr_on_pdf(self, pdf_path: str, page_texts: Optional[List[str]] = None) -> str:
         """
         Perform OCR on entire PDF document
         
         Args:
             pdf_path: Path to PDF file
+            page_texts: Already extracted text per page, used to look up
+                the cached OCR profile of the document template (optional)
             
         Returns:
             OCR extracted text from all pages
         """
         ocr_text_content = []
         try:
-            images = convert_from_path(pdf_path)
+            images = self.image_store.render_pdf_pages(pdf_path)
             for page_num, img in enumerate(images):
                 print(f"Performing OCR on page {page_num + 1}...")
-                ocr_text = pytesseract.image_to_string(img, lang="eng")
+                page_text = page_texts[page_num] if page_texts and page_num < len(page_texts) else ""
+                profile = ocr_profile_selector.select(image=img, page_text=page_text, page_num=page_num)
+                ocr_text = self._image_to_text(img, profile.config)
                 ocr_text_content.append(f"=== OCR Page {page_num+1} ===\n{ocr_text.strip()}")
         except Exception as e:
             print(f"OCR conversion error: {e}")
             
         return "\n\n".join(ocr_text_content)
 
-    def ocr_by_page(self, page, page_num):
+    def _image_to_text(self, image, config: str = "") -> str:
+        """OCR an image, in layout reading order when enabled"""
+        if settings.layout_reading_order:
+            return layout_service.image_text(image, lang="eng", config=config)
+        return pytesseract.image_to_string(image, lang="eng", config=config)
+
+    def ocr_page_region(self, pdf_path: str, page_num: int, bbox=None, config: str = "", resolution: int = 200) -> str:
+        """
+        Re-OCR a page, or a region of it, from the page image store
+        
+        Args:
+            pdf_path: Path to PDF file
+            page_num: Page number (0-indexed)
+            bbox: Optional (x0, top, x1, bottom) region in image pixels
+            config: Extra tesseract config, e.g. "--psm 6"
+            resolution: Render DPI of the stored page
+            
+        Returns:
+            OCR text of the page or region
+        """
+        doc_key = self.image_store.document_key(pdf_path)
+        image = self.image_store.get_or_render(
+            doc_key,
+            page_num,
+            resolution,
+            lambda: convert_from_path(
+                pdf_path, dpi=resolution, first_page=page_num + 1, last_page=page_num + 1
+            )[0],
+        )
+        if bbox:
+            image = image.crop(tuple(int(v) for v in bbox))
+        return self._image_to_text(image, config=config).strip()
+
+    def ocr_by_page(self, page, page_num, doc_key: Optional[str] = None):
         """
         Perform OCR on a single page using pdfplumber page object
         
         Args:
             page: pdfplumber page object
             page_num: Page number (0-indexed)
+            doc_key: Document hash for the page image store (optional)
             
         Returns:
             Combined text and OCR content for the page
@@ -166,18 +208,27 @@ class OCRService:
         text_parts = []
         
         # First, try to extract text directly
-        direct_text = page.extract_text() or ""
+        if settings.layout_reading_order:
+            direct_text = layout_service.page_text(page)
+        else:
+            direct_text = page.extract_text() or ""
         text_parts.append(direct_text)
         
         try:
             # Convert page to image and perform OCR
             # Create a temporary image from the page
             bbox = page.bbox
-            page_image = page.within_bbox(bbox).to_image(resolution=200)
+            render = lambda: page.within_bbox(bbox).to_image(resolution=200).original
             
-            # Convert to PIL Image for OCR
-            pil_image = page_image.original
-            ocr_text = pytesseract.image_to_string(pil_image, lang="eng")
+            # Convert to PIL Image for OCR, reusing a stored render if available
+            if doc_key and self.image_store.enabled:
+                pil_image = self.image_store.get_or_render(doc_key, page_num, 200, render, renderer="pdfplumber")
+            else:
+                pil_image = render()
+            profile = ocr_profile_selector.select(
+                image=pil_image, page=page, page_text=direct_text, page_num=page_num
+            )
+            ocr_text = self._image_to_text(pil_image, profile.config)
             
             # Only add OCR text if it's significantly different from direct text
             if ocr_text.strip() and len(ocr_text.strip()) > len(direct_text.strip()) * 0.5:
@@ -235,6 +286,7 @@ class OCRService:
         }
         
         try:
+            doc_key = self.image_store.document_key(pdf_path) if self.image_store.enabled else None
             with pdfplumber.open(pdf_path) as pdf:
                 results['page_count'] = len(pdf.pages)
                 
@@ -242,7 +294,8 @@ class OCRService:
                     print(f"Processing page {page_num + 1} of {len(pdf.pages)}...")
                     
                     # Extract text and OCR from page
-                    page_content = self.ocr_by_page(page, page_num)
+                    page_content = self.ocr_by_page(page, page_num, doc_key)
+                    results['ocr_by_page'].append(page_content)
                     if page_content:
                         results['text_by_page'].append(f"=== Page {page_num+1} ===\n{page_content}")
                     else:
@@ -285,7 +338,7 @@ class OCRService:
                 
                 # Perform comprehensive OCR on entire document
                 print("Performing comprehensive OCR on entire document...")
-                results['full_document_ocr'] = self.do_ocr_on_pdf(pdf_path)
+                results['full_document_ocr'] = self.do_ocr_on_pdf(pdf_path, results['ocr_by_page'])
                 
         except Exception as e:
             print(f"PDF extraction error: {e}")
@@ -346,7 +399,7 @@ class OCRService:
         # OCR on every page (for image text)
         ocr_text_content = []
         try:
-            images = convert_from_path(pdf_path)
+            images = self.image_store.render_pdf_pages(pdf_path)
             for img in images:
                 ocr_text = pytesseract.image_to_string(img, lang="eng")
                 ocr_text_content.append(ocr_text)
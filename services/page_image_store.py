@@ -0,0 +1,264 @@
+import os
+import time
+import hashlib
+import logging
+from typing import Callable, List, Optional
+
+from PIL import Image
+from config.settings import settings
+
+
+class PageImageStore:
+    """
+    Disk store for rendered PDF pages.
+
+    Pages are rendered once and saved either as compressed grayscale PNGs
+    or as raw uint8 arrays (``.npy``) that can be memory-mapped. Entries are
+    keyed by the document content hash, the page number, the render
+    resolution and the renderer (pdf2image and pdfplumber rasterize the same
+    page differently), so re-OCR with a different tesseract config or on a region
+    of interest reads pixels directly instead of re-rasterizing the PDF.
+    The least recently used entries are evicted once the store grows past
+    ``max_bytes``. The store size is tracked incrementally per process and
+    re-measured on disk (other workers write too) at most once per
+    ``evict_interval`` seconds, or as soon as the tracked size exceeds it.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = None,
+        image_format: str = None,
+        max_bytes: int = None,
+        enabled: bool = None,
+        evict_interval: float = None,
+    ):
+        self.root_dir = root_dir or settings.page_image_store_dir
+        self.image_format = (image_format or settings.page_image_store_format).lower()
+        self.max_bytes = max_bytes if max_bytes is not None else settings.page_image_store_max_mb * 1024 * 1024
+        self.enabled = settings.page_image_store_enabled if enabled is None else enabled
+        self.evict_interval = (
+            settings.page_image_store_evict_interval_seconds if evict_interval is None else evict_interval
+        )
+        self._total_bytes: Optional[int] = None  # unknown until the first scan
+        self._last_scan = 0.0
+        if self.image_format not in ("png", "npy"):
+            raise ValueError(f"Unsupported page image format: {self.image_format}")
+        if self.enabled:
+            os.makedirs(self.root_dir, exist_ok=True)
+
+    # --------------------------
+    # KEYS
+    # --------------------------
+    @staticmethod
+    def document_key(file_path: str) -> str:
+        """
+        Content hash of a source document, used as the store namespace.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, doc_key: str, page_num: int, resolution: int, renderer: str = "pdf2image") -> str:
+        filename = f"p{page_num:04d}_r{resolution}_{renderer}.{self.image_format}"
+        return os.path.join(self.root_dir, doc_key[:2], doc_key, filename)
+
+    # --------------------------
+    # READ / WRITE
+    # --------------------------
+    def get(
+        self, doc_key: str, page_num: int, resolution: int, renderer: str = "pdf2image"
+    ) -> Optional[Image.Image]:
+        """
+        Return the stored page as a grayscale PIL image, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        path = self._entry_path(doc_key, page_num, resolution, renderer)
+        if not os.path.exists(path):
+            return None
+        try:
+            if self.image_format == "npy":
+                image = Image.fromarray(self.get_array(doc_key, page_num, resolution, renderer))
+            else:
+                image = Image.open(path)
+                image.load()
+            os.utime(path, None)
+            return image
+        except Exception as e:
+            logging.warning(f"Discarding unreadable page image {path}: {e}")
+            self._remove(path)
+            return None
+
+    def get_array(self, doc_key: str, page_num: int, resolution: int, renderer: str = "pdf2image"):
+        """
+        Return the stored page as a read-only memory-mapped numpy array.
+        Only available when the store uses the ``npy`` format.
+        """
+        import numpy as np
+
+        if self.image_format != "npy":
+            raise ValueError("Memory-mapped access requires the 'npy' page image format")
+        path = self._entry_path(doc_key, page_num, resolution, renderer)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def put(
+        self, doc_key: str, page_num: int, resolution: int, image: Image.Image, renderer: str = "pdf2image"
+    ) -> Image.Image:
+        """
+        Save a rendered page and return the grayscale image that was stored.
+        """
+        gray = image.convert("L")
+        if not self.enabled:
+            return gray
+
+        path = self._entry_path(doc_key, page_num, resolution, renderer)
+        replaced = self._size(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            if self.image_format == "npy":
+                import numpy as np
+
+                with open(tmp_path, "wb") as f:
+                    np.save(f, np.asarray(gray, dtype=np.uint8))
+            else:
+                gray.save(tmp_path, format="PNG", optimize=True)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Failed to store page image {path}: {e}")
+            self._remove(tmp_path)
+            return gray
+
+        if self._total_bytes is not None:
+            self._total_bytes += self._size(path) - replaced
+        self._maybe_evict()
+        return gray
+
+    def get_or_render(
+        self,
+        doc_key: str,
+        page_num: int,
+        resolution: int,
+        render: Callable[[], Image.Image],
+        renderer: str = "pdf2image",
+    ) -> Image.Image:
+        """
+        Return the stored page, rendering and storing it on a miss.
+        """
+        image = self.get(doc_key, page_num, resolution, renderer)
+        if image is not None:
+            return image
+        return self.put(doc_key, page_num, resolution, render(), renderer)
+
+    def render_pdf_pages(self, pdf_path: str, resolution: int = 200) -> List[Image.Image]:
+        """
+        Render every page of a PDF, reusing stored pages where possible.
+
+        Args:
+            pdf_path: Path to PDF file
+            resolution: Render DPI
+
+        Returns:
+            List of grayscale PIL images, one per page
+        """
+        from pdf2image import convert_from_path, pdfinfo_from_path
+
+        if not self.enabled:
+            return convert_from_path(pdf_path, dpi=resolution)
+
+        doc_key = self.document_key(pdf_path)
+        page_count = pdfinfo_from_path(pdf_path)["Pages"]
+        pages = []
+        for page_num in range(page_count):
+            pages.append(
+                self.get_or_render(
+                    doc_key,
+                    page_num,
+                    resolution,
+                    lambda n=page_num: convert_from_path(
+                        pdf_path, dpi=resolution, first_page=n + 1, last_page=n + 1
+                    )[0],
+                )
+            )
+        return pages
+
+    # --------------------------
+    # EVICTION
+    # --------------------------
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root_dir):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _maybe_evict(self) -> int:
+        """Evict when the tracked size is over budget or the last scan is stale"""
+        if (
+            self._total_bytes is not None
+            and self._total_bytes <= self.max_bytes
+            and time.monotonic() - self._last_scan < self.evict_interval
+        ):
+            return 0
+        return self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove least recently used pages until the store fits in max_bytes.
+
+        Returns:
+            Number of evicted entries
+        """
+        if not self.enabled or self.max_bytes <= 0:
+            return 0
+        entries = list(self._entries())
+        total = sum(size for _, size, _ in entries)
+        self._last_scan = time.monotonic()
+        self._total_bytes = total
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+        self._total_bytes = total
+        return evicted
+
+    def invalidate(self, doc_key: str) -> None:
+        """Drop every stored page of a document."""
+        doc_dir = os.path.dirname(self._entry_path(doc_key, 0, 0))
+        if not os.path.isdir(doc_dir):
+            return
+        for filename in os.listdir(doc_dir):
+            self._remove(os.path.join(doc_dir, filename))
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Global instance
+page_image_store = PageImageStore()
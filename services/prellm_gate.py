@@ -0,0 +1,145 @@
+"""
+Gate between the pre-LLM pipeline and the section LLM calls.
+
+``PreprocessingPipeline`` detects a set of B650 fields with confidences
+and decides ``requires_llm``. Per section, the gate maps confidently
+detected fields onto the section schema and picks one of three modes:
+
+- ``skip``: the pipeline does not require the LLM and every field of the
+  section schema was detected; the section is built locally.
+- ``targeted``: at least ``prellm_targeted_min_core_coverage`` of the
+  section's core fields were detected; the regular section prompt (its
+  instructions and the section text) is narrowed to the remaining fields.
+- ``full``: too little was detected; the regular section prompt runs.
+
+Only Section B is gated: the pipeline detects bill of lading, ports,
+weight and packages, but none of the Section C fields and only the
+consignee of Section A, too little to ever narrow those prompts.
+
+Counters for calls avoided and prompt tokens saved are kept in Redis
+(shared by all workers), falling back to process memory.
+"""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from config.settings import settings
+from services.llm_cache import redis_from_url
+
+
+# Section schema field -> PreprocessingPipeline field, for the gated sections
+SECTION_FIELD_MAP: Dict[str, Dict[str, str]] = {
+    "section_b": {
+        "ocean_bill_of_lading_no": "bl_number",
+        "loading_port": "port_of_loading",
+        "discharge_port": "port_of_discharge",
+        "gross_weight": "gross_weight",
+        "number_of_packages": "number_of_packages",
+    },
+}
+
+# Fields a section must have detected before its prompt is narrowed
+SECTION_CORE_FIELDS: Dict[str, List[str]] = {
+    "section_b": ["ocean_bill_of_lading_no", "loading_port", "discharge_port", "gross_weight", "number_of_packages"],
+}
+
+
+@dataclass
+class GateDecision:
+    """How a section should be extracted"""
+    section: str
+    mode: str
+    known: Dict[str, str] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)
+
+
+class PreLLMGate:
+    """Decide per section whether the LLM is needed, and track the savings"""
+
+    PREFIX = "prellm_gate:stats:"
+    COUNTERS = ("calls_avoided", "targeted_calls", "full_calls", "tokens_saved")
+
+    def __init__(self):
+        self._client = None
+        self._local = {name: 0 for name in self.COUNTERS}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis_from_url(settings.redis_url, settings.llm_cache_redis_db)
+        return self._client
+
+    def decide(self, section: str, preprocessing_result, schema_fields: List[str]) -> GateDecision:
+        """
+        Args:
+            section: "section_a", "section_b" or "section_c"
+            preprocessing_result: PreprocessingResult for the section text
+            schema_fields: Field names of the section response schema
+
+        Returns:
+            GateDecision with the locally known values and the fields left for the LLM
+        """
+        if not settings.prellm_gate_enabled or preprocessing_result is None or section not in SECTION_FIELD_MAP:
+            return GateDecision(section, "full")
+
+        detected = preprocessing_result.structured_data
+        known = {}
+        for schema_field, pipeline_field in SECTION_FIELD_MAP.get(section, {}).items():
+            found = detected.get(pipeline_field)
+            if found and found.cleaned_value and found.confidence >= settings.prellm_min_confidence:
+                known[schema_field] = found.cleaned_value
+
+        core = SECTION_CORE_FIELDS[section]
+        covered = sum(1 for f in core if f in known) / len(core)
+        if not known or covered < settings.prellm_targeted_min_core_coverage:
+            return GateDecision(section, "full")
+        missing = [f for f in schema_fields if f not in known]
+        if not missing and not preprocessing_result.requires_llm:
+            return GateDecision(section, "skip", known)
+        return GateDecision(section, "targeted", known, missing)
+
+    # --------------------------
+    # COUNTERS
+    # --------------------------
+    def record(self, decision: GateDecision, full_tokens: int, used_tokens: int = 0) -> None:
+        counter = {"skip": "calls_avoided", "targeted": "targeted_calls"}.get(decision.mode, "full_calls")
+        saved = max(full_tokens - used_tokens, 0) if decision.mode != "full" else 0
+        logging.info(f"Pre-LLM gate {decision.section}: {decision.mode}, {saved} prompt tokens saved")
+        try:
+            pipe = self.client.pipeline()
+            pipe.incr(self.PREFIX + counter)
+            pipe.incrby(self.PREFIX + "tokens_saved", saved)
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Pre-LLM gate counters unavailable: {e}")
+            with self._lock:
+                self._local[counter] += 1
+                self._local["tokens_saved"] += saved
+
+    def stats(self) -> Dict[str, int]:
+        try:
+            values = self.client.mget([self.PREFIX + name for name in self.COUNTERS])
+            return {name: int(value or 0) for name, value in zip(self.COUNTERS, values)}
+        except Exception as e:
+            logging.warning(f"Pre-LLM gate stats unavailable: {e}")
+            with self._lock:
+                return dict(self._local)
+
+
+def build_targeted_prompt(prompt: str, missing: List[str], known: Dict[str, str]) -> str:
+    """Section prompt narrowed to the fields the pre-LLM pipeline did not detect"""
+    return "\n".join([
+        prompt,
+        "",
+        f"These fields were already read from the document: {json.dumps(known, default=str)}.",
+        f"Return ONLY these fields, nested the same way: {', '.join(missing)}.",
+        "Use null for any field not present in this document.",
+    ])
+
+
+# Global instance
+prellm_gate = PreLLMGate()
@@ -0,0 +1,96 @@
+"""
+Provider-side prompt prefix caching.
+
+OpenAI caches the longest previously seen prompt prefix (from 1024 tokens,
+in 128-token steps) and bills it at a discount with lower latency. The
+prompt templates therefore keep persona, instructions and schema in a
+static prefix and put every per-document variable at the end. This module
+finds that static prefix for a template and tracks, per call, how many
+prompt tokens the provider reports as served from its cache.
+"""
+
+import logging
+import threading
+from typing import Any, Dict
+
+from config.settings import settings
+from services.llm_cache import redis_from_url
+
+# Minimum prompt length the provider caches
+MIN_CACHEABLE_TOKENS = 1024
+
+_SENTINEL = "\x00{name}\x00"
+
+
+def static_prefix(prompt_template) -> str:
+    """
+    Rendered text of a template before its first variable, i.e. the part
+    that is byte-identical for every document.
+    """
+    names = prompt_template.input_variables
+    rendered = prompt_template.format(**{name: _SENTINEL.format(name=name) for name in names})
+    # Declared variables need not all appear in the template text
+    positions = [rendered.find(_SENTINEL.format(name=name)) for name in names]
+    return rendered[:min((p for p in positions if p >= 0), default=len(rendered))]
+
+
+def cached_tokens(response: Any) -> Dict[str, int]:
+    """Prompt and cached prompt tokens from a chat model response's usage"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {"prompt_tokens": int(usage.get("input_tokens") or 0), "cached_tokens": int(details.get("cache_read") or 0)}
+
+
+class PromptPrefixStats:
+    """Counters of prompt tokens served from the provider's prefix cache"""
+
+    PREFIX = "prompt_prefix:stats:"
+    COUNTERS = ("calls", "prompt_tokens", "cached_tokens")
+
+    def __init__(self):
+        self._client = None
+        self._local = {name: 0 for name in self.COUNTERS}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis_from_url(settings.redis_url, settings.llm_cache_redis_db)
+        return self._client
+
+    def record(self, response: Any, key: str = "") -> None:
+        usage = cached_tokens(response)
+        if not usage["prompt_tokens"]:
+            return
+        logging.info(f"Prompt prefix cache {key}: {usage['cached_tokens']}/{usage['prompt_tokens']} prompt tokens cached")
+        try:
+            pipe = self.client.pipeline()
+            pipe.incr(self.PREFIX + "calls")
+            pipe.incrby(self.PREFIX + "prompt_tokens", usage["prompt_tokens"])
+            pipe.incrby(self.PREFIX + "cached_tokens", usage["cached_tokens"])
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Prompt prefix counters unavailable: {e}")
+            with self._lock:
+                self._local["calls"] += 1
+                self._local["prompt_tokens"] += usage["prompt_tokens"]
+                self._local["cached_tokens"] += usage["cached_tokens"]
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            values = self.client.mget([self.PREFIX + name for name in self.COUNTERS])
+            counters = {name: int(value or 0) for name, value in zip(self.COUNTERS, values)}
+        except Exception as e:
+            logging.warning(f"Prompt prefix stats unavailable: {e}")
+            with self._lock:
+                counters = dict(self._local)
+        calls = counters["calls"]
+        return {
+            **counters,
+            "cached_tokens_per_call": counters["cached_tokens"] / calls if calls else 0.0,
+            "cached_share": counters["cached_tokens"] / counters["prompt_tokens"] if counters["prompt_tokens"] else 0.0,
+        }
+
+
+# Global instance
+prompt_prefix_stats = PromptPrefixStats()
@@ -0,0 +1,113 @@
+"""
+Precompiled prompt templates.
+
+The prompt builders in ``prompts/`` construct a LangChain
+``PromptTemplate`` on every call, which re-parses and validates the whole
+template before it is formatted with the document text. The registry
+compiles each template once at import (worker start): placeholders are
+parsed into literal segments, checked against the declared variables, and
+the static token count and prefix are recorded. Rendering is then a
+single join. LangChain is not needed to render; ``as_langchain`` builds
+the equivalent ``PromptTemplate`` for callers that want one.
+"""
+
+import logging
+from string import Formatter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from prompts.Item_extraction_prompt import ITEMS_EXTRACTION_TEMPLATE, ITEMS_EXTRACTION_VARIABLES
+from prompts.B650_section_a_extraction_prompt import B650_SECTION_A_TEMPLATE, B650_SECTION_A_VARIABLES
+from prompts.B650_section_b_sea_extraction_prompt import B650_SECTION_B_SEA_TEMPLATE, B650_SECTION_B_SEA_VARIABLES
+from prompts.B650_section_c_extraction_prompt import B650_SECTION_C_TEMPLATE, B650_SECTION_C_VARIABLES
+from prompts.B650_combined_extraction_prompt import B650_COMBINED_TEMPLATE, B650_COMBINED_VARIABLES
+from services.token_budget import token_budget
+
+
+class CompiledPrompt:
+    """A template parsed once into literal segments and placeholders"""
+
+    def __init__(self, name: str, template: str, input_variables: Sequence[str]):
+        self.name = name
+        self.template = template
+        self.input_variables = list(input_variables)
+        self._literals: List[str] = []
+        self._fields: List[str] = []
+
+        # parse() also splits literal text at escaped braces, so literals
+        # are accumulated until the next placeholder
+        pending: List[str] = []
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            pending.append(literal)
+            if field is None:
+                continue
+            if format_spec or conversion or not field.isidentifier():
+                raise ValueError(f"Prompt {name}: unsupported placeholder {{{field}}}")
+            if field not in self.input_variables:
+                raise ValueError(f"Prompt {name}: placeholder {{{field}}} is not a declared variable")
+            self._literals.append("".join(pending))
+            self._fields.append(field)
+            pending = []
+        self._literals.append("".join(pending))
+
+        unused = set(self.input_variables) - set(self._fields)
+        if unused:
+            logging.debug(f"Prompt {name}: declared variable(s) not in template: {', '.join(sorted(unused))}")
+
+        self.static_prefix = self._literals[0]
+        self.static_tokens = token_budget.count("".join(self._literals))
+        self.prefix_tokens = token_budget.count(self.static_prefix)
+
+    def render(self, **values) -> str:
+        missing = [field for field in self._fields if field not in values]
+        if missing:
+            raise ValueError(f"Prompt {self.name}: missing variable(s) {', '.join(missing)}")
+        parts = [self._literals[0]]
+        for field, literal in zip(self._fields, self._literals[1:]):
+            parts.append(str(values[field]))
+            parts.append(literal)
+        return "".join(parts)
+
+    # PromptTemplate-compatible name, for code written against LangChain
+    format = render
+
+    def as_langchain(self):
+        from langchain.prompts import PromptTemplate
+
+        return PromptTemplate(input_variables=self.input_variables, template=self.template)
+
+
+class PromptRegistry:
+    """Compiled extraction prompts by name"""
+
+    def __init__(self, templates: Optional[Dict[str, Tuple[str, Sequence[str]]]] = None):
+        self._prompts: Dict[str, CompiledPrompt] = {}
+        for name, (template, variables) in (templates or {}).items():
+            self.register(name, template, variables)
+
+    def register(self, name: str, template: str, input_variables: Sequence[str]) -> CompiledPrompt:
+        compiled = CompiledPrompt(name, template, input_variables)
+        self._prompts[name] = compiled
+        logging.debug(f"Compiled prompt {name}: {compiled.static_tokens} static tokens")
+        return compiled
+
+    def get(self, name: str) -> CompiledPrompt:
+        return self._prompts[name]
+
+    def render(self, name: str, **values) -> str:
+        return self._prompts[name].render(**values)
+
+    def static_tokens(self) -> Dict[str, int]:
+        return {name: prompt.static_tokens for name, prompt in self._prompts.items()}
+
+    def names(self) -> List[str]:
+        return list(self._prompts)
+
+
+# Global instance, compiled at import
+prompt_registry = PromptRegistry({
+    "items": (ITEMS_EXTRACTION_TEMPLATE, ITEMS_EXTRACTION_VARIABLES),
+    "section_a": (B650_SECTION_A_TEMPLATE, B650_SECTION_A_VARIABLES),
+    "section_b_sea": (B650_SECTION_B_SEA_TEMPLATE, B650_SECTION_B_SEA_VARIABLES),
+    "section_c": (B650_SECTION_C_TEMPLATE, B650_SECTION_C_VARIABLES),
+    "combined": (B650_COMBINED_TEMPLATE, B650_COMBINED_VARIABLES),
+})
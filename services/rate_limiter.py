@@ -0,0 +1,245 @@
+"""
+Cross-worker LLM rate limiter.
+
+Every worker process draws from the same Redis-backed token buckets: one
+for requests per minute and one for (estimated) tokens per minute, so the
+fleet as a whole stays under the provider limits instead of each process
+discovering them through 429s. A shared in-flight set caps concurrent
+requests.
+
+Calls run in a priority lane. The "bulk" lane (reprocessing, batch jobs)
+may not draw the buckets below a reserve and yields while any
+"interactive" caller is waiting, so single-document processes go first.
+Limiter failures (e.g. Redis down) never fail a call.
+"""
+
+import time
+import uuid
+import random
+import asyncio
+import logging
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+from config.settings import settings
+from services.llm_cache import redis_from_url
+
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+_lane: contextvars.ContextVar = contextvars.ContextVar("llm_lane", default=INTERACTIVE)
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a call waited longer than the configured maximum for capacity"""
+
+
+# Atomic check-and-take over both buckets, the in-flight set and the
+# interactive waiters. Returns "0" when granted, otherwise seconds to wait.
+_ACQUIRE_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local lease = ARGV[1]
+local tokens = tonumber(ARGV[2])
+local rpm_cap = tonumber(ARGV[3])
+local tpm_cap = tonumber(ARGV[4])
+local bulk = ARGV[5] == '1'
+local reserve = tonumber(ARGV[6])
+local max_inflight = tonumber(ARGV[7])
+local lease_ttl = tonumber(ARGV[8])
+
+local function level(key, cap)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local value = tonumber(state[1]) or cap
+    local ts = tonumber(state[2]) or now
+    return math.min(cap, value + math.max(0, now - ts) * cap / 60)
+end
+
+local rpm = level(KEYS[1], rpm_cap)
+local tpm = level(KEYS[2], tpm_cap)
+local rpm_floor, tpm_floor = 0, 0
+
+redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', now - 30)
+if bulk then
+    if redis.call('ZCARD', KEYS[4]) > 0 then
+        return '1'
+    end
+    rpm_floor = rpm_cap * reserve
+    tpm_floor = tpm_cap * reserve
+end
+
+local wait = 0
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+if redis.call('ZCARD', KEYS[3]) >= max_inflight then
+    wait = 0.25
+end
+if rpm - 1 < rpm_floor then
+    wait = math.max(wait, (rpm_floor + 1 - rpm) * 60 / rpm_cap)
+end
+if tpm - tokens < tpm_floor then
+    wait = math.max(wait, (tpm_floor + tokens - tpm) * 60 / tpm_cap)
+end
+
+if wait > 0 then
+    if not bulk then
+        redis.call('ZADD', KEYS[4], now, lease)
+    end
+    return tostring(wait)
+end
+
+redis.call('HSET', KEYS[1], 'level', rpm - 1, 'ts', now)
+redis.call('HSET', KEYS[2], 'level', tpm - tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 120)
+redis.call('EXPIRE', KEYS[2], 120)
+redis.call('ZADD', KEYS[3], now + lease_ttl, lease)
+redis.call('ZREM', KEYS[4], lease)
+return '0'
+"""
+
+
+class LLMRateLimiter:
+    """Distributed RPM/TPM token buckets with priority lanes and an in-flight cap"""
+
+    PREFIX = "llm_rate:"
+    LEASE_TTL_SECONDS = 300
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        max_inflight: Optional[int] = None,
+        bulk_reserve: Optional[float] = None,
+        max_wait_seconds: Optional[float] = None,
+    ):
+        self.rpm = rpm or settings.llm_rate_limit_rpm
+        self.tpm = tpm or settings.llm_rate_limit_tpm
+        self.max_inflight = max_inflight or settings.llm_max_inflight
+        self.bulk_reserve = bulk_reserve if bulk_reserve is not None else settings.llm_rate_limit_bulk_reserve
+        self.max_wait_seconds = max_wait_seconds or settings.llm_rate_limit_max_wait_seconds
+        self._client = None
+        self._script = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis_from_url(settings.redis_url, settings.llm_rate_limit_redis_db)
+        return self._client
+
+    @property
+    def script(self):
+        if self._script is None:
+            self._script = self.client.register_script(_ACQUIRE_SCRIPT)
+        return self._script
+
+    @property
+    def keys(self):
+        return [self.PREFIX + name for name in ("rpm", "tpm", "inflight", "waiting")]
+
+    # --------------------------
+    # LANES
+    # --------------------------
+    @staticmethod
+    def current_lane() -> str:
+        return _lane.get()
+
+    @staticmethod
+    @contextmanager
+    def lane(name: str):
+        """Run the enclosed LLM calls in a priority lane ("interactive" or "bulk")"""
+        token = _lane.set(name)
+        try:
+            yield
+        finally:
+            _lane.reset(token)
+
+    # --------------------------
+    # ACQUIRE / RELEASE
+    # --------------------------
+    def _try_acquire(self, lease: str, tokens: int) -> float:
+        """Take capacity for one request; returns 0 when granted, else seconds to wait"""
+        tokens = min(tokens, int(self.tpm * (1 - self.bulk_reserve)))
+        wait = self.script(
+            keys=self.keys,
+            args=[
+                lease,
+                tokens,
+                self.rpm,
+                self.tpm,
+                1 if self.current_lane() == BULK else 0,
+                self.bulk_reserve,
+                self.max_inflight,
+                self.LEASE_TTL_SECONDS,
+            ],
+        )
+        return float(wait)
+
+    def _next_wait(self, lease: str, tokens: int, started: float) -> float:
+        try:
+            wait = self._try_acquire(lease, tokens)
+        except Exception as e:
+            logging.warning(f"LLM rate limiter unavailable, proceeding: {e}")
+            return 0.0
+        if wait and time.monotonic() - started + wait > self.max_wait_seconds:
+            raise RateLimitTimeout(f"No LLM capacity after {self.max_wait_seconds}s ({self.current_lane()} lane)")
+        # Jitter so waiting workers do not retry in lockstep
+        return wait * random.uniform(1.0, 1.2) if wait else 0.0
+
+    def acquire(self, tokens: int) -> Optional[str]:
+        """
+        Block until the shared budgets admit a request of ``tokens`` tokens.
+
+        Returns:
+            Lease id to pass to release(), or None when limiting is disabled
+        """
+        if not settings.llm_rate_limit_enabled:
+            return None
+        lease, started = uuid.uuid4().hex, time.monotonic()
+        while True:
+            wait = self._next_wait(lease, tokens, started)
+            if not wait:
+                return lease
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> Optional[str]:
+        """Async counterpart of acquire; waits without blocking the event loop"""
+        if not settings.llm_rate_limit_enabled:
+            return None
+        lease, started = uuid.uuid4().hex, time.monotonic()
+        while True:
+            wait = await asyncio.to_thread(self._next_wait, lease, tokens, started)
+            if not wait:
+                return lease
+            await asyncio.sleep(wait)
+
+    def release(self, lease: Optional[str]) -> None:
+        """Free the in-flight slot held by a lease"""
+        if lease is None:
+            return
+        try:
+            self.client.zrem(self.keys[2], lease)
+        except Exception as e:
+            logging.warning(f"LLM rate limiter release failed: {e}")
+
+    @contextmanager
+    def slot(self, tokens: int):
+        lease = self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int):
+        lease = await self.aacquire(tokens)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.release, lease)
+
+
+# Global instance
+llm_rate_limiter = LLMRateLimiter()
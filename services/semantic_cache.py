@@ -0,0 +1,216 @@
+"""
+Near-duplicate document cache for section extractions.
+
+The exact-prompt cache misses recurring documents that differ only in an
+invoice number, a date or an amount. Here each section text is reduced to
+a MinHash signature over word shingles (digits masked, so changed numbers
+do not change the shingles) and indexed with locality-sensitive hashing
+bands in Redis. When a past document is similar enough, its extraction is
+reused as a skeleton: string values that still appear in the new text as
+whole words are kept, and the rest (numbers and nulls included) are asked
+of the LLM.
+
+Documents are keyed by a hash of their section text, so storing the same
+document again refreshes its entry, and each band bucket keeps only its
+``semantic_cache_max_band_size`` most recent documents.
+
+MinHash keeps this local and cheap; the sentence-transformers encoder
+referenced by the tariff classifier would add a model load to every
+worker for a job that lexical similarity already covers.
+"""
+
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from services.llm_cache import redis_from_url
+
+_MERSENNE = (1 << 61) - 1
+_SEED = 650
+
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = re.sub(r"\d", "0", text.lower())
+    words = re.findall(r"[a-z0]+", words)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _leaves(value: Any) -> List[Any]:
+    if isinstance(value, dict):
+        return [leaf for item in value.values() for leaf in _leaves(item)]
+    if isinstance(value, list):
+        return [leaf for item in value for leaf in _leaves(item)]
+    return [value]
+
+
+def word_text(text: str) -> str:
+    """Lowercased words and numbers separated by single spaces, padded with a space each side"""
+    return f" {' '.join(re.findall(r'[a-z0-9]+', text.lower()))} "
+
+
+def value_in_text(value: Any, words: str) -> bool:
+    """
+    Whether every non-null string leaf of a value occurs in the text
+    (see word_text) on word boundaries. Numbers are never taken as found:
+    amounts and weights are formatted too many ways to match reliably.
+    """
+    for leaf in _leaves(value):
+        if leaf is None or isinstance(leaf, bool):
+            continue
+        if isinstance(leaf, (int, float)):
+            return False
+        needle = word_text(str(leaf))
+        # Very short values (single digits, codes like "A") match anywhere
+        if len(needle.replace(" ", "")) < 3 or needle not in words:
+            return False
+    return True
+
+
+class SemanticCache:
+    """MinHash/LSH index of past section extractions"""
+
+    PREFIX = "semantic_cache:"
+
+    def __init__(self, num_perm: int = None, bands: int = None):
+        self.num_perm = num_perm or settings.semantic_cache_num_perm
+        self.bands = bands or settings.semantic_cache_bands
+        self.rows = self.num_perm // self.bands
+        rng = random.Random(_SEED)
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(self.num_perm)]
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis_from_url(settings.redis_url, settings.llm_cache_redis_db)
+        return self._client
+
+    # --------------------------
+    # SIGNATURES
+    # --------------------------
+    def signature(self, text: str) -> List[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+            for s in _shingles(text)
+        ]
+        if not hashes:
+            return []
+        return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in self._perms]
+
+    @staticmethod
+    def similarity(first: List[int], second: List[int]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        if not first or len(first) != len(second):
+            return 0.0
+        return sum(x == y for x, y in zip(first, second)) / len(first)
+
+    def _band_keys(self, section: str, signature: List[int]) -> List[str]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.sha1(",".join(map(str, rows)).encode("utf-8")).hexdigest()[:16]
+            keys.append(f"{self.PREFIX}bucket:{section}:{band}:{digest}")
+        return keys
+
+    @staticmethod
+    def document_id(section: str, text: str) -> str:
+        """Stable key of a section text"""
+        return hashlib.sha1(f"{section}\n{text}".encode("utf-8")).hexdigest()
+
+    # --------------------------
+    # LOOKUP / STORE
+    # --------------------------
+    def lookup(self, section: str, text: str) -> Optional[Tuple[float, Any]]:
+        """
+        Returns:
+            (similarity, past extraction) of the most similar indexed
+            document above the threshold, or None
+        """
+        if not settings.semantic_cache_enabled:
+            return None
+        signature = self.signature(text)
+        if not signature:
+            return None
+        try:
+            pipe = self.client.pipeline()
+            for key in self._band_keys(section, signature):
+                pipe.zrange(key, 0, -1)
+            candidates = set().union(*pipe.execute())
+            if not candidates:
+                return None
+            entries = self.client.mget([f"{self.PREFIX}doc:{c.decode('utf-8')}" for c in candidates])
+        except Exception as e:
+            logging.warning(f"Semantic cache lookup failed: {e}")
+            return None
+
+        best = None
+        for raw in entries:
+            if raw is None:
+                continue
+            entry = json.loads(raw)
+            score = self.similarity(signature, entry["signature"])
+            if score >= settings.semantic_cache_threshold and (best is None or score > best[0]):
+                best = (score, entry["result"])
+        return best
+
+    def store(self, section: str, text: str, result: Any) -> None:
+        if not settings.semantic_cache_enabled:
+            return
+        signature = self.signature(text)
+        if not signature:
+            return
+        doc_id = self.document_id(section, text)
+        ttl = settings.llm_cache_ttl_seconds or None
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(f"{self.PREFIX}doc:{doc_id}", json.dumps({"signature": signature, "result": result}, default=str), ex=ttl)
+            for key in self._band_keys(section, signature):
+                # Scored by store time; re-adding a document only refreshes its score
+                pipe.zadd(key, {doc_id: time.time()})
+                pipe.zremrangebyrank(key, 0, -settings.semantic_cache_max_band_size - 1)
+                if ttl:
+                    pipe.expire(key, ttl)
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Semantic cache store failed: {e}")
+
+    # --------------------------
+    # SKELETONS
+    # --------------------------
+    @staticmethod
+    def split_skeleton(values: Dict[str, Any], text: str) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Split a past extraction into the values still supported by the new
+        text and the fields that must be extracted again (including those
+        that were null, as the new document may carry them).
+        """
+        words = word_text(text)
+        kept, changed = {}, []
+        for name, value in values.items():
+            if value is not None and value_in_text(value, words):
+                kept[name] = value
+            else:
+                changed.append(name)
+        return kept, changed
+
+
+def build_fill_prompt(prompt: str, changed: List[str]) -> str:
+    """Section prompt narrowed to the fields that differ from the near-duplicate"""
+    return "\n".join([
+        prompt,
+        "",
+        "A near-identical document from the same sender was extracted before; its other fields are already known.",
+        f"Return ONLY these fields, nested the same way: {', '.join(changed)}.",
+        "Use null for any field not present in this document.",
+    ])
+
+
+# Global instance
+semantic_cache = SemanticCache()
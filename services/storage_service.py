@@ -0,0 +1,240 @@
+"""
+Source document storage with a local read-through cache.
+
+Uploaded documents live either on local disk or in S3 (``settings.storage_type``).
+OCR and the extraction tasks need a local file, so remote objects are streamed
+into a bounded on-disk cache, validated against their checksum and evicted in
+least-recently-used order. Repeated tasks on the same document (extract,
+retry, sections A/B/C) then read from local disk.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import shutil
+from typing import Dict, Optional
+
+from config.settings import settings
+
+
+class StorageError(Exception):
+    """Raised when a document cannot be fetched or fails validation"""
+
+
+class FilesystemBucket:
+    """
+    Filesystem-backed stand-in for an S3 bucket.
+
+    Implements the subset of the boto3 client used by ``StorageService``
+    (``put_object`` / ``head_object`` / ``get_object``) over a local
+    directory, for tests and local development without object storage.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def _path(self, Key: str) -> str:
+        return os.path.join(self.root_dir, Key)
+
+    def put_object(self, Bucket: str, Key: str, Body, Metadata: Optional[Dict] = None) -> Dict:
+        path = self._path(Key)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body if isinstance(Body, bytes) else Body.read())
+        return self.head_object(Bucket, Key)
+
+    def head_object(self, Bucket: str, Key: str) -> Dict:
+        path = self._path(Key)
+        if not os.path.exists(path):
+            raise StorageError(f"No such key: {Key}")
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(chunk)
+        return {"ContentLength": os.path.getsize(path), "ETag": f'"{md5.hexdigest()}"', "Metadata": {}}
+
+    def get_object(self, Bucket: str, Key: str) -> Dict:
+        head = self.head_object(Bucket, Key)
+        return {**head, "Body": open(self._path(Key), "rb")}
+
+
+class ReadThroughCache:
+    """Bounded local cache of remote objects with LRU eviction"""
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, key: str):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        ext = os.path.splitext(key)[1].lower()
+        base = os.path.join(self.cache_dir, digest[:2], digest)
+        return base + ext, base + ".meta"
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the cached path for a key, or None if missing or corrupt"""
+        path, meta_path = self._paths(key)
+        if not (os.path.exists(path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if os.path.getsize(path) != meta["size"]:
+                raise StorageError("size mismatch")
+        except Exception as e:
+            logging.warning(f"Dropping corrupt cache entry for {key}: {e}")
+            self._remove(path, meta_path)
+            return None
+        os.utime(path, None)
+        return path
+
+    def store(self, key: str, body, expected_md5: Optional[str] = None, expected_sha256: Optional[str] = None) -> str:
+        """
+        Stream a remote body into the cache and validate its checksum.
+
+        Args:
+            key: Object key
+            body: File-like object with ``read``
+            expected_md5: Hex MD5 to validate against (single-part ETag)
+            expected_sha256: Hex SHA-256 to validate against (object metadata)
+
+        Returns:
+            Local path of the cached object
+        """
+        path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        md5, sha256, size = hashlib.md5(), hashlib.sha256(), 0
+        try:
+            with open(tmp_path, "wb") as out:
+                for chunk in iter(lambda: body.read(self.CHUNK_SIZE), b""):
+                    md5.update(chunk)
+                    sha256.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            if expected_md5 and md5.hexdigest() != expected_md5:
+                raise StorageError(f"MD5 mismatch for {key}")
+            if expected_sha256 and sha256.hexdigest() != expected_sha256:
+                raise StorageError(f"SHA-256 mismatch for {key}")
+            os.replace(tmp_path, path)
+            with open(meta_path, "w") as f:
+                json.dump({"key": key, "size": size, "sha256": sha256.hexdigest()}, f)
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+            self._remove(tmp_path)
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Remove least recently used objects until the cache fits in
+        max_bytes. The object at keep (just stored, about to be returned)
+        is never removed, even when it alone exceeds max_bytes.
+        """
+        if self.max_bytes <= 0:
+            return 0
+        entries = []
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith((".meta", ".tmp")):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path, os.path.splitext(path)[0] + ".meta")
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _remove(*paths: str) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class StorageService:
+    """Resolve stored document paths to local files"""
+
+    def __init__(self, storage_type: str = None, client=None, bucket: str = None, cache: ReadThroughCache = None):
+        self.storage_type = (storage_type or settings.storage_type).lower()
+        self.bucket = bucket or settings.s3_bucket
+        self._client = client
+        self._cache = cache
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client(
+                "s3",
+                region_name=settings.aws_region,
+                aws_access_key_id=settings.aws_access_key_id,
+                aws_secret_access_key=settings.aws_secret_access_key,
+                endpoint_url=settings.s3_endpoint_url,
+            )
+        return self._client
+
+    @property
+    def cache(self) -> ReadThroughCache:
+        if self._cache is None:
+            self._cache = ReadThroughCache(
+                settings.storage_cache_dir, settings.storage_cache_max_mb * 1024 * 1024
+            )
+        return self._cache
+
+    @staticmethod
+    def object_key(file_path: str) -> str:
+        return file_path[2:] if file_path.startswith("./") else file_path.lstrip("/")
+
+    def local_path(self, file_path: str) -> str:
+        """
+        Return a local path for a stored document, downloading it into
+        the read-through cache if it lives in object storage.
+        """
+        if self.storage_type != "s3":
+            return file_path
+
+        key = self.object_key(file_path)
+        cached = self.cache.lookup(key)
+        if cached:
+            return cached
+
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            raise StorageError(f"Failed to fetch {key} from storage: {e}")
+
+        etag = (response.get("ETag") or "").strip('"')
+        expected_md5 = etag if etag and "-" not in etag else None
+        expected_sha256 = (response.get("Metadata") or {}).get("sha256")
+        logging.info(f"Caching {key} from storage")
+        return self.cache.store(key, response["Body"], expected_md5, expected_sha256)
+
+
+# Global instance
+storage_service = StorageService()
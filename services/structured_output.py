@@ -0,0 +1,371 @@
+"""
+Native structured outputs for LLM extraction.
+
+The JSON schemas in ``llm_response_formats/`` are sent to the provider as
+``json_schema`` response-format constraints instead of only being pasted
+into prompt text. Responses are validated against the pydantic models in
+``schemas/B650``. Failing fields are first repaired deterministically
+(numbers, dates, enum case, JSON-encoded objects); only the fields that
+still fail are re-asked, in a small prompt, rather than retrying the whole
+document.
+"""
+
+import re
+import copy
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, ValidationError
+
+
+# Keywords rejected by strict structured outputs
+STRICT_UNSUPPORTED_KEYWORDS = {"format", "multipleOf", "maxLength", "minLength", "pattern", "minimum", "maximum"}
+
+FieldPath = Tuple[str, ...]
+
+# Day-first before month-first: B650 source documents write dates day first
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y%m%d",
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y", "%d.%m.%y",
+    "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%b-%y", "%d%b%Y", "%d %b, %Y", "%d %B, %Y",
+    "%b %d %Y", "%B %d %Y", "%b %d, %Y", "%B %d, %Y",
+]
+
+# Digit runs with their separators; a sign only at the start of a word ("2024-001" is two numbers)
+_NUMBER = re.compile(r"(?<![\w.,])[-+]?\d[\d.,]*|(?<=[\w.,])\d[\d.,]*")
+_THOUSANDS = {",": re.compile(r"^[-+]?\d{1,3}(?:,\d{3})+$"), ".": re.compile(r"^[-+]?\d{1,3}(?:\.\d{3})+$")}
+
+
+def to_strict_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a JSON schema to the strict structured-output dialect: every
+    property required but nullable, no additional properties, and no
+    unsupported validation keywords.
+    """
+
+    def walk(node: Dict[str, Any], nullable: bool) -> Dict[str, Any]:
+        if "$ref" in node:
+            ref = {"$ref": node["$ref"]}
+            return {"anyOf": [ref, {"type": "null"}]} if nullable else ref
+
+        node = {k: v for k, v in node.items() if k not in STRICT_UNSUPPORTED_KEYWORDS}
+        if "$defs" in node:
+            node["$defs"] = {name: walk(definition, False) for name, definition in node["$defs"].items()}
+
+        node_type = node.get("type")
+        if node_type == "object":
+            properties = node.get("properties", {})
+            node["properties"] = {name: walk(prop, True) for name, prop in properties.items()}
+            node["required"] = list(properties)
+            node["additionalProperties"] = False
+        elif node_type == "array" and "items" in node:
+            node["items"] = walk(node["items"], False)
+
+        if nullable and isinstance(node_type, str):
+            node["type"] = [node_type, "null"]
+            if "enum" in node:
+                node["enum"] = [*node["enum"], None]
+        return node
+
+    return walk(copy.deepcopy(schema), False)
+
+
+def response_format_param(schema: Dict[str, Any], name: str = "extraction_response", strict: bool = True) -> Dict[str, Any]:
+    """Build the chat-completions ``response_format`` payload for a schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "schema": to_strict_schema(schema) if strict else schema,
+            "strict": strict,
+        },
+    }
+
+
+# --------------------------
+# VALIDATION
+# --------------------------
+def validation_errors(model: Type[BaseModel], data: Any) -> Dict[FieldPath, str]:
+    """
+    Validate data against a pydantic model.
+
+    Returns:
+        Mapping of failing field path (wrapper key, field) to error message
+    """
+    try:
+        model.model_validate(data)
+        return {}
+    except ValidationError as e:
+        errors: Dict[FieldPath, str] = {}
+        for error in e.errors():
+            path = tuple(str(part) for part in error["loc"][:2])
+            errors.setdefault(path, error["msg"])
+        return errors
+
+
+def get_path(data: Any, path: FieldPath) -> Any:
+    for part in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def set_path(data: Dict[str, Any], path: FieldPath, value: Any) -> None:
+    for part in path[:-1]:
+        if not isinstance(data.get(part), dict):
+            data[part] = {}
+        data = data[part]
+    data[path[-1]] = value
+
+
+def subset_schema(schema: Dict[str, Any], paths: List[FieldPath]) -> Dict[str, Any]:
+    """Schema restricted to the given field paths, keeping their nesting"""
+    result: Dict[str, Any] = {"type": "object", "properties": {}}
+    if "$defs" in schema:
+        result["$defs"] = schema["$defs"]
+    for path in paths:
+        source, target = schema, result
+        for i, part in enumerate(path):
+            prop = source.get("properties", {}).get(part)
+            if prop is None:
+                break
+            if i == len(path) - 1:
+                target["properties"][part] = prop
+            else:
+                target = target["properties"].setdefault(part, {"type": "object", "properties": {}})
+                source = prop
+    return result
+
+
+def clean_list_field(data: Dict[str, Any], key: str, model: Type[BaseModel]) -> None:
+    """
+    Validate each element of a list field on its own, dropping non-object
+    elements and nulling invalid fields, so list errors never reach the
+    whole-response re-ask (whose field paths do not address list elements).
+    """
+    elements = data.get(key)
+    if not isinstance(elements, list):
+        data[key] = []
+        return
+    cleaned = []
+    for element in elements:
+        if not isinstance(element, dict):
+            continue
+        for path in repaired_errors(model, element):
+            set_path(element, path[:1], None)
+        cleaned.append(element)
+    data[key] = cleaned
+
+
+# --------------------------
+# DETERMINISTIC REPAIRS
+# --------------------------
+def parse_number(value: Any) -> Optional[float]:
+    """
+    The number in a value ("USD 1,234.50" -> 1234.5, "1.234,56 EUR" ->
+    1234.56). Values holding no number or several ("Invoice 2024-001
+    USD 1,500") give None, so the field is asked again instead.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    numbers = _NUMBER.findall(value)
+    if len(numbers) != 1:
+        return None
+    number = numbers[0].rstrip(".,")
+    if "," in number and "." in number:
+        # The last separator is the decimal one: "1.234,56" and "1,234.56"
+        thousands = "." if number.rfind(",") > number.rfind(".") else ","
+        number = number.replace(thousands, "").replace(",", ".")
+    elif "," in number:
+        # "1,250" and "1,250,000" group thousands, "12,5" is a decimal comma
+        number = number.replace(",", "") if _THOUSANDS[","].match(number) else number.replace(",", ".")
+    elif number.count(".") > 1 and _THOUSANDS["."].match(number):
+        number = number.replace(".", "")
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_date(value: Any) -> Optional[str]:
+    """ISO date (YYYY-MM-DD) for the common document date formats"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = re.sub(r"\s+", " ", value.strip().rstrip("."))
+    try:
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        pass
+    text = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text, flags=re.IGNORECASE)
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def field_annotation(model: Type[BaseModel], path: FieldPath) -> Any:
+    """Declared type (Optional unwrapped) of a field path, or None if unknown"""
+    annotation: Any = model
+    for part in path:
+        if not (isinstance(annotation, type) and issubclass(annotation, BaseModel)):
+            return None
+        field = annotation.model_fields.get(part)
+        if field is None:
+            return None
+        annotation = _unwrap_optional(field.annotation)
+    return annotation
+
+
+def repair_value(value: Any, annotation: Any) -> Any:
+    """
+    Deterministic repair of a value towards its declared type; returns
+    the value unchanged when no repair applies.
+    """
+    if value is None or annotation is None:
+        return value
+    if annotation is str:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        if isinstance(value, (int, float, Decimal)):
+            return str(value)
+        if isinstance(value, list) and all(isinstance(part, (str, int, float)) for part in value):
+            return ", ".join(str(part) for part in value)
+        return value
+    if annotation in (float, int, Decimal):
+        number = parse_number(value)
+        if number is None:
+            return value
+        if annotation is int:
+            return int(number) if number.is_integer() else value
+        return number
+    if annotation is date:
+        return parse_date(value) or value
+    if get_origin(annotation) is Literal:
+        if isinstance(value, str):
+            for choice in get_args(annotation):
+                if isinstance(choice, str) and choice.lower() == value.strip().lower():
+                    return choice
+        return value
+    if annotation is dict or (isinstance(annotation, type) and issubclass(annotation, BaseModel)):
+        if isinstance(value, str):
+            try:
+                decoded = json.loads(value)
+            except ValueError:
+                return value
+            return decoded if isinstance(decoded, dict) else value
+        if annotation is not dict and isinstance(value, list) and value and isinstance(value[0], dict):
+            # A one-object section returned as a list of lines: keep the first
+            return value[0]
+    return value
+
+
+def repair_fields(model: Type[BaseModel], data: Dict[str, Any], errors: Dict[FieldPath, str]) -> List[FieldPath]:
+    """Repair the failing fields in place; returns the paths that were changed"""
+    repaired = []
+    for path in errors:
+        value = get_path(data, path)
+        fixed = repair_value(value, field_annotation(model, path))
+        if fixed is not value:
+            set_path(data, path, fixed)
+            repaired.append(path)
+    return repaired
+
+
+def repaired_errors(model: Type[BaseModel], data: Any) -> Dict[FieldPath, str]:
+    """Validate, repair the failing fields in place, and return what still fails"""
+    errors = validation_errors(model, data)
+    if not errors or not isinstance(data, dict):
+        return errors
+    repaired = repair_fields(model, data, errors)
+    if not repaired:
+        return errors
+    logging.info(f"Repaired {len(repaired)} field(s): {', '.join('.'.join(p) for p in repaired)}")
+    errors = validation_errors(model, data)
+    # Section-level repairs can expose errors in the fields inside
+    if any(len(path) < 2 for path in repaired) and errors:
+        repair_fields(model, data, errors)
+        errors = validation_errors(model, data)
+    return errors
+
+
+def build_reask_prompt(data: Dict[str, Any], errors: Dict[FieldPath, str]) -> str:
+    lines = [
+        "The following fields of a previous extraction failed schema validation.",
+        "Return ONLY a JSON object containing corrected values for exactly these fields,",
+        "nested the same way. Use null for any value that cannot be corrected.",
+        "",
+    ]
+    for path, message in errors.items():
+        value = json.dumps(get_path(data, path), default=str)
+        lines.append(f"- {'.'.join(path)}: value {value} -> {message}")
+    return "\n".join(lines)
+
+
+def validate_with_reask(
+    data: Any,
+    model: Type[BaseModel],
+    schema: Dict[str, Any],
+    reask: Callable[[str, Dict[str, Any]], Any],
+) -> Any:
+    """
+    Validate a parsed response, repairing failing fields deterministically
+    and re-asking only those that still fail, once.
+
+    Fields that are still invalid after the re-ask are nulled (all B650
+    fields are optional) so one bad value does not fail the whole section.
+
+    Args:
+        data: Parsed LLM response
+        model: Pydantic response model
+        schema: JSON schema the response was constrained to
+        reask: Callable taking (prompt, schema) and returning parsed JSON
+
+    Returns:
+        The response data, repaired where possible
+    """
+    if not isinstance(data, dict):
+        return data
+    errors = repaired_errors(model, data)
+    if not errors or any(len(path) < 2 for path in errors):
+        # Nothing to do, or the section itself is missing: leave it to the caller
+        return data
+
+    logging.info(f"Re-asking {len(errors)} invalid field(s): {', '.join('.'.join(p) for p in errors)}")
+    try:
+        corrections = reask(build_reask_prompt(data, errors), subset_schema(schema, list(errors)))
+        for path in errors:
+            value = get_path(corrections, path)
+            if value is not None or isinstance(get_path(corrections, path[:-1]), dict):
+                set_path(data, path, value)
+    except Exception as e:
+        logging.warning(f"Field re-ask failed: {e}")
+
+    for path, message in validation_errors(model, data).items():
+        logging.warning(f"Dropping invalid field {'.'.join(path)}: {message}")
+        if len(path) > 1:
+            set_path(data, path, None)
+    return data
@@ -0,0 +1,223 @@
+"""
+Supplier template learning.
+
+Most traffic comes from recurring suppliers whose documents share a
+layout. After a successful LLM extraction, each extracted string value is
+located in the OCR text and remembered relative to an anchor: the label
+before it on the same line, or the nearest label line above it. Templates
+are stored per supplier fingerprint (the normalized header lines of the
+document).
+
+A field's anchor is only used once ``supplier_template_min_samples``
+documents located it at the same anchor, and only while re-extracting the
+kept sample documents with it reproduces the values the LLM gave for
+them. Later documents with the same fingerprint are extracted locally
+from those verified anchors; the fields they do not cover are asked of
+the LLM with a fill prompt. When too few fields are found, or the result
+fails schema validation, the caller falls back to the full prompt.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+
+# OCRService progress and marker lines, not part of the document layout
+_NOISE_LINE = re.compile(
+    r"^\s*(?:===.*===|\[OCR Text\]|Starting complete document extraction|Processing page|Performing .*OCR)",
+    re.IGNORECASE,
+)
+_MAX_ANCHOR_CHARS = 40
+_MAX_LINES_ABOVE = 3
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def _content_lines(text: str) -> List[str]:
+    return [line for line in text.splitlines() if not _NOISE_LINE.match(line)]
+
+
+def supplier_fingerprint(text: str, header_lines: int = 3) -> Optional[str]:
+    """
+    Fingerprint a document layout from its first header lines, with
+    digits and punctuation stripped so numbers and dates do not change it.
+    """
+    lines = []
+    for line in _content_lines(text):
+        normalized = re.sub(r"[^A-Z]", "", line.upper())
+        if len(normalized) >= 4:
+            lines.append(normalized)
+        if len(lines) == header_lines:
+            break
+    if not lines:
+        return None
+    return hashlib.sha1("|".join(lines).encode("utf-8")).hexdigest()[:16]
+
+
+class SupplierTemplateStore:
+    """Learn and apply per-supplier field anchors"""
+
+    def __init__(self, template_dir: Optional[str] = None):
+        self.template_dir = template_dir or settings.supplier_template_dir
+        self._lock = threading.Lock()
+
+    def _path(self, fingerprint: str, section: str) -> str:
+        return os.path.join(self.template_dir, f"{fingerprint}.{section}.json")
+
+    def load(self, fingerprint: str, section: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(fingerprint, section), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save(self, fingerprint: str, section: str, template: Dict[str, Any]) -> None:
+        os.makedirs(self.template_dir, exist_ok=True)
+        path = self._path(fingerprint, section)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(template, f)
+        os.replace(tmp_path, path)
+
+    # --------------------------
+    # LEARNING
+    # --------------------------
+    @staticmethod
+    def locate(lines: List[str], value: str) -> Optional[Dict[str, Any]]:
+        """Describe where a value sits relative to a nearby anchor"""
+        target = " ".join(value.split())
+        for index, line in enumerate(lines):
+            position = " ".join(line.split()).find(target)
+            if position < 0:
+                continue
+            prefix = " ".join(line.split())[:position].strip()
+            rule = {"tokens": len(target.split())}
+            if _normalize(prefix):
+                return {**rule, "anchor": prefix[-_MAX_ANCHOR_CHARS:], "offset": 0}
+            for distance in range(1, _MAX_LINES_ABOVE + 1):
+                if index - distance >= 0 and _normalize(lines[index - distance]):
+                    anchor = " ".join(lines[index - distance].split())[:_MAX_ANCHOR_CHARS]
+                    return {**rule, "anchor": anchor, "offset": distance}
+            return None
+        return None
+
+    def learn(self, text: str, section: str, values: Dict[str, Any]) -> None:
+        """Record anchors for the string values of a validated extraction"""
+        fingerprint = supplier_fingerprint(text)
+        if not settings.supplier_templates_enabled or not fingerprint:
+            return
+        lines = _content_lines(text)
+        fields, strings = {}, {}
+        for name, value in values.items():
+            if isinstance(value, str) and len(value.strip()) >= 2:
+                strings[name] = value.strip()
+                rule = self.locate(lines, value.strip())
+                if rule:
+                    fields[name] = rule
+        if len(fields) < settings.supplier_template_min_fields:
+            return
+        with self._lock:
+            try:
+                template = self.load(fingerprint, section) or {"fields": {}, "samples": 0}
+                template.setdefault("documents", [])
+                for name, rule in fields.items():
+                    known = template["fields"].get(name)
+                    # A different anchor means the layout is not stable for this field: start over
+                    agree = known is not None and {k: known[k] for k in rule} == rule
+                    template["fields"][name] = {**rule, "hits": known.get("hits", 0) + 1 if agree else 1}
+                template["samples"] += 1
+                template["documents"] = (template["documents"] + [{"text": text, "values": strings}])[
+                    -settings.supplier_template_max_samples:
+                ]
+                template["verified"] = self.verify(template)
+                self._save(fingerprint, section, template)
+            except Exception as e:
+                logging.warning(f"Could not store supplier template {fingerprint}: {e}")
+
+    def verify(self, template: Dict[str, Any]) -> List[str]:
+        """
+        Fields whose anchor agreed on enough documents and re-extracts the
+        value learned from every kept document that has one.
+        """
+        verified = []
+        for name, rule in template["fields"].items():
+            if rule["hits"] < settings.supplier_template_min_samples:
+                continue
+            samples = [doc for doc in template["documents"] if name in doc["values"]]
+            if samples and all(
+                _normalize(self.apply_rule(_content_lines(doc["text"]), rule) or "") == _normalize(doc["values"][name])
+                for doc in samples
+            ):
+                verified.append(name)
+        return verified
+
+    # --------------------------
+    # EXTRACTION
+    # --------------------------
+    @staticmethod
+    def apply_rule(lines: List[str], rule: Dict[str, Any]) -> Optional[str]:
+        anchor = _normalize(rule["anchor"])
+        for index, line in enumerate(lines):
+            if anchor not in _normalize(line):
+                continue
+            if rule["offset"] == 0:
+                # Text after the anchor on the same line
+                words = " ".join(line.split())
+                cut = words.lower().find(" ".join(rule["anchor"].split()).lower())
+                rest = words[cut + len(" ".join(rule["anchor"].split())):] if cut >= 0 else ""
+            else:
+                target = index + rule["offset"]
+                rest = lines[target] if target < len(lines) else ""
+            tokens = rest.split()[:rule["tokens"]]
+            if tokens:
+                return " ".join(tokens)
+        return None
+
+    def extract(self, text: str, section: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract a section locally from a learned template.
+
+        Returns:
+            Values of the verified template fields that were found, or None
+            when there is no usable template or too few of its fields were
+            found
+        """
+        if not settings.supplier_templates_enabled:
+            return None
+        fingerprint = supplier_fingerprint(text)
+        template = self.load(fingerprint, section) if fingerprint else None
+        verified = (template or {}).get("verified") or []
+        if len(verified) < settings.supplier_template_min_fields:
+            return None
+
+        lines = _content_lines(text)
+        values = {name: self.apply_rule(lines, template["fields"][name]) for name in verified}
+        found = {name: value for name, value in values.items() if value is not None}
+        if len(found) / len(values) < settings.supplier_template_min_coverage:
+            logging.info(f"Supplier template {fingerprint} matched {len(found)}/{len(values)} field(s), using the LLM")
+            return None
+        logging.info(f"Extracted {len(found)} {section} field(s) from supplier template {fingerprint}")
+        return found
+
+
+def build_template_fill_prompt(prompt: str, missing: List[str]) -> str:
+    """Section prompt narrowed to the fields the supplier template does not cover"""
+    return "\n".join([
+        prompt,
+        "",
+        "The other fields of this document were read from the supplier's known layout.",
+        f"Return ONLY these fields, nested the same way: {', '.join(missing)}.",
+        "Use null for any field not present in this document.",
+    ])
+
+
+# Global instance
+supplier_template_store = SupplierTemplateStore()
@@ -0,0 +1,260 @@
+"""
+Token budgeting for extraction prompts.
+
+Measures each prompt component (static template, OCR text, pre-LLM
+structured data) with an offline tokenizer and enforces a per-section
+limit. When a prompt is over budget the lowest-value content is dropped or
+compressed first: duplicated pipeline text, repeated OCR blocks (the same
+page appears as direct text, page OCR and comprehensive OCR), boilerplate
+terms, and finally the tail of the OCR text.
+"""
+
+import os
+import re
+import math
+import hashlib
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+
+class LocalTokenizer:
+    """
+    Offline token counter.
+
+    Uses tiktoken when its encoding file is already in the local tiktoken
+    cache, otherwise a word/punctuation approximation of BPE (about four
+    characters per token for long words, one token per punctuation mark).
+    The encoding is loaded on first use, so importing the module (as task
+    producers do) costs nothing, and it is never downloaded unless
+    tokenizer_allow_download is set.
+    """
+
+    _PIECES = re.compile(r"\w+|[^\w\s]")
+    # Where tiktoken fetches the OpenAI encodings from (and keys its cache by)
+    _ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken"
+
+    def __init__(self, encoding_name: Optional[str] = None):
+        self.encoding_name = encoding_name or settings.tokenizer_encoding
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _cached_locally(self) -> bool:
+        """Whether tiktoken can load the encoding without a download"""
+        if "TIKTOKEN_CACHE_DIR" in os.environ:
+            cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+        elif "DATA_GYM_CACHE_DIR" in os.environ:
+            cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+        else:
+            cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+        if not cache_dir:
+            return False
+        url = self._ENCODING_URL.format(name=self.encoding_name)
+        return os.path.exists(os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest()))
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not (settings.tokenizer_allow_download or self._cached_locally()):
+                logging.info(f"Tokenizer encoding {self.encoding_name} not cached locally, approximating token counts")
+                return
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                logging.info(f"Tokenizer encoding {self.encoding_name} unavailable, approximating token counts: {e}")
+                self._encoding = None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if not self._loaded:
+            self._load()
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return sum(max(1, math.ceil(len(piece) / 4)) for piece in self._PIECES.findall(text))
+
+
+# Boilerplate lines from carrier terms and form furniture
+BOILERPLATE_PATTERNS = [
+    r"goods and instructions are accepted",
+    r"standard conditions",
+    r"taken in charge in apparent good order",
+    r"bills? of lading (?:must|all of this tenor)",
+    r"in witness whereof",
+    r"one of which being accomplished",
+    r"terms and conditions",
+    r"subject to the (?:terms|conditions)",
+    r"cargo insurance through the undersigned",
+    r"not covered .* covered according to",
+    r"^\s*(?:total pages|total tables found|dimensions):",
+    r"^\s*=+\s*$",
+]
+_BOILERPLATE = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+
+# Block boundaries in OCRService output
+_BLOCK_SPLIT = re.compile(r"\n(?=(?:===[^\n]*===|\[OCR Text\])\s*\n)")
+
+
+def split_blocks(text: str) -> List[str]:
+    """Split OCR output at its page, table and OCR-pass markers"""
+    return _BLOCK_SPLIT.split(text)
+
+
+@dataclass
+class BudgetReport:
+    """Token breakdown of a prompt before and after budgeting"""
+    section: str
+    limit: int
+    template_tokens: int
+    ocr_tokens: int
+    structured_tokens: int
+    original_tokens: int
+    steps: List[str] = field(default_factory=list)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.template_tokens + self.ocr_tokens + self.structured_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "section": self.section,
+            "limit": self.limit,
+            "template_tokens": self.template_tokens,
+            "ocr_tokens": self.ocr_tokens,
+            "structured_tokens": self.structured_tokens,
+            "total_tokens": self.total_tokens,
+            "original_tokens": self.original_tokens,
+            "steps": self.steps,
+        }
+
+
+class TokenBudget:
+    """Fit prompt components into per-section token limits"""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, tokenizer: Optional[LocalTokenizer] = None):
+        self.limits = limits or settings.token_budget_limits
+        self.tokenizer = tokenizer or LocalTokenizer()
+
+    def count(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    # --------------------------
+    # COMPRESSION STEPS
+    # --------------------------
+    @staticmethod
+    def _normalize(line: str) -> str:
+        return re.sub(r"[^a-z0-9]", "", line.lower())
+
+    def dedupe_blocks(self, text: str, overlap: float = 0.8) -> str:
+        """
+        Drop OCR blocks whose lines were (mostly) already seen in an earlier
+        block, e.g. the comprehensive OCR pass repeating the page OCR.
+        """
+        seen = set()
+        kept = []
+        for block in split_blocks(text):
+            lines = [self._normalize(line) for line in block.splitlines()]
+            content = [line for line in lines if len(line) > 3]
+            if content and sum(line in seen for line in content) / len(content) >= overlap:
+                continue
+            seen.update(content)
+            kept.append(block)
+        return "\n".join(kept)
+
+    @staticmethod
+    def strip_boilerplate(text: str) -> str:
+        return "\n".join(line for line in text.splitlines() if not _BOILERPLATE.search(line))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Keep whole lines from the start of the text up to max_tokens"""
+        kept, used = [], 0
+        for line in text.splitlines():
+            cost = self.count(line) + 1
+            if used + cost > max_tokens:
+                break
+            kept.append(line)
+            used += cost
+        return "\n".join(kept)
+
+    # --------------------------
+    # BUDGETING
+    # --------------------------
+    def fit(
+        self,
+        section: str,
+        ocr_text: str,
+        structured_data: Any = None,
+        template_tokens: int = 0,
+    ) -> Tuple[str, Any, BudgetReport]:
+        """
+        Shrink the variable prompt components until they fit the section limit.
+
+        Args:
+            section: Budget key, e.g. "section_a" or "items"
+            ocr_text: OCR text embedded in the prompt
+            structured_data: Pre-LLM pipeline output embedded in the prompt
+            template_tokens: Tokens of the static template text
+
+        Returns:
+            (ocr_text, structured_data, report)
+        """
+        ocr_text = ocr_text or ""
+        limit = self.limits.get(section) or self.limits.get("default", 0)
+        report = BudgetReport(
+            section=section,
+            limit=limit,
+            template_tokens=template_tokens,
+            ocr_tokens=self.count(ocr_text),
+            structured_tokens=self.count(str(structured_data)) if structured_data is not None else 0,
+            original_tokens=0,
+        )
+        report.original_tokens = report.total_tokens
+
+        if settings.token_budget_enabled and limit:
+            ocr_text, structured_data = self._shrink(report, ocr_text, structured_data)
+
+        logging.info(f"Token budget {report.as_dict()}")
+        return ocr_text, structured_data, report
+
+    def _shrink(self, report: BudgetReport, ocr_text: str, structured_data: Any) -> Tuple[str, Any]:
+        def over() -> bool:
+            return report.total_tokens > report.limit
+
+        def update_structured(key: str) -> None:
+            nonlocal structured_data
+            structured_data = {k: v for k, v in structured_data.items() if k != key}
+            report.structured_tokens = self.count(str(structured_data))
+            report.steps.append(f"drop_structured_{key}")
+
+        def update_ocr(step: str, text: str) -> None:
+            nonlocal ocr_text
+            ocr_text = text
+            report.ocr_tokens = self.count(ocr_text)
+            report.steps.append(step)
+
+        # Pipeline "sections" and "relevant_text" repeat the OCR text
+        for key in ("sections", "relevant_text"):
+            if over() and isinstance(structured_data, dict) and key in structured_data:
+                update_structured(key)
+
+        if over():
+            update_ocr("dedupe_ocr_blocks", self.dedupe_blocks(ocr_text))
+        if over():
+            update_ocr("strip_boilerplate", self.strip_boilerplate(ocr_text))
+        if over():
+            remaining = max(report.limit - report.template_tokens - report.structured_tokens, 0)
+            update_ocr("truncate_ocr", self.truncate(ocr_text, remaining))
+        return ocr_text, structured_data
+
+
+# Global instance
+token_budget = TokenBudget()
@@ -1,7 +1,11 @@
 from anyio import sleep
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
 from typing import List
+import os
 import json
+import uuid
+import inspect
 from config.settings import settings
 from services.ocr_service import ocr_service
 # from services.llm_service import llm_service
@@ -20,6 +24,21 @@ from schemas.B650.import_section_b_sea import SeaTransportLine
 from schemas.B650.import_section_c_schema import SECTIONC
 from models.user_declaration import UserDeclaration
 from services.B650_PreLLMService import preprocessor
+from services.document_classifier import document_classifier
+from services.storage_service import storage_service
+from services.llm_telemetry import bind_call_context, unbind_call_context
+from services.rate_limiter import BULK, llm_rate_limiter
+from services.batch_extraction import (
+    COMPLETED as BATCH_COMPLETED,
+    IN_PROGRESS as BATCH_IN_PROGRESS,
+    batch_request,
+    build_batch_client,
+    iter_results,
+    read_checkpoint,
+    succeeded_ids,
+    write_batch,
+    write_checkpoint,
+)
 
 
 # Initialize Celery
@@ -45,6 +64,110 @@ celery_app.conf.routes = {
 
 logger = get_task_logger(__name__)
 
+# Telemetry context per running task, see _bind_llm_call_context
+_llm_context_tokens = {}
+
+
+@task_prerun.connect
+def _bind_llm_call_context(task_id=None, task=None, args=None, kwargs=None, **_):
+    """Tag the LLM calls a task makes with its process_id"""
+    try:
+        arguments = inspect.signature(task.run).bind_partial(*(args or ()), **(kwargs or {})).arguments
+    except TypeError:
+        arguments = {}
+    _llm_context_tokens[task_id] = bind_call_context(process_id=arguments.get("process_id"))
+
+
+@task_postrun.connect
+def _unbind_llm_call_context(task_id=None, **_):
+    token = _llm_context_tokens.pop(task_id, None)
+    if token is not None:
+        unbind_call_context(token)
+
+
+def _section_a_json(parsed: dict) -> dict:
+    return B650SectionAHeader(**parsed["header"]).model_dump(exclude_none=False, mode='json')
+
+
+def _mode_of_transport(b650_structure: dict) -> str:
+    """Detected mode of transport, SEA when the pre-LLM pass found none"""
+    return (b650_structure["section_b_transport_details"]["mode_of_transport"] or "SEA").upper()
+
+
+def _section_b_json(parsed: dict, mode_of_transport: str):
+    """Only sea transport lines are stored; other modes are reported as errors by every task"""
+    if mode_of_transport != "SEA":
+        raise ValueError(f"Section B extraction not supported for {mode_of_transport}")
+    return SeaTransportLine(**parsed["sea_transport_lines"]).model_dump(exclude_none=False, mode='json')
+
+
+def _section_c_json(parsed: dict) -> dict:
+    return SECTIONC(**parsed["tariff_lines"]).model_dump(exclude_none=False, mode='json')
+
+
+def _routed_text(ocr_texts: List[str], section: str) -> str:
+    """Concatenate OCR text, keeping only the pages relevant to an extraction section"""
+    if settings.document_routing_enabled:
+        return document_classifier.select_text(ocr_texts, section)
+    return "".join(str(text) for text in ocr_texts)
+
+
+def _item_row(process_id: str, document_id, item_data: dict) -> UserProcessItem:
+    return UserProcessItem(
+        process_id=process_id,
+        document_id=document_id,
+        item_title=item_data.get('item_title') or 'Unknown Item',
+        item_description=item_data.get('item_description'),
+        item_type=item_data.get('item_type'),
+        item_weight=get_numbers(item_data.get('item_weight')),
+        item_weight_unit=item_data.get('item_weight_unit') or 'kg',
+        item_price=get_numbers(item_data.get('item_price')),
+        item_currency=item_data.get('item_currency') or 'AUD',
+        # item_hs_code=catalog.predict_best(item_data.get('item_title', ''))[0].code if item_data.get('item_title') else None
+        item_hs_code="1234"
+    )
+
+
+def _numbered_text(documents) -> str:
+    """Concatenate document OCR text in numbered blocks, so extracted items can name their source"""
+    return "\n".join(
+        f"=== DOCUMENT {index} ===\n{doc.ocr_text or ''}"
+        for index, doc in enumerate(documents, start=1)
+    )
+
+
+def _stream_document_items(db: Session, process_id: str, document: UserDocument, text: str):
+    """
+    Stream item extraction for a document, inserting rows in batches as
+    items arrive. Returns the full response, or None after removing any
+    partially written rows if the stream fails.
+    """
+    items, batch = [], []
+    stream = llm_service.stream_item_extract_document(text, "import", response_format=RESPONSE_FORMAT)
+    try:
+        while True:
+            try:
+                item_data = next(stream)
+            except StopIteration as stop:
+                fields = stop.value or {}
+                break
+            items.append(item_data)
+            batch.append(_item_row(process_id, document.document_id, item_data))
+            if len(batch) >= settings.item_write_batch_size:
+                db.add_all(batch)
+                db.commit()
+                batch = []
+        db.add_all(batch)
+        db.commit()
+        return {**fields, "items": items}
+    except Exception as e:
+        print(f"Streaming item extraction failed for document {document.document_id}: {e}")
+        db.rollback()
+        db.query(UserProcessItem).filter(UserProcessItem.document_id == document.document_id).delete()
+        db.commit()
+        return None
+
+
 @celery_app.task(name="tasks.background_tasks.process_documents")
 def process_documents(process_id: str, document_ids: List[str]):
     """Background task to process uploaded documents"""
@@ -69,7 +192,8 @@ def process_documents(process_id: str, document_ids: List[str]):
                     print('document not found')
                 
                 # OCR extraction
-                ocr_text = ocr_service.extract_complete_document_content(document.file_path)
+                local_path = storage_service.local_path(document.file_path)
+                ocr_text = ocr_service.extract_complete_document_content(local_path)
                 if ocr_text:
                     document.ocr_text = ocr_text
                 
@@ -78,14 +202,33 @@ def process_documents(process_id: str, document_ids: List[str]):
                     process.status = ProcessStatus.UNDERSTANDING
                     db.commit()
 
+                if settings.b650_combined_extraction:
+                    # Items are extracted with Sections A, B and C after all documents are OCR'd
+                    db.commit()
+                    continue
+
+                items_text = _routed_text([ocr_text], "items")
+                if settings.llm_streaming_items and not llm_service.needs_chunking(items_text):
+                    # Rows are written while the response streams in
+                    llm_response = _stream_document_items(db, process_id, document, items_text)
+                    if llm_response is not None:
+                        print(f"LLM streamed {len(llm_response['items'])} item(s)")
+                        document.llm_response = llm_response
+                        document.processed_at = db.query(func.now()).scalar()
+                        process.status = ProcessStatus.EXTRACTING
+                        db.commit()
+                        continue
+
                 # LLM processing
                 llm_response = llm_service.process_item_extract_document(
-                    ocr_text, 
+                    items_text,
                     process_id,
                     "import",  # Default to import, can be enhanced
                     response_format=RESPONSE_FORMAT
                 )
                 print(f"LLM response: {llm_response}")
+                if isinstance(llm_response, dict) and llm_response.get("partial"):
+                    print(f"Item extraction for document {doc_id} is incomplete, failed chunks: {llm_response['failed_chunks']}")
                 
                 if llm_response:
                     document.llm_response = llm_response
@@ -97,20 +240,7 @@ def process_documents(process_id: str, document_ids: List[str]):
                     # Extract items from LLM response
                     if 'items' in llm_response:
                         for item_data in llm_response['items']:
-                            item = UserProcessItem(
-                                process_id=process_id,
-                                document_id=document.document_id,
-                                item_title=item_data.get('item_title', 'Unknown Item'),
-                                item_description=item_data.get('item_description'),
-                                item_type=item_data.get('item_type'),
-                                item_weight=get_numbers(item_data.get('item_weight')),
-                                item_weight_unit=item_data.get('item_weight_unit', 'kg'),
-                                item_price=get_numbers(item_data.get('item_price')),
-                                item_currency=item_data.get('item_currency', 'AUD'),
-                                # item_hs_code=catalog.predict_best(item_data.get('item_title', ''))[0].code if item_data.get('item_title') else None
-                                item_hs_code="1234"
-                            )
-                            db.add(item)
+                            db.add(_item_row(process_id, document.document_id, item_data))
                 
                 db.commit()
                 
@@ -118,6 +248,9 @@ def process_documents(process_id: str, document_ids: List[str]):
                 print(f"Error processing document {doc_id}: {e}")
                 continue
         
+        if settings.b650_combined_extraction:
+            task_b650_extract_combined(process_id)
+
         # Update status to 'done'
         if process:
             process.status = ProcessStatus.DONE
@@ -169,7 +302,7 @@ def task_retry_item_extraction_from_document(document_id: str):
 
         # LLM processing
         llm_response = llm_service.process_item_extract_document(
-            ocr_text,
+            _routed_text([ocr_text], "items"),
             process_id,
             "import",  # Default to import, can be enhanced
             response_format=RESPONSE_FORMAT
@@ -189,20 +322,7 @@ def task_retry_item_extraction_from_document(document_id: str):
             # Extract items from LLM response
             if 'items' in llm_response:
                 for item_data in llm_response['items']:
-                    item = UserProcessItem(
-                        process_id=process_id,
-                        document_id=document.document_id,
-                        item_title=item_data.get('item_title', 'Unknown Item'),
-                        item_description=item_data.get('item_description'),
-                        item_type=item_data.get('item_type'),
-                        item_weight=get_numbers(item_data.get('item_weight')),
-                        item_weight_unit=item_data.get('item_weight_unit', 'kg'),
-                        item_price=get_numbers(item_data.get('item_price')),
-                        item_currency=item_data.get('item_currency', 'AUD'),
-                        item_hs_code="1234"
-                        # item_hs_code=catalog.predict_best(item_data.get('item_title', ''))[0].code if item_data.get('item_title') else None
-                    )
-                    db.add(item)
+                    db.add(_item_row(process_id, document.document_id, item_data))
             db.commit()
 
         # if process:
@@ -249,6 +369,11 @@ def task_reclassify_items(item_id: str = None):
 @celery_app.task(name="tasks.task_b650_extract_section_a_information")
 def task_b650_extract_section_a_information(process_id: str = None):
     """Background task to extract b650 section a information"""
+    if settings.b650_combined_extraction:
+        return task_b650_extract_combined(process_id, skip_if_extracted=True)
+    if settings.b650_concurrent_sections:
+        return task_b650_extract_all_sections(process_id)
+
     db = SessionLocal()
     print('extracting section a task')
     try:
@@ -260,9 +385,7 @@ def task_b650_extract_section_a_information(process_id: str = None):
         if not documents:
             return False, {"status": "error", "message": "No document found"}
         
-        text = ""
-        for doc in documents:
-            text += str(doc.ocr_text)
+        text = _routed_text([doc.ocr_text for doc in documents], "section_a")
         
         # # Process text
         result = pipeline.process(text)
@@ -278,11 +401,9 @@ def task_b650_extract_section_a_information(process_id: str = None):
         json_result = convert_result_to_json(result)
         # print(json_result)
 
-        parsed = llm_service.process_b650_section_a(ocr_text=text, structured_data=json_result)
+        parsed = llm_service.process_b650_section_a(ocr_text=text, structured_data=json_result, preprocessing_result=result)
         if parsed:
-            header = parsed["header"]
-            section_a = B650SectionAHeader(**header)
-            json_str = section_a.model_dump(exclude_none=False, mode='json')
+            json_str = _section_a_json(parsed)
             # user_declaration = UserDeclaration()
             user_declaration.declaration_type = "import"
             user_declaration.import_declaration_section_a = json_str
@@ -314,18 +435,15 @@ def task_b650_extract_section_b_information(process_id: str = None):
         if not documents:
             return False, {"status": "error", "message": "No document found"}
         
-        text = ""
-        for doc in documents:
-            text += str(doc.ocr_text)
+        text = _routed_text([doc.ocr_text for doc in documents], "section_b")
         
         # # Process text
         result = pipeline.process(text)
         resultt = preprocessor.process(text)
 
         b650_structure = preprocessor.to_b650_structure(resultt)
-        section_b = b650_structure["section_b_transport_details"]
-        print(f"Mode of Transport: {section_b['mode_of_transport']}")
-        mode_of_transport = section_b['mode_of_transport']
+        mode_of_transport = _mode_of_transport(b650_structure)
+        print(f"Mode of Transport: {mode_of_transport}")
         # print(section_b)
         # logger.info(section_b)
     
@@ -340,16 +458,11 @@ def task_b650_extract_section_b_information(process_id: str = None):
         json_result = convert_result_to_json(result)
         # # print(json_result)
 
-        parsed = llm_service.process_b650_section_b(ocr_text=text, structured_data=json_result, mode_of_transport=mode_of_transport)
+        parsed = llm_service.process_b650_section_b(
+            ocr_text=text, structured_data=json_result, mode_of_transport=mode_of_transport, preprocessing_result=result
+        )
         if parsed:
-            section_b = None
-            if mode_of_transport == "SEA":
-                sea_transport_lines = parsed["sea_transport_lines"]
-                section_b = SeaTransportLine(**sea_transport_lines)
-            elif mode_of_transport == "AIR":
-                pass
-
-            json_str = section_b.model_dump(exclude_none=False, mode='json')
+            json_str = _section_b_json(parsed, mode_of_transport)
             # user_declaration = UserDeclaration()
             user_declaration.declaration_type = "import"
             user_declaration.import_declaration_section_b = json_str
@@ -368,7 +481,7 @@ def task_b650_extract_section_b_information(process_id: str = None):
         db.close()
 
 
-@celery_app.task(name="tasks.task_b650_extract_section_b_information")
+@celery_app.task(name="tasks.task_b650_extract_section_c_information")
 def task_b650_extract_section_c_information(process_id: str = None):
     """Background task to extract b650 section c information"""
     db = SessionLocal()
@@ -382,9 +495,7 @@ def task_b650_extract_section_c_information(process_id: str = None):
         if not documents:
             return False, {"status": "error", "message": "No document found"}
         
-        text = ""
-        for doc in documents:
-            text += str(doc.ocr_text)
+        text = _routed_text([doc.ocr_text for doc in documents], "section_c")
         
         # # Process text
         result = pipeline.process(text)
@@ -401,16 +512,12 @@ def task_b650_extract_section_c_information(process_id: str = None):
 
         # # # Convert to JSON
         json_result = convert_result_to_json(result)
-        section_c = user_declaration.import_declaration_section_c
         # # print(json_result)
 
-        parsed = llm_service.process_b650_section_c(ocr_text=section_c, structured_data=json_result)
+        parsed = llm_service.process_b650_section_c(ocr_text=text, structured_data=json_result, preprocessing_result=result)
         if parsed:
             print(parsed)
-            tariff_lines = parsed["tariff_lines"]
-            section_c = SECTIONC(**tariff_lines)
-
-            json_str = section_c.model_dump(exclude_none=False, mode='json')
+            json_str = _section_c_json(parsed)
             # user_declaration = UserDeclaration()
             user_declaration.declaration_type = "import"
             user_declaration.import_declaration_section_c = json_str
@@ -425,4 +532,267 @@ def task_b650_extract_section_c_information(process_id: str = None):
         print(f"B650 Section c extraction error: {e}")
         return False, {"status": "error", "message": str(e)}
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@celery_app.task(name="tasks.task_b650_extract_all_sections")
+def task_b650_extract_all_sections(process_id: str = None):
+    """Background task to extract b650 sections A, B and C with concurrent LLM calls"""
+    db = SessionLocal()
+    print('extracting sections a, b and c task')
+    try:
+        process = db.query(UserProcess).filter(UserProcess.process_id == process_id).first()
+        if not process:
+            return False, {"status": "error"}
+
+        documents = db.query(UserDocument).filter(UserDocument.process_id == process_id).all()
+        if not documents:
+            return False, {"status": "error", "message": "No document found"}
+
+        ocr_texts = [doc.ocr_text for doc in documents]
+        section_texts = {
+            section: _routed_text(ocr_texts, section)
+            for section in ("section_a", "section_b", "section_c")
+        }
+        preprocessing_results = {section: pipeline.process(text) for section, text in section_texts.items()}
+        structured_data = {
+            section: convert_result_to_json(result) for section, result in preprocessing_results.items()
+        }
+
+        b650_structure = preprocessor.to_b650_structure(preprocessor.process(section_texts["section_b"]))
+        mode_of_transport = _mode_of_transport(b650_structure)
+        print(f"Mode of Transport: {mode_of_transport}")
+
+        parsed = llm_service.process_b650_sections(
+            section_texts,
+            structured_data=structured_data,
+            mode_of_transport=mode_of_transport,
+            preprocessing_results=preprocessing_results,
+        )
+
+        user_declaration = db.query(UserDeclaration).filter(UserDeclaration.process_id == process_id).first()
+        if not user_declaration:
+            user_declaration = UserDeclaration()
+        user_declaration.declaration_type = "import"
+        user_declaration.process_id = process_id
+
+        errors = {}
+        for section, column, to_json in (
+            ("section_a", "import_declaration_section_a", _section_a_json),
+            ("section_b", "import_declaration_section_b", lambda p: _section_b_json(p, mode_of_transport)),
+            ("section_c", "import_declaration_section_c", _section_c_json),
+        ):
+            try:
+                json_str = to_json(parsed[section])
+                if json_str is not None:
+                    setattr(user_declaration, column, json_str)
+            except Exception as e:
+                print(f"B650 {section} extraction error: {e}")
+                errors[section] = str(e)
+
+        db.add(user_declaration)
+        db.commit()
+
+        if errors:
+            return False, {"status": "error", "message": errors}
+        return True, {"status": "success", "message": "Sections A, B and C extracted."}
+    except Exception as e:
+        print(f"B650 sections extraction error: {e}")
+        return False, {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="tasks.task_b650_extract_combined")
+def task_b650_extract_combined(process_id: str = None, skip_if_extracted: bool = False):
+    """Background task to extract items and b650 sections A, B and C with a single LLM call"""
+    db = SessionLocal()
+    print('extracting items and sections a, b and c task')
+    try:
+        process = db.query(UserProcess).filter(UserProcess.process_id == process_id).first()
+        if not process:
+            return False, {"status": "error"}
+
+        user_declaration = db.query(UserDeclaration).filter(UserDeclaration.process_id == process_id).first()
+        if skip_if_extracted and user_declaration and user_declaration.import_declaration_section_a:
+            return True, {"status": "success", "message": "Sections already extracted."}
+
+        documents = db.query(UserDocument).filter(UserDocument.process_id == process_id).all()
+        if not documents:
+            return False, {"status": "error", "message": "No document found"}
+
+        text = _numbered_text(documents)
+        structured_data = convert_result_to_json(pipeline.process(text))
+
+        b650_structure = preprocessor.to_b650_structure(preprocessor.process(text))
+        mode_of_transport = _mode_of_transport(b650_structure)
+        print(f"Mode of Transport: {mode_of_transport}")
+
+        parsed = llm_service.process_b650_combined(ocr_text=text, structured_data=structured_data)
+        if not isinstance(parsed, dict) or parsed.get("success") is False:
+            return False, {"status": "error", "message": parsed.get("error") if isinstance(parsed, dict) else parsed}
+
+        # Items replace any earlier extraction for the process
+        db.query(UserProcessItem).filter(UserProcessItem.process_id == process_id).delete()
+        for item_data in parsed.get("items") or []:
+            index = item_data.get("document_index")
+            document = documents[index - 1] if isinstance(index, int) and 0 < index <= len(documents) else documents[0]
+            db.add(_item_row(process_id, document.document_id, item_data))
+
+        if not user_declaration:
+            user_declaration = UserDeclaration()
+        user_declaration.declaration_type = "import"
+        user_declaration.process_id = process_id
+
+        errors = {}
+        for section, column, to_json in (
+            ("section_a", "import_declaration_section_a", _section_a_json),
+            # sea_transport_lines is null when the model finds no sea shipment
+            ("section_b", "import_declaration_section_b",
+             lambda p: None if mode_of_transport == "SEA" and not p.get("sea_transport_lines")
+             else _section_b_json(p, mode_of_transport)),
+            ("section_c", "import_declaration_section_c", _section_c_json),
+        ):
+            try:
+                json_str = to_json(parsed)
+                if json_str is not None:
+                    setattr(user_declaration, column, json_str)
+            except Exception as e:
+                print(f"B650 {section} extraction error: {e}")
+                errors[section] = str(e)
+
+        db.add(user_declaration)
+        db.commit()
+
+        if errors:
+            return False, {"status": "error", "message": errors}
+        return True, {"status": "success", "message": "Items and sections A, B and C extracted."}
+    except Exception as e:
+        print(f"B650 combined extraction error: {e}")
+        return False, {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
+# --------------------------
+# BULK RE-EXTRACTION
+# --------------------------
+_BULK_SECTION_COLUMNS = {
+    "section_a": ("import_declaration_section_a", _section_a_json),
+    "section_b": ("import_declaration_section_b", lambda p: _section_b_json(p, "SEA")),
+    "section_c": ("import_declaration_section_c", _section_c_json),
+}
+
+
+@celery_app.task(name="tasks.task_b650_bulk_reextract")
+def task_b650_bulk_reextract(process_ids: List[str], section: str = "section_c"):
+    """Render a section's prompts for many processes into a batch file and submit it"""
+    if section not in _BULK_SECTION_COLUMNS:
+        return False, {"status": "error", "message": f"Unknown section: {section}"}
+
+    db = SessionLocal()
+    try:
+        def requests():
+            for process_id in process_ids:
+                documents = db.query(UserDocument).filter(UserDocument.process_id == process_id).all()
+                if not documents:
+                    continue
+                text = _routed_text([doc.ocr_text for doc in documents], section)
+                if section == "section_b":
+                    b650_structure = preprocessor.to_b650_structure(preprocessor.process(text))
+                    # Only sea transport lines are stored
+                    if _mode_of_transport(b650_structure) != "SEA":
+                        continue
+                prompt, response_format, _ = llm_service.section_request(
+                    section, text, convert_result_to_json(pipeline.process(text))
+                )
+                yield batch_request(
+                    f"{section}:{process_id}", llm_service.model, llm_service.temperature, prompt, response_format
+                )
+
+        path = os.path.join(settings.llm_batch_dir, f"{section}_{uuid.uuid4().hex}.jsonl")
+        count = write_batch(path, requests())
+    finally:
+        db.close()
+    if not count:
+        return False, {"status": "error", "message": "No documents to re-extract"}
+
+    batch_id = build_batch_client().submit(path)
+    task_b650_bulk_ingest.apply_async((batch_id, section), countdown=settings.llm_batch_poll_seconds)
+    return True, {"status": "success", "batch_id": batch_id, "requests": count}
+
+
+@celery_app.task(name="tasks.task_b650_bulk_ingest", bind=True, max_retries=None)
+def task_b650_bulk_ingest(self, batch_id: str, section: str = "section_c"):
+    """
+    Save the results of a bulk batch into the declarations, in batches of
+    llm_batch_ingest_size, resuming from the checkpoint of an earlier run.
+    """
+    client = build_batch_client()
+    status = client.status(batch_id)
+    if status == BATCH_IN_PROGRESS and hasattr(client, "resume"):
+        # A local batch whose processing was interrupted
+        client.resume(batch_id)
+    elif status == BATCH_IN_PROGRESS:
+        raise self.retry(countdown=settings.llm_batch_poll_seconds)
+    elif status != BATCH_COMPLETED:
+        return False, {"status": "error", "message": f"Batch {batch_id} {status}"}
+
+    output_path = client.fetch_output(batch_id)
+    column, to_json = _BULK_SECTION_COLUMNS[section]
+    _, response_format, response_model = llm_service.section_request(section, "")
+    pending, counts = [], {"saved": 0, "failed": 0}
+
+    db = SessionLocal()
+    try:
+        def commit(next_line: int):
+            if pending:
+                declarations = {
+                    str(declaration.process_id): declaration
+                    for declaration in db.query(UserDeclaration)
+                    .filter(UserDeclaration.process_id.in_([process_id for process_id, _ in pending]))
+                    .all()
+                }
+                for process_id, value in pending:
+                    declaration = declarations.get(process_id)
+                    if declaration is None:
+                        counts["failed"] += 1
+                        continue
+                    setattr(declaration, column, value)
+                    counts["saved"] += 1
+                db.commit()
+                pending.clear()
+            write_checkpoint(output_path, next_line)
+
+        next_line = read_checkpoint(output_path)
+        # Requests retried after a failure have an error line and a later answer
+        succeeded = succeeded_ids(output_path)
+        # Field re-asks during validation must not use the interactive share
+        with llm_rate_limiter.lane(BULK):
+            for line_no, custom_id, text, error in iter_results(output_path, next_line):
+                next_line = line_no + 1
+                process_id = custom_id.split(":", 1)[1]
+                if error and custom_id in succeeded:
+                    continue
+                if error:
+                    print(f"Bulk {section} request {process_id} failed: {error}")
+                    counts["failed"] += 1
+                    continue
+                try:
+                    value = to_json(llm_service.parse_section_response(text, response_format, response_model))
+                except Exception as e:
+                    print(f"Bulk {section} result {process_id} invalid: {e}")
+                    counts["failed"] += 1
+                    continue
+                if value is not None:
+                    pending.append((process_id, value))
+                if len(pending) >= settings.llm_batch_ingest_size:
+                    commit(next_line)
+        commit(next_line)
+        return True, {"status": "success", "batch_id": batch_id, **counts}
+    except Exception as e:
+        db.rollback()
+        print(f"Bulk {section} ingest error: {e}")
+        return False, {"status": "error", "message": str(e)}
+    finally:
+        db.close()
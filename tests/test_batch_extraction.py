@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from services import batch_extraction
+from services.batch_extraction import (
+    COMPLETED,
+    LocalBatchClient,
+    batch_request,
+    iter_results,
+    succeeded_ids,
+    write_batch,
+)
+
+
+def answer(custom_id, text="{}"):
+    return {
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": text}}]}},
+        "error": None,
+    }
+
+
+def failure(custom_id):
+    return {"custom_id": custom_id, "response": None, "error": {"message": "rate limited"}}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_extraction, "_openai_client", lambda async_client=False: None)
+    return LocalBatchClient(batch_dir=str(tmp_path), concurrency=2)
+
+
+def write_input(client, batch_id, custom_ids):
+    write_batch(client._input_path(batch_id), (batch_request(c, "model", 0.0, f"prompt {c}") for c in custom_ids))
+
+
+def test_failed_requests_are_retried_within_the_run(client, monkeypatch):
+    calls = []
+
+    async def complete(_, request):
+        calls.append(request["custom_id"])
+        first_try = calls.count(request["custom_id"]) == 1
+        return failure(request["custom_id"]) if request["custom_id"] == "b" and first_try else answer(request["custom_id"])
+
+    monkeypatch.setattr(client, "_complete", complete)
+    write_input(client, "local_1", ["a", "b", "c"])
+
+    client.resume("local_1")
+
+    assert sorted(calls) == ["a", "b", "b", "c"]
+    assert succeeded_ids(client.output_path("local_1")) == {"a", "b", "c"}
+    assert client.status("local_1") == COMPLETED
+
+
+def test_resume_retries_failed_lines_but_not_answered_ones(client, monkeypatch):
+    write_input(client, "local_2", ["a", "b"])
+    with open(client.output_path("local_2"), "w") as f:
+        f.write(json.dumps(answer("a")) + "\n" + json.dumps(failure("b")) + "\n")
+    calls = []
+
+    async def complete(_, request):
+        calls.append(request["custom_id"])
+        return answer(request["custom_id"])
+
+    monkeypatch.setattr(client, "_complete", complete)
+
+    client.resume("local_2")
+
+    assert calls == ["b"]
+    assert [(c, e is None) for _, c, _, e in iter_results(client.output_path("local_2"))] == [
+        ("a", True), ("b", False), ("b", True),
+    ]
+
+
+def test_resume_after_a_partial_line_starts_a_new_line(client, monkeypatch):
+    write_input(client, "local_3", ["a", "b"])
+    with open(client.output_path("local_3"), "w") as f:
+        f.write(json.dumps(answer("a")) + "\n" + json.dumps(answer("b"))[:20])
+
+    async def complete(_, request):
+        return answer(request["custom_id"])
+
+    monkeypatch.setattr(client, "_complete", complete)
+
+    client.resume("local_3")
+
+    assert succeeded_ids(client.output_path("local_3")) == {"a", "b"}
@@ -0,0 +1,39 @@
+import os
+
+from services.llm_cache import DiskCacheBackend
+
+
+def entry_files(cache_dir):
+    return [name for _, _, names in os.walk(cache_dir) for name in names if name.endswith(".json")]
+
+
+def test_disk_cache_stays_within_max_entries(tmp_path):
+    cache = DiskCacheBackend(str(tmp_path), max_entries=20, evict_interval=3600)
+
+    for i in range(100):
+        cache.set(f"{i:04d}key", f"value {i}", ttl=0)
+
+    assert len(entry_files(tmp_path)) <= 20
+    assert cache.get("0099key") == "value 99"
+    assert cache.get("0000key") is None
+
+
+def test_disk_cache_does_not_rescan_on_every_write(tmp_path, monkeypatch):
+    cache = DiskCacheBackend(str(tmp_path), max_entries=100, evict_interval=3600)
+    scans = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, "_evict", lambda: (scans.append(1), evict()))
+
+    for i in range(500):
+        cache.set(f"{i:04d}key", "value", ttl=0)
+
+    assert len(scans) < 500 // 5
+
+
+def test_rewriting_an_entry_does_not_grow_the_count(tmp_path):
+    cache = DiskCacheBackend(str(tmp_path), max_entries=5, evict_interval=3600)
+
+    for _ in range(10):
+        cache.set("0000key", "value", ttl=0)
+
+    assert cache._entry_count == 1
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from config.settings import settings
+from services.llm_resilience import LatencyTracker, LLMCallPolicy
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_retries", 2)
+    monkeypatch.setattr(settings, "llm_backoff_base_seconds", 0.0)
+    monkeypatch.setattr(settings, "llm_hedging_enabled", False)
+    return LLMCallPolicy(LatencyTracker(window=50, min_samples=5))
+
+
+def flaky(failures):
+    """fn(timeout) failing with the given errors before succeeding"""
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return "ok"
+
+    return fn, calls
+
+
+def test_transient_errors_are_retried(policy):
+    fn, calls = flaky([RateLimited(), ConnectionError()])
+    stats = {"retries": 0}
+
+    assert policy.call(fn, "model:test", stats=stats) == "ok"
+    assert len(calls) == 3
+    assert stats["retries"] == 2
+
+
+def test_non_retriable_errors_are_raised_at_once(policy):
+    fn, calls = flaky([BadRequest()])
+
+    with pytest.raises(BadRequest):
+        policy.call(fn, "model:test")
+    assert len(calls) == 1
+
+
+def test_retries_stop_after_the_limit(policy):
+    fn, calls = flaky([RateLimited()] * 5)
+
+    with pytest.raises(RateLimited):
+        policy.call(fn, "model:test")
+    assert len(calls) == settings.llm_max_retries + 1
+
+
+def test_each_attempt_takes_its_own_slot(policy):
+    fn, _ = flaky([RateLimited()])
+    slots = []
+
+    @contextmanager
+    def slot():
+        slots.append("taken")
+        yield
+
+    policy.call(fn, "model:test", slot=slot)
+    assert slots == ["taken", "taken"]
+
+
+def test_expired_deadlines_are_retried_and_recorded_as_slow(policy):
+    fn, calls = flaky([TimeoutError(), TimeoutError()])
+
+    assert policy.call(fn, "model:deadline") == "ok"
+    assert calls[0] == settings.llm_timeout_initial_seconds
+    # Timeouts count as samples at the full timeout
+    assert sorted(policy.tracker._samples["model:deadline"])[-2:] == [calls[0], calls[1]]
+
+
+def test_timeout_follows_observed_latency(policy, monkeypatch):
+    monkeypatch.setattr(settings, "llm_timeout_min_seconds", 1.0)
+    for _ in range(10):
+        policy.tracker.record("model:fast", 2.0)
+
+    assert policy.timeout_for("model:fast") == 2.0 * settings.llm_timeout_multiplier
+    assert policy.timeout_for("model:unseen") == settings.llm_timeout_initial_seconds
+
+
+def test_async_timeouts_are_retried(policy):
+    calls = []
+
+    async def fn(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise asyncio.TimeoutError()
+        return "ok"
+
+    assert asyncio.run(policy.acall(fn, "model:async")) == "ok"
+    assert len(calls) == 2
+
+
+def hedging(policy, monkeypatch, key):
+    monkeypatch.setattr(settings, "llm_hedging_enabled", True)
+    for _ in range(10):
+        policy.tracker.record(key, 0.01)
+
+
+def test_hedge_wins_and_the_stalled_request_is_cancelled(policy, monkeypatch):
+    hedging(policy, monkeypatch, "model:hedge")
+    cancelled, calls = [], []
+
+    async def fn(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "stalled"
+        return "hedge"
+
+    async def run():
+        result = await policy.acall(fn, "model:hedge")
+        # Let the cancellation reach the stalled request
+        await asyncio.sleep(0)
+        return result
+
+    started = time.perf_counter()
+    assert asyncio.run(run()) == "hedge"
+    assert time.perf_counter() - started < 2
+    assert len(calls) == 2
+    assert cancelled == [True]
+
+
+def test_blocking_hedge_returns_the_first_response(policy, monkeypatch):
+    hedging(policy, monkeypatch, "model:hedge_blocking")
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "stalled"
+        return "hedge"
+
+    assert policy.call(fn, "model:hedge_blocking") == "hedge"
+    assert len(calls) == 2
+
+
+def test_fast_responses_are_not_hedged(policy, monkeypatch):
+    hedging(policy, monkeypatch, "model:quick")
+    fn, calls = flaky([])
+
+    assert policy.call(fn, "model:quick") == "ok"
+    assert len(calls) == 1
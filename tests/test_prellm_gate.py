@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.prellm_gate import SECTION_FIELD_MAP, prellm_gate
+
+SECTION_B_DETECTED = {
+    "bl_number": "COSU6123456789",
+    "port_of_loading": "SHANGHAI",
+    "port_of_discharge": "PORT KLANG",
+    "gross_weight": "1250.5",
+    "number_of_packages": "12",
+}
+SECTION_B_FIELDS = [
+    "vessel_name", "voyage_number", "ocean_bill_of_lading_no", "loading_port", "discharge_port",
+    "first_arrival_date", "gross_weight", "container_number", "number_of_packages",
+]
+
+
+def preprocessing_result(detected, requires_llm=False, confidence=0.95):
+    fields = {
+        name: SimpleNamespace(cleaned_value=value, confidence=confidence) for name, value in detected.items()
+    }
+    return SimpleNamespace(structured_data=fields, requires_llm=requires_llm)
+
+
+def test_schema_fields_not_detected_are_left_for_the_llm():
+    decision = prellm_gate.decide("section_b", preprocessing_result(SECTION_B_DETECTED), SECTION_B_FIELDS)
+
+    assert decision.mode == "targeted"
+    assert set(decision.known) | set(decision.missing) == set(SECTION_B_FIELDS)
+    assert {"vessel_name", "voyage_number", "first_arrival_date", "container_number"} <= set(decision.missing)
+
+
+def test_skip_only_when_every_schema_field_is_known():
+    schema_fields = list(SECTION_FIELD_MAP["section_b"])
+
+    decision = prellm_gate.decide("section_b", preprocessing_result(SECTION_B_DETECTED), schema_fields)
+
+    assert decision.mode == "skip"
+    assert set(decision.known) == set(schema_fields)
+
+
+def test_low_confidence_fields_are_not_used():
+    result = preprocessing_result(SECTION_B_DETECTED, confidence=0.5)
+
+    assert prellm_gate.decide("section_b", result, SECTION_B_FIELDS).mode == "full"
+
+
+@pytest.mark.parametrize("section", ["section_a", "section_c"])
+def test_ungated_sections_use_the_full_prompt(section):
+    decision = prellm_gate.decide(section, preprocessing_result({"consignee_name": "BRADLEY THOMAS"}), ["owner_name"])
+
+    assert decision.mode == "full"
+
+
+def test_gated_section_keeps_every_schema_field():
+    from llm_response_formats.B650.section_b_sea_response_format import B650_SECTION_B_SEA_RESPONSE_FORMAT
+    from schemas.B650.import_section_b_sea import B650SectionBSeaResponse
+    from services.OpenAIService import OpenAIService
+
+    wrapper = next(iter(B650_SECTION_B_SEA_RESPONSE_FORMAT["properties"]))
+    schema_fields = list(B650_SECTION_B_SEA_RESPONSE_FORMAT["properties"][wrapper]["properties"])
+    prompts = []
+
+    def call_llm(prompt, schema=None, **kwargs):
+        prompts.append(prompt)
+        asked = list(schema["properties"][wrapper]["properties"])
+        return json.dumps({wrapper: {name: None for name in asked} | {"vessel_name": "MSC AURORA"}})
+
+    service = OpenAIService.__new__(OpenAIService)
+    service._call_llm = call_llm
+    request = ("SECTION B PROMPT", B650_SECTION_B_SEA_RESPONSE_FORMAT, B650SectionBSeaResponse)
+
+    parsed = service._gated("section_b", request, preprocessing_result(SECTION_B_DETECTED))
+
+    assert len(prompts) == 1 and prompts[0].startswith("SECTION B PROMPT")
+    assert set(schema_fields) <= set(parsed[wrapper])
+    assert parsed[wrapper]["vessel_name"] == "MSC AURORA"
+    assert parsed[wrapper]["ocean_bill_of_lading_no"] == "COSU6123456789"
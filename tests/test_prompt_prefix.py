@@ -0,0 +1,54 @@
+import pytest
+
+from services.prompt_prefix import static_prefix
+from services.prompt_registry import prompt_registry
+
+DOCUMENTS = [
+    {"ocr_text": "INVOICE RM2025-001\nGRAPPLE 1 1100 1100 USD", "declaration_type": "import",
+     "structured_pipeline_data": "consignee_name: BRADLEY THOMAS"},
+    {"ocr_text": "BILL OF LADING COSU6123\nVESSEL MSC AURORA", "declaration_type": "export",
+     "structured_pipeline_data": ""},
+]
+
+
+def render(template, document):
+    return template.render(**{k: v for k, v in document.items() if k in template.input_variables})
+
+
+@pytest.mark.parametrize("name", prompt_registry.names())
+def test_rendered_prompts_start_with_the_static_prefix(name):
+    template = prompt_registry.get(name)
+    prefix = static_prefix(template)
+
+    assert prefix
+    for document in DOCUMENTS:
+        assert render(template, document).startswith(prefix)
+
+
+@pytest.mark.parametrize("name", prompt_registry.names())
+def test_static_prefix_matches_the_compiled_prefix(name):
+    template = prompt_registry.get(name)
+
+    assert static_prefix(template) == template.static_prefix
+
+
+@pytest.mark.parametrize("name", prompt_registry.names())
+def test_static_prefix_holds_no_document_values(name):
+    template = prompt_registry.get(name)
+    prefix = static_prefix(template)
+
+    for document in DOCUMENTS:
+        # declaration_type values ("import") are ordinary words of the instructions
+        for key in ("ocr_text", "structured_pipeline_data"):
+            if document[key]:
+                assert document[key] not in prefix
+
+
+@pytest.mark.parametrize("name", prompt_registry.names())
+def test_documents_differ_only_after_the_prefix(name):
+    template = prompt_registry.get(name)
+    first, second = (render(template, document) for document in DOCUMENTS)
+
+    assert len(static_prefix(template)) <= len(first) and first != second
+    common = next((i for i, (a, b) in enumerate(zip(first, second)) if a != b), min(len(first), len(second)))
+    assert common >= len(static_prefix(template))
@@ -0,0 +1,99 @@
+import json
+
+from services import semantic_cache as semantic_cache_module
+from services.semantic_cache import SemanticCache, value_in_text, word_text
+
+PAST_TEXT = """BILL OF LADING COSU6123456789
+VESSEL MSC AURORA VOYAGE 142E
+PORT OF LOADING SHANGHAI PORT OF DISCHARGE PORT KLANG
+GROSS WEIGHT 1,250.50 KGS 12 PACKAGES"""
+
+NEW_TEXT = """BILL OF LADING COSU6123456790
+VESSEL MSC AURORA VOYAGE 143E
+PORT OF LOADING SHANGHAI PORT OF DISCHARGE PORT KLANG
+GROSS WEIGHT 1,180.00 KGS 11 PACKAGES"""
+
+PAST_VALUES = {
+    "vessel_name": "MSC AURORA",
+    "voyage_number": "142E",
+    "ocean_bill_of_lading_no": "COSU6123456789",
+    "loading_port": "SHANGHAI",
+    "discharge_port": "PORT KLANG",
+    "gross_weight": 1250.5,
+    "number_of_packages": 12,
+    "container_number": None,
+}
+
+
+def test_values_match_on_word_boundaries():
+    words = word_text("Invoice INV-0012 shipper Foo Co. Ltd")
+
+    assert value_in_text("INV-0012", words)
+    assert value_in_text("foo co", words)
+    assert not value_in_text("INV-001", words)
+    assert not value_in_text("Foo Corp", words)
+
+
+def test_short_values_are_not_taken_as_found():
+    words = word_text("Packages A 5 KG")
+
+    assert not value_in_text("A", words)
+    assert not value_in_text("KG", words)
+
+
+def test_numeric_leaves_are_never_taken_as_found():
+    words = word_text("GROSS WEIGHT 1250.5 KGS 12 PACKAGES")
+
+    assert not value_in_text(1250.5, words)
+    assert not value_in_text(12, words)
+    assert not value_in_text({"port": "SHANGHAI", "packages": 12}, words + " shanghai ")
+
+
+def test_split_skeleton_reasks_changed_numeric_and_null_fields():
+    kept, changed = SemanticCache.split_skeleton(PAST_VALUES, NEW_TEXT)
+
+    assert kept == {"vessel_name": "MSC AURORA", "loading_port": "SHANGHAI", "discharge_port": "PORT KLANG"}
+    assert set(changed) == {
+        "voyage_number", "ocean_bill_of_lading_no", "gross_weight", "number_of_packages", "container_number",
+    }
+
+
+def test_documents_differing_in_numbers_have_the_same_signature():
+    cache = SemanticCache(num_perm=32, bands=8)
+
+    assert cache.similarity(cache.signature(PAST_TEXT), cache.signature(NEW_TEXT)) == 1.0
+    assert cache.document_id("section_b", PAST_TEXT) != cache.document_id("section_b", NEW_TEXT)
+    assert cache.document_id("section_b", PAST_TEXT) == cache.document_id("section_b", PAST_TEXT)
+
+
+def test_near_duplicate_reuse_asks_only_for_changed_fields(monkeypatch):
+    from llm_response_formats.B650.section_b_sea_response_format import B650_SECTION_B_SEA_RESPONSE_FORMAT
+    from schemas.B650.import_section_b_sea import B650SectionBSeaResponse
+    from services.OpenAIService import OpenAIService
+
+    wrapper = next(iter(B650_SECTION_B_SEA_RESPONSE_FORMAT["properties"]))
+    monkeypatch.setattr(
+        semantic_cache_module.semantic_cache, "lookup", lambda section, text: (0.95, {wrapper: PAST_VALUES})
+    )
+    asked = []
+
+    def call_llm(prompt, schema=None, **kwargs):
+        fields = list(schema["properties"][wrapper]["properties"])
+        asked.extend(fields)
+        values = {"voyage_number": "143E", "ocean_bill_of_lading_no": "COSU6123456790",
+                  "gross_weight": 1180.0, "number_of_packages": 11}
+        return json.dumps({wrapper: {name: values.get(name) for name in fields}})
+
+    service = OpenAIService.__new__(OpenAIService)
+    service._call_llm = call_llm
+    request = ("SECTION B PROMPT", B650_SECTION_B_SEA_RESPONSE_FORMAT, B650SectionBSeaResponse)
+
+    result = service._from_near_duplicate("section_b", NEW_TEXT, request)[wrapper]
+
+    assert "vessel_name" not in asked and "loading_port" not in asked
+    assert result["vessel_name"] == "MSC AURORA"
+    assert result["voyage_number"] == "143E"
+    assert result["ocean_bill_of_lading_no"] == "COSU6123456790"
+    # Both are string fields in the schema
+    assert result["gross_weight"] == "1180"
+    assert result["number_of_packages"] == "11"
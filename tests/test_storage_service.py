@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from services.storage_service import FilesystemBucket, ReadThroughCache, StorageError, StorageService
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    return FilesystemBucket(str(tmp_path / "bucket"))
+
+
+def make_service(bucket, cache_dir, max_bytes=10 * 1024 * 1024):
+    return StorageService(
+        storage_type="s3", client=bucket, bucket="documents", cache=ReadThroughCache(str(cache_dir), max_bytes)
+    )
+
+
+def test_put_then_local_path_downloads_into_cache(bucket, tmp_path):
+    bucket.put_object(Bucket="documents", Key="uploads/invoice.pdf", Body=b"%PDF-1.4 invoice")
+    service = make_service(bucket, tmp_path / "cache")
+
+    path = service.local_path("./uploads/invoice.pdf")
+
+    assert path.startswith(str(tmp_path / "cache"))
+    assert path.endswith(".pdf")
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 invoice"
+
+
+def test_repeated_local_path_reads_from_cache(bucket, tmp_path):
+    bucket.put_object(Bucket="documents", Key="uploads/bl.pdf", Body=b"bill of lading")
+    service = make_service(bucket, tmp_path / "cache")
+    first = service.local_path("uploads/bl.pdf")
+
+    # The object is gone from the bucket: a second fetch would fail
+    os.remove(bucket._path("uploads/bl.pdf"))
+
+    assert service.local_path("uploads/bl.pdf") == first
+
+
+def test_missing_object_raises_storage_error(bucket, tmp_path):
+    service = make_service(bucket, tmp_path / "cache")
+    with pytest.raises(StorageError):
+        service.local_path("uploads/missing.pdf")
+
+
+def test_checksum_mismatch_is_rejected_and_cleaned_up(bucket, tmp_path):
+    bucket.put_object(Bucket="documents", Key="uploads/a.pdf", Body=b"content")
+    cache = ReadThroughCache(str(tmp_path / "cache"), 1024 * 1024)
+    response = bucket.get_object(Bucket="documents", Key="uploads/a.pdf")
+
+    with pytest.raises(StorageError):
+        cache.store("uploads/a.pdf", response["Body"], expected_md5="0" * 32)
+
+    assert cache.lookup("uploads/a.pdf") is None
+    leftovers = [name for _, _, names in os.walk(tmp_path / "cache") for name in names]
+    assert not any(name.endswith(".tmp") for name in leftovers)
+
+
+def test_eviction_removes_least_recently_used(bucket, tmp_path):
+    for name in ("old", "mid", "new"):
+        bucket.put_object(Bucket="documents", Key=f"uploads/{name}.pdf", Body=b"x" * 400)
+    service = make_service(bucket, tmp_path / "cache", max_bytes=1000)
+
+    old = service.local_path("uploads/old.pdf")
+    os.utime(old, (1, 1))
+    service.local_path("uploads/mid.pdf")
+    service.local_path("uploads/new.pdf")
+
+    assert not os.path.exists(old)
+    assert service.cache.lookup("uploads/old.pdf") is None
+    assert service.cache.lookup("uploads/new.pdf") is not None
+
+
+def test_object_larger_than_the_cache_is_kept_for_its_caller(bucket, tmp_path):
+    bucket.put_object(Bucket="documents", Key="uploads/small.pdf", Body=b"x" * 400)
+    bucket.put_object(Bucket="documents", Key="uploads/large.pdf", Body=b"x" * 2000)
+    service = make_service(bucket, tmp_path / "cache", max_bytes=1000)
+    small = service.local_path("uploads/small.pdf")
+
+    large = service.local_path("uploads/large.pdf")
+
+    with open(large, "rb") as f:
+        assert len(f.read()) == 2000
+    assert not os.path.exists(small)
+
+
+def test_clear_empties_the_cache(bucket, tmp_path):
+    bucket.put_object(Bucket="documents", Key="uploads/a.pdf", Body=b"content")
+    service = make_service(bucket, tmp_path / "cache")
+    path = service.local_path("uploads/a.pdf")
+
+    service.cache.clear()
+
+    assert not os.path.exists(path)
+    assert os.path.isdir(tmp_path / "cache")
+
+
+def test_local_storage_returns_path_unchanged(tmp_path):
+    service = StorageService(storage_type="local", cache=ReadThroughCache(str(tmp_path / "cache"), 0))
+    assert service.local_path("./uploads/a.pdf") == "./uploads/a.pdf"
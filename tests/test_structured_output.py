@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from services.structured_output import parse_number, repair_value  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("USD 1,234.50", 1234.5),
+        ("1.234,56 EUR", 1234.56),
+        ("1.234.567", 1234567.0),
+        ("1,250", 1250.0),
+        ("1,250,000", 1250000.0),
+        ("12,5", 12.5),
+        ("-3.5 KGS", -3.5),
+        ("USD 1,500.", 1500.0),
+        (42, 42.0),
+    ],
+)
+def test_parse_number_reads_the_single_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "Invoice 2024-001 USD 1,500",
+        "12.05.2024",
+        "2 x 850.00",
+        "no amount",
+        True,
+    ],
+)
+def test_parse_number_rejects_values_without_exactly_one_number(value):
+    assert parse_number(value) is None
+
+
+def test_repair_value_converts_european_amounts():
+    assert repair_value("EUR 1.234,56", float) == 1234.56
+
+
+def test_repair_value_leaves_ambiguous_amounts_for_the_reask():
+    value = "Invoice 2024-001 USD 1,500"
+
+    assert repair_value(value, float) is value